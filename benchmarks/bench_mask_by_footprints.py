@@ -0,0 +1,101 @@
+"""Benchmark footprint masking against the number of building footprints.
+
+Compares the previous per-polygon ``geometry_mask`` loop with the single-pass
+rasterizer ``roof_area.preprocess.footprints.rasterize_footprints``.
+
+Usage::
+
+    python benchmarks/bench_mask_by_footprints.py --size 2048 --counts 100 1000 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable, List, Sequence
+
+import numpy as np
+from rasterio import features
+from rasterio.transform import from_origin
+from shapely.geometry import Polygon, box
+
+from roof_area.preprocess.footprints import rasterize_footprints
+
+
+def _random_footprints(count: int, size: int, seed: int) -> List[Polygon]:
+    rng = np.random.default_rng(seed)
+    origins = rng.uniform(0, size - 20, size=(count, 2))
+    extents = rng.uniform(4, 20, size=(count, 2))
+    return [
+        box(x, y, x + w, y + h)
+        for (x, y), (w, h) in zip(origins, extents)
+    ]
+
+
+def _per_polygon(polygons: Sequence[Polygon], base_mask: np.ndarray, transform) -> np.ndarray:
+    output_mask = np.zeros(base_mask.shape, dtype=bool)
+    for geom in polygons:
+        geometry_mask = features.geometry_mask(
+            [geom],
+            out_shape=base_mask.shape,
+            transform=transform,
+            invert=True,
+        )
+        output_mask |= base_mask & geometry_mask
+    return output_mask
+
+
+def _single_pass(polygons: Sequence[Polygon], base_mask: np.ndarray, transform) -> np.ndarray:
+    footprint_mask = rasterize_footprints(
+        polygons, out_shape=base_mask.shape, transform=transform
+    )
+    return base_mask & footprint_mask
+
+
+def _time(func: Callable[[], np.ndarray]) -> tuple[float, np.ndarray]:
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=2048, help="Raster width/height in pixels")
+    parser.add_argument(
+        "--counts",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000, 10000],
+        help="Footprint counts to benchmark",
+    )
+    parser.add_argument(
+        "--max-legacy-count",
+        type=int,
+        default=1000,
+        help="Skip the per-polygon loop above this many footprints",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args(argv)
+
+    transform = from_origin(0, args.size, 1, 1)
+    base_mask = np.random.default_rng(args.seed).random((args.size, args.size)) > 0.5
+
+    print(f"{'footprints':>10} {'per-polygon [s]':>16} {'single-pass [s]':>16} {'speedup':>8}")
+    for count in args.counts:
+        polygons = _random_footprints(count, args.size, args.seed)
+        fast_time, fast = _time(lambda: _single_pass(polygons, base_mask, transform))
+
+        if count > args.max_legacy_count:
+            print(f"{count:>10} {'skipped':>16} {fast_time:>16.4f} {'-':>8}")
+            continue
+
+        slow_time, slow = _time(lambda: _per_polygon(polygons, base_mask, transform))
+        if not np.array_equal(slow, fast):
+            raise AssertionError(f"Mask mismatch for {count} footprints")
+        print(f"{count:>10} {slow_time:>16.4f} {fast_time:>16.4f} {slow_time / fast_time:>7.1f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,228 @@
+"""Time the core pipeline on synthetic scenes and compare against a stored baseline.
+
+Each scale generates a square GeoTIFF and a footprint layer (see ``synthetic.py``)
+and times ``run_inference``, tiled ``iter_windows`` reads, ``aggregate_area`` and
+``mask_area_m2``. Timings are the best of ``--repeat`` runs divided by a fixed
+NumPy/OpenCV calibration workload. That makes a baseline recorded on one machine
+usable on another. A case fails when it is more than ``--tolerance`` slower
+than the baseline, and the script then exits with status 1.
+
+Usage::
+
+    python benchmarks/bench_suite.py                      # compare with baseline.json
+    python benchmarks/bench_suite.py --scales small medium large --repeat 5
+    python benchmarks/bench_suite.py --update-baseline    # record a new baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import platform
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+import cv2
+import geopandas as gpd
+import numpy as np
+import rasterio
+
+from roof_area.metrics.area import mask_area_m2
+from roof_area.model.infer import run_inference
+from roof_area.pipeline.run import aggregate_area
+from roof_area.preprocess.tiling import iter_windows
+from synthetic import write_synthetic_footprints, write_synthetic_raster
+
+SCALES = {"tiny": 512, "small": 2048, "medium": 4096, "large": 8192}
+DEFAULT_SCALES = ("small", "medium")
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+TILE_SIZE = 512
+
+
+def _calibrate(repeat: int) -> float:
+    rng = np.random.default_rng(0)
+    image = rng.random((2048, 2048), dtype=np.float32)
+
+    def workload() -> None:
+        blurred = cv2.GaussianBlur(image, (5, 5), 0)
+        np.sqrt(blurred * blurred + image * image).sum()
+        np.bincount((image * 255).astype(np.int64).ravel())
+
+    return _best_of(workload, repeat)
+
+
+def _best_of(func: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _scene_cases(
+    scale: str, size: int, workdir: Path, *, bands: int, dtype: str, density: float
+) -> Dict[str, Callable[[], object]]:
+    raster = write_synthetic_raster(
+        workdir / f"{scale}.tif", width=size, height=size, count=bands, dtype=dtype
+    )
+    footprints = workdir / f"{scale}.fgb"
+    write_synthetic_footprints(footprints, width=size, height=size, density=density)
+    output = workdir / f"{scale}_mask.tif"
+    areas = workdir / f"{scale}_areas.csv"
+
+    def infer() -> None:
+        run_inference(
+            raster_path=str(raster),
+            footprints_path=str(footprints),
+            output_path=str(output),
+            model_path=None,
+            threshold=0.5,
+            tile_size=TILE_SIZE,
+            gradient_sidecar=False,
+            areas_path=str(areas),
+        )
+
+    def read_windows() -> None:
+        with rasterio.open(raster) as dataset:
+            for window in iter_windows(dataset, TILE_SIZE):
+                dataset.read(window=window)
+
+    infer()
+    with rasterio.open(output) as dataset:
+        mask = dataset.read(1).astype(bool)
+    buildings = gpd.read_file(footprints)
+
+    return {
+        "run_inference": infer,
+        "iter_windows_read": read_windows,
+        "aggregate_area": lambda: aggregate_area(buildings),
+        "mask_area_m2": lambda: mask_area_m2(mask, (0.5, 0.5)),
+    }
+
+
+def run_suite(
+    scales: Sequence[str],
+    *,
+    repeat: int,
+    bands: int,
+    dtype: str,
+    density: float,
+) -> Dict[str, object]:
+    calibration = _calibrate(repeat)
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory(prefix="roof-area-bench-") as tmp:
+        for scale in scales:
+            cases = _scene_cases(
+                scale, SCALES[scale], Path(tmp), bands=bands, dtype=dtype, density=density
+            )
+            for name, func in cases.items():
+                seconds = _best_of(func, repeat)
+                results[f"{scale}/{name}"] = {
+                    "seconds": seconds,
+                    "relative": seconds / calibration,
+                }
+    return {
+        "calibration_s": calibration,
+        "machine": platform.platform(),
+        "python": platform.python_version(),
+        "config": {"bands": bands, "dtype": dtype, "density": density, "tile_size": TILE_SIZE},
+        "results": results,
+    }
+
+
+def compare(
+    current: Dict[str, object],
+    baseline: Dict[str, object],
+    *,
+    tolerance: float,
+    min_seconds: float,
+) -> List[str]:
+    """Print a comparison table and return the names of regressed cases."""
+    regressions = []
+    print(f"{'case':<28} {'seconds':>9} {'relative':>9} {'baseline':>9} {'change':>8}")
+    for name, result in current["results"].items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            print(
+                f"{name:<28} {result['seconds']:>9.4f} {result['relative']:>9.3f} "
+                f"{'-':>9} {'new':>8}"
+            )
+            continue
+        change = result["relative"] / reference["relative"] - 1.0
+        regressed = change > tolerance and result["seconds"] >= min_seconds
+        flag = "  REGRESSION" if regressed else ""
+        print(
+            f"{name:<28} {result['seconds']:>9.4f} {result['relative']:>9.3f} "
+            f"{reference['relative']:>9.3f} {change:>+7.0%}{flag}"
+        )
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scales",
+        nargs="+",
+        choices=sorted(SCALES),
+        default=list(DEFAULT_SCALES),
+        help="Scene sizes to run",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the best counts")
+    parser.add_argument("--bands", type=int, default=3, help="Raster band count")
+    parser.add_argument(
+        "--dtype", choices=["uint8", "uint16", "float32"], default="uint8", help="Raster dtype"
+    )
+    parser.add_argument("--density", type=float, default=20.0, help="Buildings per hectare")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Baseline JSON")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.3, help="Allowed slowdown before failing (0.3 = 30%%)"
+    )
+    parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=0.005,
+        help="Ignore regressions in cases faster than this (timer noise)",
+    )
+    parser.add_argument("--output", type=Path, help="Also write the results JSON here")
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="Merge the results into the baseline"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    current = run_suite(
+        args.scales, repeat=args.repeat, bands=args.bands, dtype=args.dtype, density=args.density
+    )
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2))
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if baseline and baseline.get("config") != current["config"]:
+        print(f"Baseline config {baseline.get('config')} differs; comparison skipped.")
+        baseline = {}
+    regressions = compare(
+        current, baseline, tolerance=args.tolerance, min_seconds=args.min_seconds
+    )
+
+    if args.update_baseline:
+        merged = {**current, "results": {**baseline.get("results", {}), **current["results"]}}
+        args.baseline.write_text(json.dumps(merged, indent=2) + "\n")
+        print(f"Updated baseline {args.baseline}")
+        return 0
+    if regressions:
+        print(
+            f"\nFAILED: {len(regressions)} case(s) more than {args.tolerance:.0%} slower "
+            f"than {args.baseline}: {', '.join(regressions)}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
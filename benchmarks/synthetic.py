@@ -0,0 +1,116 @@
+"""Synthetic rasters and footprint layers for benchmarks.
+
+Rasters are written block by block, so scenes larger than memory can be
+generated. Roof-like bright rectangles on a noisy background give the gradient
+baseline realistic edges. Footprints are axis-aligned boxes placed uniformly at
+a given density.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Tuple
+
+import geopandas as gpd
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+from shapely.geometry import box
+
+ORIGIN = (500_000.0, 5_000_000.0)
+_DTYPE_RANGES = {"uint8": 255.0, "uint16": 10_000.0, "float32": 1.0}
+
+
+def write_synthetic_raster(
+    path: str | Path,
+    *,
+    width: int,
+    height: int,
+    count: int = 3,
+    dtype: str = "uint8",
+    pixel_size: float = 0.5,
+    block_size: int = 512,
+    crs: str = "EPSG:32633",
+    seed: int = 0,
+) -> Path:
+    """Write a tiled GeoTIFF of ``width`` x ``height`` pixels with ``count`` bands."""
+    if dtype not in _DTYPE_RANGES:
+        raise ValueError(f"Unsupported dtype '{dtype}'. Expected one of {sorted(_DTYPE_RANGES)}.")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    scale = _DTYPE_RANGES[dtype]
+    profile = {
+        "driver": "GTiff",
+        "width": width,
+        "height": height,
+        "count": count,
+        "dtype": dtype,
+        "crs": crs,
+        "transform": from_origin(*ORIGIN, pixel_size, pixel_size),
+        "tiled": True,
+        "blockxsize": block_size,
+        "blockysize": block_size,
+        "compress": "deflate",
+    }
+    with rasterio.open(path, "w", **profile) as dst:
+        for row_off in range(0, height, block_size):
+            for col_off in range(0, width, block_size):
+                window = Window(
+                    col_off,
+                    row_off,
+                    min(block_size, width - col_off),
+                    min(block_size, height - row_off),
+                )
+                rng = np.random.default_rng((seed, row_off, col_off))
+                block = _synthetic_block(rng, count, int(window.height), int(window.width))
+                dst.write((block * scale).astype(dtype), window=window)
+    return path
+
+
+def _synthetic_block(rng: np.random.Generator, count: int, height: int, width: int) -> np.ndarray:
+    block = rng.normal(0.35, 0.05, size=(count, height, width))
+    roofs = max(1, height * width // 4000)
+    rows = rng.integers(0, height, size=(roofs, 2))
+    cols = rng.integers(0, width, size=(roofs, 2))
+    levels = rng.uniform(0.5, 0.95, size=(roofs, count))
+    for (top, bottom), (left, right), level in zip(np.sort(rows), np.sort(cols), levels):
+        block[:, top:bottom, left:right] = level[:, None, None]
+    return np.clip(block, 0.0, 1.0)
+
+
+def write_synthetic_footprints(
+    path: str | Path,
+    *,
+    width: int,
+    height: int,
+    density: float = 20.0,
+    pixel_size: float = 0.5,
+    size_range: Tuple[float, float] = (6.0, 25.0),
+    crs: str = "EPSG:32633",
+    seed: int = 0,
+) -> int:
+    """Write ``density`` buildings per hectare over the raster extent; return the count.
+
+    The format follows the suffix (``.fgb``, ``.gpkg``, ``.geojson`` or ``.parquet``).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    extent_x, extent_y = width * pixel_size, height * pixel_size
+    buildings = max(1, int(round(density * extent_x * extent_y / 10_000)))
+    rng = np.random.default_rng(seed)
+    sizes = rng.uniform(*size_range, size=(buildings, 2))
+    minx = ORIGIN[0] + rng.uniform(0, extent_x - size_range[1], size=buildings)
+    maxy = ORIGIN[1] - rng.uniform(0, extent_y - size_range[1], size=buildings)
+    gdf = gpd.GeoDataFrame(
+        {"building_id": np.arange(buildings)},
+        geometry=[
+            box(x, y - h, x + w, y) for x, y, (w, h) in zip(minx, maxy, sizes)
+        ],
+        crs=crs,
+    )
+    if path.suffix.lower() in (".parquet", ".geoparquet"):
+        gdf.to_parquet(path, write_covering_bbox=True)
+    else:
+        gdf.to_file(path)
+    return buildings
@@ -1,6 +1,21 @@
 """Roof area inference package."""
 
-from roof_area.config import RoofAreaSettings
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
 from roof_area.logging import configure_logging
 
+if TYPE_CHECKING:
+    from roof_area.config import RoofAreaSettings
+
 __all__ = ["RoofAreaSettings", "configure_logging"]
+
+
+def __getattr__(name: str) -> Any:
+    # Settings pull in pydantic; load them on first use so the CLI starts fast.
+    if name == "RoofAreaSettings":
+        from roof_area.config import RoofAreaSettings
+
+        return RoofAreaSettings
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1 +1,5 @@
 """Subpackage."""
+
+from roof_area.api.service import AoiResult, RoofAreaService, build_server, serve
+
+__all__ = ["AoiResult", "RoofAreaService", "build_server", "serve"]
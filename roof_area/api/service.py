@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import rasterio
+from affine import Affine
+from pyproj import CRS
+from rasterio.io import MemoryFile
+from rasterio.windows import Window, bounds as window_bounds, union
+
+from roof_area.config import RoofAreaSettings
+from roof_area.io.mosaic import is_mosaic_input, resolve_raster
+from roof_area.io.raster import (
+    LocalRaster,
+    MaskOutputOptions,
+    get_pixel_size_m,
+    snap_window,
+)
+from roof_area.metrics.area import geographic_row_areas, label_pixel_counts
+from roof_area.model.infer import (
+    BASELINE_HALO,
+    DEFAULT_MODEL_TILE_SIZE,
+    InferenceError,
+    baseline_window_mask,
+    compute_gradient_max,
+    load_footprints,
+    model_window_probabilities,
+)
+from roof_area.model.runner import ModelRunner, load_model
+from roof_area.pipeline.run import Bounds, reproject_aoi_to_raster_crs
+from roof_area.preprocess.footprints import FootprintIndex
+
+
+@dataclass
+class AoiResult:
+    """Roof mask and per-building areas computed for one AOI window."""
+
+    window: Window
+    transform: Affine
+    crs: CRS
+    mask: np.ndarray
+    buildings: pd.DataFrame
+    pixel_area_m2: float
+    # Pixel area in m² of every window row, set for geographic rasters.
+    row_areas: np.ndarray | None = None
+
+    def summary(self) -> Dict[str, Any]:
+        roof_pixels = int(np.count_nonzero(self.mask))
+        if self.row_areas is None:
+            area_m2 = roof_pixels * self.pixel_area_m2
+        else:
+            area_m2 = float(np.count_nonzero(self.mask, axis=1) @ self.row_areas)
+        return {
+            "window": {
+                "col_off": int(self.window.col_off),
+                "row_off": int(self.window.row_off),
+                "width": int(self.window.width),
+                "height": int(self.window.height),
+            },
+            "transform": list(self.transform)[:6],
+            "crs": self.crs.to_string() if self.crs else None,
+            "pixel_area_m2": self.pixel_area_m2,
+            "roof_pixels": roof_pixels,
+            "area_m2": area_m2,
+            "buildings": json.loads(self.buildings.to_json(orient="records")),
+        }
+
+    def to_geotiff(self) -> bytes:
+        height, width = self.mask.shape
+        with MemoryFile() as memfile:
+            with memfile.open(
+                driver="GTiff",
+                width=width,
+                height=height,
+                count=1,
+                dtype=rasterio.uint8,
+                crs=self.crs,
+                transform=self.transform,
+                **MaskOutputOptions().creation_options(),
+            ) as dst:
+                dst.write(self.mask, 1)
+            return memfile.read()
+
+
+class RoofAreaService:
+    """Long-lived roof area queries against one raster.
+
+    The footprints, the model and the gradient normalization are loaded once.
+    Queries run on a pool of ``settings.workers`` threads that each keep their
+    own open dataset, and model tiles from concurrent queries are predicted in
+    shared batches of up to ``settings.batch_size``.
+    """
+
+    def __init__(
+        self,
+        settings: RoofAreaSettings,
+        *,
+        model: ModelRunner | None = None,
+        logger: logging.Logger | None = None,
+    ) -> None:
+        if not settings.raster_path:
+            raise ValueError("The service requires a raster path.")
+        self.settings = settings
+        self.logger = logger or logging.getLogger(__name__)
+        raster_path = settings.raster_path
+        # A directory or glob is served through a mosaic VRT that lives as long as the service.
+        self._mosaic_dir = None
+        if is_mosaic_input(raster_path):
+            self._mosaic_dir = tempfile.TemporaryDirectory(prefix="roof-area-mosaic-")
+            raster_path = resolve_raster(
+                raster_path, f"{self._mosaic_dir.name}/mosaic.vrt", logger=self.logger
+            )
+        self._raster = LocalRaster(raster_path)
+        dataset = self._raster.get()
+        self.crs = dataset.crs
+        self.pixel_area_m2 = float(np.prod(get_pixel_size_m(dataset)))
+        self.row_areas = geographic_row_areas(dataset)
+
+        self.footprints = (
+            FootprintIndex(load_footprints(dataset, settings.footprints_path))
+            if settings.footprints_path
+            else None
+        )
+        if model is None and settings.model_path:
+            model = load_model(settings.model_path, threads=settings.model_threads)
+        self.model = model
+        self._batcher = _ModelBatcher(model, batch_size=settings.batch_size) if model else None
+
+        self.halo = max(settings.overlap, BASELINE_HALO)
+        self.max_magnitude: float | None = None
+        if model is None:
+            if self.footprints is None:
+                raise InferenceError("The baseline service requires footprints or a model.")
+            self.max_magnitude = compute_gradient_max(
+                dataset,
+                tile_size=settings.tile_size,
+                halo=self.halo,
+                use_overviews=settings.gradient_overviews,
+                sidecar=settings.gradient_sidecar,
+                workers=settings.workers,
+                executor="thread",
+                logger=self.logger,
+            )
+        self._pool = ThreadPoolExecutor(
+            max_workers=settings.workers, thread_name_prefix="roof-area-query"
+        )
+
+    def submit(
+        self,
+        bounds: Bounds,
+        crs: CRS | str,
+        *,
+        threshold: float | None = None,
+    ) -> Future:
+        """Queue an AOI query on the worker pool and return a future :class:`AoiResult`."""
+        return self._pool.submit(self.query, bounds, crs, threshold=threshold)
+
+    def query(
+        self,
+        bounds: Bounds,
+        crs: CRS | str,
+        *,
+        threshold: float | None = None,
+    ) -> AoiResult:
+        """Compute the roof mask and building areas for AOI ``bounds`` given in ``crs``.
+
+        The window grows to cover every footprint that intersects the AOI, so
+        per-building areas are never cut at the AOI edge.
+        """
+        threshold = self.settings.threshold if threshold is None else threshold
+        dataset = self._raster.get()
+        raster_bounds = reproject_aoi_to_raster_crs(tuple(bounds), crs, dataset.crs)
+        window = snap_window(dataset, raster_bounds)
+        if self.footprints is not None:
+            for building in self.footprints.bounds(within=window_bounds(window, dataset.transform)):
+                window = union(window, snap_window(dataset, tuple(building)))
+
+        if self.model is None:
+            mask = baseline_window_mask(
+                dataset,
+                window,
+                threshold=threshold,
+                max_magnitude=self.max_magnitude,
+                halo=self.halo,
+            )
+        else:
+            mask = (
+                model_window_probabilities(
+                    dataset,
+                    window,
+                    self._batcher.predict,
+                    tile_size=self.settings.tile_size or DEFAULT_MODEL_TILE_SIZE,
+                    overlap=self.settings.overlap,
+                    channels=self.model.channels,
+                )
+                > threshold
+            )
+
+        row_areas = None
+        if self.row_areas is not None:
+            row_off = int(window.row_off)
+            row_areas = self.row_areas[row_off : row_off + mask.shape[0]]
+        buildings = pd.DataFrame(
+            columns=["building_id", "footprint_pixels", "roof_pixels", "area_m2"]
+        )
+        if self.footprints is not None:
+            labels = self.footprints.labels(
+                window_bounds(window, dataset.transform),
+                out_shape=mask.shape,
+                transform=dataset.window_transform(window),
+            )
+            mask &= labels > 0
+            buildings = self._building_table(*label_pixel_counts(labels, mask, row_areas))
+
+        return AoiResult(
+            window=window,
+            transform=dataset.window_transform(window),
+            crs=dataset.crs,
+            mask=mask.astype(rasterio.uint8),
+            buildings=buildings,
+            pixel_area_m2=self.pixel_area_m2,
+            row_areas=row_areas,
+        )
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+        if self._batcher is not None:
+            self._batcher.close()
+        self._raster.close()
+        if self._mosaic_dir is not None:
+            self._mosaic_dir.cleanup()
+
+    def _building_table(
+        self,
+        labels: np.ndarray,
+        footprint_pixels: np.ndarray,
+        roof_pixels: np.ndarray,
+        footprint_area_m2: np.ndarray | None = None,
+        roof_area_m2: np.ndarray | None = None,
+    ) -> pd.DataFrame:
+        table = pd.DataFrame(
+            {
+                "building_id": self.footprints.building_ids[labels - 1],
+                "footprint_pixels": footprint_pixels,
+                "roof_pixels": roof_pixels,
+                "area_m2": (
+                    roof_pixels * self.pixel_area_m2 if roof_area_m2 is None else roof_area_m2
+                ),
+            }
+        )
+        return table[table["area_m2"] >= self.settings.min_area_m2].reset_index(drop=True)
+
+
+class _ModelBatcher:
+    """Predict tiles from concurrent callers in shared model batches.
+
+    A single thread owns the model. It waits up to ``max_wait`` seconds to fill
+    a batch of ``batch_size`` tiles from whichever requests are queued.
+    """
+
+    def __init__(self, model: ModelRunner, *, batch_size: int, max_wait: float = 0.005) -> None:
+        self._model = model
+        self._batch_size = batch_size
+        self._max_wait = max_wait
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future] | None]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="roof-area-batcher", daemon=True)
+        self._thread.start()
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        futures: List[Future] = []
+        for tile in batch:
+            future: Future = Future()
+            self._queue.put((tile, future))
+            futures.append(future)
+        return np.stack([future.result() for future in futures])
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            if item is None:
+                return
+            pending = [item]
+            deadline = time.monotonic() + self._max_wait
+            while len(pending) < self._batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                pending.append(item)
+
+            try:
+                predictions = self._model.predict(np.stack([tile for tile, _ in pending]))
+            except Exception as exc:
+                for _, future in pending:
+                    future.set_exception(exc)
+                continue
+            for (_, future), prediction in zip(pending, predictions):
+                future.set_result(prediction)
+
+
+def build_server(service: RoofAreaService, host: str, port: int) -> ThreadingHTTPServer:
+    """Return an HTTP server exposing ``GET /health`` and ``POST /mask`` for ``service``.
+
+    ``POST /mask`` takes ``{"bounds": [minx, miny, maxx, maxy], "crs": "EPSG:4326"}``
+    plus optional ``"threshold"`` and ``"format"`` (``"json"`` or ``"geotiff"``).
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path != "/health":
+                self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {self.path}"})
+                return
+            self._send_json(HTTPStatus.OK, {"status": "ok", "raster": service.settings.raster_path})
+
+        def do_POST(self) -> None:
+            if self.path != "/mask":
+                self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {self.path}"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                output = request.get("format", "json")
+                if output not in ("json", "geotiff"):
+                    raise ValueError(f"Unknown format '{output}'. Expected json or geotiff.")
+                result = service.submit(
+                    request["bounds"],
+                    request.get("crs", "EPSG:4326"),
+                    threshold=request.get("threshold"),
+                ).result()
+            except (KeyError, TypeError, ValueError) as exc:
+                self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+                return
+            except Exception as exc:
+                service.logger.exception("AOI query failed")
+                self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(exc)})
+                return
+
+            if output == "geotiff":
+                self._send(HTTPStatus.OK, result.to_geotiff(), "image/tiff")
+            else:
+                self._send_json(HTTPStatus.OK, result.summary())
+
+        def log_message(self, format: str, *args: Any) -> None:
+            service.logger.debug("%s - %s", self.address_string(), format % args)
+
+        def _send_json(self, status: HTTPStatus, payload: Dict[str, Any]) -> None:
+            self._send(status, json.dumps(payload).encode(), "application/json")
+
+        def _send(self, status: HTTPStatus, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(settings: RoofAreaSettings, *, logger: logging.Logger | None = None) -> None:
+    """Load the service once and answer AOI queries until interrupted."""
+    logger = logger or logging.getLogger(__name__)
+    service = RoofAreaService(settings, logger=logger)
+    server = build_server(service, settings.host, settings.port)
+    host, port = server.server_address[:2]
+    logger.info("Serving roof areas for %s on http://%s:%d", settings.raster_path, host, port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
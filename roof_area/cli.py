@@ -1,13 +1,24 @@
-"""Command line interface for roof area workflows."""
+"""Command line interface for roof area workflows.
+
+Only the standard library is imported at module load. Each command imports the
+modules it needs when it runs, so ``--help`` and argument errors return without
+loading GDAL, OpenCV or pandas.
+"""
 
 from __future__ import annotations
 
 import argparse
-from typing import Sequence
+import json
+import logging
+from contextlib import nullcontext
+from pathlib import Path
+from typing import TYPE_CHECKING, Sequence
 
-from roof_area.config import RoofAreaSettings
 from roof_area.logging import configure_logging
-from roof_area.model.infer import run_inference
+
+if TYPE_CHECKING:
+    from roof_area.config import RoofAreaSettings
+    from roof_area.io.raster import MaskOutputOptions
 
 
 def _add_common_args(parser: argparse.ArgumentParser) -> None:
@@ -17,44 +28,393 @@ def _add_common_args(parser: argparse.ArgumentParser) -> None:
     parser.add_argument("--min-area-m2", type=float, help="Minimum roof area in m²")
     parser.add_argument("--seed", type=int, help="Random seed")
     parser.add_argument("--log-level", type=str, help="Logging level")
+    parser.add_argument(
+        "--log-format", choices=["text", "json"], help="Log as text lines or JSON objects"
+    )
+    parser.add_argument("--gdal-cache-mb", type=int, help="GDAL block cache size in MiB")
+    parser.add_argument(
+        "--gdal-threads", type=str, help="Threads decoding compressed blocks, or ALL_CPUS"
+    )
+
+
+def _add_executor_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--workers", type=int, help="Number of parallel workers")
+    parser.add_argument(
+        "--executor",
+        choices=["thread", "process"],
+        help="Parallel executor backend",
+    )
+
+
+def _add_sweep_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--sweep",
+        type=str,
+        help="Thresholds to sweep in one pass, as start:stop:step or a comma list",
+    )
+    parser.add_argument(
+        "--sweep-output",
+        dest="sweep_path",
+        type=str,
+        help="Threshold sweep table (CSV or Parquet); logged when omitted",
+    )
+
+
+def _add_output_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--output-block-size", type=int, help="Internal tile size of the output mask"
+    )
+    parser.add_argument(
+        "--output-compress",
+        choices=["deflate", "zstd", "lzw", "none"],
+        help="Output mask compression",
+    )
+    parser.add_argument(
+        "--output-nbits",
+        type=int,
+        choices=[1, 8],
+        help="Bits per pixel of the output mask",
+    )
+    parser.add_argument(
+        "--output-overviews",
+        action="store_true",
+        default=None,
+        help="Build overviews for the output mask",
+    )
+    parser.add_argument(
+        "--cog",
+        dest="output_cog",
+        action="store_true",
+        default=None,
+        help="Write the output mask as a Cloud-Optimized GeoTIFF",
+    )
+
+
+def _add_polygon_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--simplify",
+        dest="simplify_tolerance",
+        type=float,
+        help="Polygon simplification tolerance in CRS units",
+    )
+    parser.add_argument(
+        "--open", dest="morph_open", type=int, help="Opening radius in pixels (removes speckle)"
+    )
+    parser.add_argument(
+        "--close", dest="morph_close", type=int, help="Closing radius in pixels (fills gaps)"
+    )
+
+
+def _add_inference_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--gradient-overviews",
+        action="store_true",
+        default=None,
+        help="Estimate the gradient maximum from overviews (faster, approximate)",
+    )
+    parser.add_argument(
+        "--gradient-sidecar",
+        action="store_true",
+        default=None,
+        help="Cache the gradient maximum in a <raster>.gradmax.json sidecar",
+    )
+    parser.add_argument(
+        "--sparse",
+        action="store_true",
+        default=None,
+        help="Only process tiles that intersect footprints and write zeros elsewhere",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        default=None,
+        help="Recompute only tiles whose footprints changed since the mask's snapshot",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Cache gradient and footprint rasters here for fast threshold re-runs",
+    )
+    parser.add_argument(
+        "--cache-max-gb", type=float, help="Evict least recently used cache entries above this size"
+    )
+    _add_output_args(parser)
+    _add_executor_args(parser)
+    parser.add_argument("--batch-size", type=int, help="Tiles per model inference batch")
+    parser.add_argument(
+        "--model-threads", type=int, help="Intra-op threads for the model runtime"
+    )
+    parser.add_argument(
+        "--read-prefetch",
+        type=int,
+        help="Tiles read ahead on background threads during model inference (0 reads inline)",
+    )
+
+
+def _mask_output_options(settings: RoofAreaSettings) -> MaskOutputOptions:
+    from roof_area.io.raster import MaskOutputOptions
+
+    return MaskOutputOptions(
+        block_size=settings.output_block_size,
+        compress=settings.output_compress,
+        nbits=settings.output_nbits,
+        overviews=settings.output_overviews,
+        cog=settings.output_cog,
+    )
 
 
 def _build_settings(args: argparse.Namespace) -> RoofAreaSettings:
-    data = {k: v for k, v in vars(args).items() if v is not None}
-    return RoofAreaSettings(**data)
+    from roof_area.config import RoofAreaSettings
+
+    data = {
+        k: v
+        for k, v in vars(args).items()
+        if v is not None and k not in ("command", "func")
+    }
+    settings = RoofAreaSettings(**data)
+    if settings.gdal_cache_mb is not None or settings.gdal_threads is not None:
+        # Every command reads rasters, so GDAL is tuned before the first read.
+        from roof_area.io.raster import configure_gdal
+
+        configure_gdal(cache_mb=settings.gdal_cache_mb, threads=settings.gdal_threads)
+    return settings
 
 
 def _infer_command(args: argparse.Namespace) -> int:
+    from roof_area.model.infer import run_inference
+    from roof_area.pipeline.profiling import RunProfiler, profiling
+
     settings = _build_settings(args)
-    logger = configure_logging(settings.log_level, "roof_area.infer")
+    logger = configure_logging(settings.log_level, "roof_area.infer", settings.log_format)
     logger.info("Running inference with settings: %s", settings.model_dump())
     if not settings.raster_path:
         raise ValueError("Missing --raster for inference.")
 
-    run_inference(
+    profiler = RunProfiler(logger=logger.getChild("profile"))
+    with profiling(profiler) if settings.report_path else nullcontext():
+        if settings.sweep:
+            _sweep_command(settings, settings.areas_path, logger)
+            output_path = settings.sweep_path
+        else:
+            output_path = run_inference(
+                raster_path=settings.raster_path,
+                footprints_path=settings.footprints_path,
+                output_path=settings.output_path,
+                model_path=settings.model_path,
+                areas_path=settings.areas_path,
+                logger=logger,
+                **_inference_options(settings),
+            )
+            if settings.polygons_path:
+                _polygonize(settings, output_path, logger)
+
+    if settings.report_path:
+        profiler.write(
+            settings.report_path,
+            command="infer",
+            settings=settings.model_dump(),
+            output=output_path,
+            output_bytes=Path(output_path).stat().st_size if output_path else None,
+        )
+        logger.info("Saved run report to %s", settings.report_path)
+    return 0
+
+
+def _polygonize_command(args: argparse.Namespace) -> int:
+    settings = _build_settings(args)
+    logger = configure_logging(settings.log_level, "roof_area.polygonize", settings.log_format)
+    logger.info("Polygonizing with settings: %s", settings.model_dump())
+    if not (settings.mask_path and settings.polygons_path):
+        raise ValueError("Polygonize needs --mask and --polygons.")
+    _polygonize(settings, settings.mask_path, logger)
+    return 0
+
+
+def _polygonize(settings: RoofAreaSettings, mask_path: str, logger: logging.Logger) -> None:
+    from roof_area.postprocess import polygonize_mask
+
+    polygonize_mask(
+        mask_path,
+        settings.polygons_path,
+        tile_size=settings.tile_size,
+        min_area_m2=settings.min_area_m2,
+        simplify_tolerance=settings.simplify_tolerance,
+        opening=settings.morph_open,
+        closing=settings.morph_close,
+        logger=logger,
+    )
+
+
+def _inference_options(settings: RoofAreaSettings) -> dict:
+    from roof_area.io.cache import ArrayCache
+
+    return {
+        "threshold": settings.threshold,
+        "tile_size": settings.tile_size,
+        "overlap": settings.overlap,
+        "gradient_overviews": settings.gradient_overviews,
+        "gradient_sidecar": settings.gradient_sidecar,
+        "workers": settings.workers,
+        "executor": settings.executor,
+        "batch_size": settings.batch_size,
+        "model_threads": settings.model_threads,
+        "read_prefetch": settings.read_prefetch,
+        "min_area_m2": settings.min_area_m2,
+        "output_options": _mask_output_options(settings),
+        "sparse": settings.sparse,
+        "incremental": settings.incremental,
+        "cache": ArrayCache(settings.cache_dir, max_bytes=int(settings.cache_max_gb * 1024**3))
+        if settings.cache_dir
+        else None,
+    }
+
+
+def _batch_command(args: argparse.Namespace) -> int:
+    from roof_area.pipeline.batch import BatchContext, read_batch_manifest, run_batch
+
+    settings = _build_settings(args)
+    logger = configure_logging(settings.log_level, "roof_area.batch", settings.log_format)
+    logger.info("Running batch with settings: %s", settings.model_dump())
+    if not settings.manifest_path:
+        raise ValueError("Missing --manifest for batch.")
+
+    counts = run_batch(
+        read_batch_manifest(settings.manifest_path),
+        state_path=settings.state_path or f"{settings.manifest_path}.state.jsonl",
+        context=BatchContext(
+            inference=_inference_options(settings),
+            model_path=settings.model_path,
+            model_threads=settings.model_threads,
+        ),
+        jobs=settings.jobs,
+        logger=logger,
+    )
+    return 1 if counts["failed"] else 0
+
+
+def _eval_command(args: argparse.Namespace) -> int:
+    from roof_area.metrics.evaluate import (
+        EvaluationPair,
+        concat_tables,
+        evaluate_many,
+        evaluation_report,
+    )
+    from roof_area.pipeline.run import read_manifest, write_table
+
+    settings = _build_settings(args)
+    logger = configure_logging(settings.log_level, "roof_area.eval", settings.log_format)
+    logger.info("Running evaluation with settings: %s", settings.model_dump())
+
+    if settings.sweep:
+        if not (settings.raster_path and settings.truth_path):
+            raise ValueError("Threshold sweeps in eval need --raster, --footprints and --truth.")
+        _sweep_command(settings, settings.buildings_path, logger)
+        return 0
+
+    if settings.manifest_path:
+        rows = read_manifest(
+            settings.manifest_path, required=("pred", "truth"), optional=("footprints",)
+        )
+        pairs = [EvaluationPair(**row) for row in rows]
+    elif settings.pred_path and settings.truth_path:
+        pairs = [EvaluationPair(settings.pred_path, settings.truth_path, settings.footprints_path)]
+    else:
+        raise ValueError("Provide --pred and --truth, or --manifest, for evaluation.")
+
+    results = evaluate_many(
+        pairs,
+        tile_size=settings.tile_size,
+        workers=settings.workers,
+        executor=settings.executor,
+    )
+    report = evaluation_report(results)
+    logger.info("Evaluated %d scenes: %s", len(results), report["overall"])
+
+    if settings.summary_path:
+        Path(settings.summary_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(settings.summary_path).write_text(json.dumps(report, indent=2))
+    for table, path in (("tiles", settings.tiles_path), ("buildings", settings.buildings_path)):
+        frame = concat_tables(results, table) if path else None
+        if frame is not None:
+            write_table(frame, path)
+    return 0
+
+
+def _sweep_command(
+    settings: RoofAreaSettings,
+    buildings_path: str | None,
+    logger: logging.Logger,
+) -> None:
+    from roof_area.metrics.sweep import parse_thresholds
+    from roof_area.model.infer import run_threshold_sweep
+
+    table = run_threshold_sweep(
         raster_path=settings.raster_path,
         footprints_path=settings.footprints_path,
-        output_path=settings.output_path,
+        thresholds=parse_thresholds(settings.sweep),
+        sweep_path=settings.sweep_path,
+        truth_path=settings.truth_path,
         model_path=settings.model_path,
-        threshold=settings.threshold,
+        tile_size=settings.tile_size,
+        overlap=settings.overlap,
+        gradient_overviews=settings.gradient_overviews,
+        gradient_sidecar=settings.gradient_sidecar,
+        workers=settings.workers,
+        executor=settings.executor,
+        areas_path=buildings_path,
+        min_area_m2=settings.min_area_m2,
         logger=logger,
     )
-    return 0
+    if not settings.sweep_path:
+        logger.info("Threshold sweep:\n%s", table.to_string(index=False))
 
 
-def _eval_command(args: argparse.Namespace) -> int:
+def _serve_command(args: argparse.Namespace) -> int:
+    from roof_area.api import serve
+
     settings = _build_settings(args)
-    logger = configure_logging(settings.log_level, "roof_area.eval")
-    logger.info("Running evaluation with settings: %s", settings.model_dump())
-    logger.info("TODO: implement evaluation pipeline")
+    logger = configure_logging(settings.log_level, "roof_area.api", settings.log_format)
+    logger.info("Starting service with settings: %s", settings.model_dump())
+    serve(settings, logger=logger)
     return 0
 
 
 def _train_command(args: argparse.Namespace) -> int:
     settings = _build_settings(args)
-    logger = configure_logging(settings.log_level, "roof_area.train")
+    logger = configure_logging(settings.log_level, "roof_area.train", settings.log_format)
     logger.info("Running training with settings: %s", settings.model_dump())
-    logger.info("TODO: implement training pipeline")
+    if not settings.chips_dir:
+        raise ValueError("Missing --chips for training.")
+    if bool(settings.raster_path) != bool(settings.footprints_path):
+        raise ValueError("Cutting training chips needs both --raster and --footprints.")
+
+    from roof_area.model.train import prepare_chips, train_model
+    from roof_area.preprocess.chips import ChipShards
+
+    if settings.raster_path:
+        chips = prepare_chips(
+            settings.raster_path,
+            settings.footprints_path,
+            settings.chips_dir,
+            chip_size=settings.chip_size,
+            workers=settings.workers,
+            logger=logger,
+        )
+    else:
+        chips = ChipShards(settings.chips_dir)
+
+    if settings.model_path:
+        train_model(
+            chips,
+            settings.model_path,
+            epochs=settings.epochs,
+            batch_size=settings.batch_size,
+            learning_rate=settings.learning_rate,
+            workers=settings.loader_workers,
+            prefetch=settings.prefetch_batches,
+            seed=settings.seed,
+            threads=settings.model_threads,
+            logger=logger,
+        )
     return 0
 
 
@@ -64,7 +424,12 @@ def build_parser() -> argparse.ArgumentParser:
 
     infer_parser = subparsers.add_parser("infer", help="Run inference")
     _add_common_args(infer_parser)
-    infer_parser.add_argument("--raster", dest="raster_path", type=str, help="Input raster path")
+    infer_parser.add_argument(
+        "--raster",
+        dest="raster_path",
+        type=str,
+        help="Input raster, VRT, or a directory or quoted glob of adjacent rasters to mosaic",
+    )
     infer_parser.add_argument(
         "--footprints",
         dest="footprints_path",
@@ -83,14 +448,197 @@ def build_parser() -> argparse.ArgumentParser:
         type=str,
         help="Optional model path to enable ML inference",
     )
+    infer_parser.add_argument(
+        "--areas",
+        dest="areas_path",
+        type=str,
+        help="Per-building roof area table (CSV or Parquet)",
+    )
+    _add_inference_args(infer_parser)
+    infer_parser.add_argument(
+        "--truth",
+        dest="truth_path",
+        type=str,
+        help="Ground truth mask raster or roof polygons; adds IoU to a threshold sweep",
+    )
+    _add_sweep_args(infer_parser)
+    infer_parser.add_argument(
+        "--polygons",
+        dest="polygons_path",
+        type=str,
+        help="Also polygonize the mask into this layer (GeoParquet, FlatGeobuf, ...)",
+    )
+    _add_polygon_args(infer_parser)
+    infer_parser.add_argument(
+        "--report",
+        dest="report_path",
+        type=str,
+        help="JSON run report with wall/CPU time, bytes and peak RSS per stage and tile",
+    )
     infer_parser.set_defaults(func=_infer_command)
 
+    batch_parser = subparsers.add_parser("batch", help="Run inference over a manifest of rasters")
+    _add_common_args(batch_parser)
+    batch_parser.add_argument(
+        "--manifest",
+        dest="manifest_path",
+        type=str,
+        help="CSV with raster[,footprints,output,areas] columns",
+    )
+    batch_parser.add_argument(
+        "--state",
+        dest="state_path",
+        type=str,
+        help="Job state file used to resume (default: <manifest>.state.jsonl)",
+    )
+    batch_parser.add_argument("--jobs", type=int, help="Rasters processed in parallel")
+    batch_parser.add_argument(
+        "--model",
+        dest="model_path",
+        type=str,
+        help="Optional model path, loaded once per worker process",
+    )
+    _add_inference_args(batch_parser)
+    batch_parser.set_defaults(func=_batch_command)
+
     eval_parser = subparsers.add_parser("eval", help="Run evaluation")
     _add_common_args(eval_parser)
+    _add_executor_args(eval_parser)
+    eval_parser.add_argument("--pred", dest="pred_path", type=str, help="Predicted mask raster")
+    eval_parser.add_argument(
+        "--truth",
+        dest="truth_path",
+        type=str,
+        help="Ground truth mask raster or roof polygon layer",
+    )
+    eval_parser.add_argument(
+        "--footprints",
+        dest="footprints_path",
+        type=str,
+        help="Building footprints for per-building metrics",
+    )
+    eval_parser.add_argument(
+        "--manifest",
+        dest="manifest_path",
+        type=str,
+        help="CSV with pred,truth[,footprints] columns to evaluate many scenes",
+    )
+    eval_parser.add_argument(
+        "--output",
+        dest="summary_path",
+        type=str,
+        help="Evaluation summary JSON path",
+    )
+    eval_parser.add_argument(
+        "--tiles", dest="tiles_path", type=str, help="Per-tile metrics table (CSV or Parquet)"
+    )
+    eval_parser.add_argument(
+        "--buildings",
+        dest="buildings_path",
+        type=str,
+        help="Per-building metrics table (CSV or Parquet)",
+    )
+    eval_parser.add_argument(
+        "--raster",
+        dest="raster_path",
+        type=str,
+        help="Input raster for a threshold sweep",
+    )
+    _add_sweep_args(eval_parser)
     eval_parser.set_defaults(func=_eval_command)
 
-    train_parser = subparsers.add_parser("train", help="Run training")
+    serve_parser = subparsers.add_parser("serve", help="Serve AOI queries over HTTP")
+    _add_common_args(serve_parser)
+    serve_parser.add_argument(
+        "--raster",
+        dest="raster_path",
+        type=str,
+        help="Raster, VRT, or directory or glob of rasters to serve as one mosaic",
+    )
+    serve_parser.add_argument(
+        "--footprints",
+        dest="footprints_path",
+        type=str,
+        help="Building footprint vector path",
+    )
+    serve_parser.add_argument(
+        "--model", dest="model_path", type=str, help="Optional model, loaded once"
+    )
+    serve_parser.add_argument("--host", type=str, help="Address to bind")
+    serve_parser.add_argument("--port", type=int, help="Port to listen on")
+    serve_parser.add_argument(
+        "--gradient-sidecar",
+        action="store_true",
+        default=None,
+        help="Cache the gradient maximum in a <raster>.gradmax.json sidecar",
+    )
+    serve_parser.add_argument("--workers", type=int, help="Concurrent query workers")
+    serve_parser.add_argument(
+        "--batch-size", type=int, help="Model tiles per batch across concurrent queries"
+    )
+    serve_parser.add_argument(
+        "--model-threads", type=int, help="Intra-op threads for the model runtime"
+    )
+    serve_parser.set_defaults(func=_serve_command)
+
+    polygonize_parser = subparsers.add_parser(
+        "polygonize", help="Vectorize a roof mask into polygons"
+    )
+    _add_common_args(polygonize_parser)
+    polygonize_parser.add_argument(
+        "--mask", dest="mask_path", type=str, help="Roof mask raster (GeoTIFF)"
+    )
+    polygonize_parser.add_argument(
+        "--polygons",
+        dest="polygons_path",
+        type=str,
+        help="Output polygon layer (GeoParquet, FlatGeobuf, ...)",
+    )
+    _add_polygon_args(polygonize_parser)
+    polygonize_parser.set_defaults(func=_polygonize_command)
+
+    train_parser = subparsers.add_parser(
+        "train", help="Cut training chips into memory-mapped shards and train a model"
+    )
     _add_common_args(train_parser)
+    train_parser.add_argument(
+        "--raster",
+        dest="raster_path",
+        type=str,
+        help="Raster, or a directory or glob of rasters to mosaic, to cut training chips from",
+    )
+    train_parser.add_argument(
+        "--footprints",
+        dest="footprints_path",
+        type=str,
+        help="Building footprints rasterized into the label chips",
+    )
+    train_parser.add_argument(
+        "--chips",
+        dest="chips_dir",
+        type=str,
+        help="Chip shard directory, reused while the raster and footprints are unchanged",
+    )
+    train_parser.add_argument(
+        "--model",
+        dest="model_path",
+        type=str,
+        help="Save the trained TorchScript model here (omit to only cut chips)",
+    )
+    train_parser.add_argument("--chip-size", type=int, help="Chip size in pixels")
+    train_parser.add_argument("--epochs", type=int, help="Training epochs")
+    train_parser.add_argument("--learning-rate", type=float, help="Adam learning rate")
+    train_parser.add_argument("--batch-size", type=int, help="Chips per training batch")
+    train_parser.add_argument(
+        "--loader-workers", type=int, help="Threads loading batches from the shards"
+    )
+    train_parser.add_argument(
+        "--prefetch", dest="prefetch_batches", type=int, help="Batches loaded ahead"
+    )
+    train_parser.add_argument("--workers", type=int, help="Threads cutting chips")
+    train_parser.add_argument(
+        "--model-threads", type=int, help="Intra-op threads for torch"
+    )
     train_parser.set_defaults(func=_train_command)
 
     return parser
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from typing import Literal
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -15,9 +17,78 @@ class RoofAreaSettings(BaseSettings):
     tile_size: int = Field(512, ge=64, description="Tile size in pixels")
     overlap: int = Field(32, ge=0, description="Tile overlap in pixels")
     min_area_m2: float = Field(5.0, ge=0.0, description="Minimum roof area in m²")
+    gradient_overviews: bool = Field(
+        False,
+        description="Estimate the gradient normalization maximum from raster overviews",
+    )
+    gradient_sidecar: bool = Field(
+        False, description="Cache the gradient normalization maximum in a sidecar file"
+    )
+    sparse: bool = Field(
+        False, description="Only process tiles that intersect building footprints"
+    )
+    incremental: bool = Field(
+        False,
+        description="Patch the previous mask where footprints changed since its snapshot",
+    )
+    cache_max_gb: float = Field(
+        10.0, gt=0, description="Size limit of the intermediate cache in GiB"
+    )
+    simplify_tolerance: float = Field(
+        0.0, ge=0.0, description="Polygon simplification tolerance in CRS units"
+    )
+    morph_open: int = Field(
+        0, ge=0, description="Radius in pixels of the opening applied before polygonizing"
+    )
+    morph_close: int = Field(
+        0, ge=0, description="Radius in pixels of the closing applied before polygonizing"
+    )
+    jobs: int = Field(1, ge=1, description="Batch items processed in parallel")
+    workers: int = Field(1, ge=1, description="Number of parallel workers")
+    executor: Literal["thread", "process"] = Field(
+        "thread", description="Parallel executor backend"
+    )
+    batch_size: int = Field(8, ge=1, description="Tiles per model inference or training batch")
+    chip_size: int = Field(256, ge=16, description="Training chip size in pixels")
+    epochs: int = Field(10, ge=1, description="Training epochs")
+    learning_rate: float = Field(1e-3, gt=0.0, description="Training learning rate")
+    loader_workers: int = Field(2, ge=1, description="Threads loading training batches")
+    prefetch_batches: int = Field(
+        4, ge=1, description="Training batches loaded ahead of the model"
+    )
+    model_threads: int | None = Field(
+        None, ge=1, description="Intra-op threads for the model runtime"
+    )
+    read_prefetch: int = Field(
+        4, ge=0, description="Tiles read ahead on background threads by model inference"
+    )
+    gdal_cache_mb: int | None = Field(
+        None, ge=1, description="GDAL block cache size in MiB (GDAL default: 5% of RAM)"
+    )
+    gdal_threads: int | Literal["ALL_CPUS"] | None = Field(
+        None, description="Threads GDAL uses to decode compressed blocks, or ALL_CPUS"
+    )
+    output_block_size: int = Field(
+        512, ge=16, multiple_of=16, description="Internal tile size of output masks"
+    )
+    output_compress: Literal["deflate", "zstd", "lzw", "none"] = Field(
+        "deflate", description="Compression of output masks"
+    )
+    output_nbits: Literal[1, 8] = Field(8, description="Bits per pixel of output masks")
+    output_overviews: bool = Field(False, description="Build overviews for output masks")
+    output_cog: bool = Field(False, description="Write output masks as Cloud-Optimized GeoTIFF")
+    sweep: str | None = Field(
+        None, description="Thresholds to sweep, as 'start:stop:step' or a comma list"
+    )
     seed: int = Field(42, description="Random seed")
     log_level: str = Field("INFO", description="Logging level")
-    raster_path: str | None = Field(None, description="Path to input raster")
+    log_format: Literal["text", "json"] = Field(
+        "text", description="Log line format; json emits one object per record"
+    )
+    raster_path: str | None = Field(
+        None,
+        description="Path to the input raster, a VRT, or a directory or glob of rasters to mosaic",
+    )
     footprints_path: str | None = Field(
         None, description="Path to building footprint vector data"
     )
@@ -25,3 +96,33 @@ class RoofAreaSettings(BaseSettings):
     model_path: str | None = Field(
         None, description="Optional path to a trained ML model"
     )
+    mask_path: str | None = Field(None, description="Roof mask raster to polygonize")
+    polygons_path: str | None = Field(
+        None, description="Path to the roof polygon layer (GeoParquet or OGR format)"
+    )
+    areas_path: str | None = Field(
+        None, description="Path to the per-building roof area table (CSV or Parquet)"
+    )
+    pred_path: str | None = Field(None, description="Predicted mask raster to evaluate")
+    truth_path: str | None = Field(
+        None, description="Ground truth mask raster or roof polygon layer"
+    )
+    manifest_path: str | None = Field(None, description="CSV manifest of scenes")
+    summary_path: str | None = Field(None, description="Path to the evaluation summary JSON")
+    tiles_path: str | None = Field(None, description="Path to the per-tile metrics table")
+    buildings_path: str | None = Field(
+        None, description="Path to the per-building metrics table"
+    )
+    sweep_path: str | None = Field(None, description="Path to the threshold sweep table")
+    state_path: str | None = Field(None, description="Path to the batch job state file")
+    report_path: str | None = Field(
+        None, description="Path to the JSON run report with per-stage timings"
+    )
+    cache_dir: str | None = Field(
+        None, description="Directory of the content-addressed intermediate cache"
+    )
+    chips_dir: str | None = Field(
+        None, description="Directory of the memory-mapped training chip shards"
+    )
+    host: str = Field("127.0.0.1", description="Address the HTTP service binds to")
+    port: int = Field(8080, ge=0, le=65535, description="Port of the HTTP service")
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+
+DEFAULT_CACHE_BYTES = 10 * 1024**3
+_DIGEST_CHUNK = 4 * 1024**2
+
+
+@dataclass
+class CacheEntry:
+    """A cached array (memory-mapped) and its JSON metadata."""
+
+    array: np.ndarray
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class ArrayCache:
+    """Content-addressed on-disk cache of arrays stored as memory-mappable ``.npy`` files.
+
+    Keys hash the content digests and parameters an array was computed from, so
+    a changed input simply misses. Reads refresh an entry's modification time.
+    Writes evict the least recently used entries once the cache holds more
+    than ``max_bytes``.
+    """
+
+    def __init__(self, root: str, *, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def key(self, kind: str, **parts: Any) -> str:
+        payload = json.dumps(parts, sort_keys=True, default=str).encode()
+        return f"{kind}-{hashlib.sha256(payload).hexdigest()[:32]}"
+
+    def digest(self, path: str) -> str:
+        """Return a content hash of a file or directory, memoized by size and mtime."""
+        target = Path(path).resolve()
+        files = sorted(p for p in target.rglob("*") if p.is_file()) if target.is_dir() else [target]
+        stamp = [(str(p), p.stat().st_size, p.stat().st_mtime_ns) for p in files]
+        memo = self.root / "digests" / f"{self.key('digest', stamp=stamp)}.txt"
+        try:
+            return memo.read_text()
+        except OSError:
+            pass
+
+        hasher = hashlib.blake2b(digest_size=16)
+        for file in files:
+            hasher.update(str(file.relative_to(target) if target.is_dir() else "").encode())
+            with file.open("rb") as handle:
+                for chunk in iter(lambda: handle.read(_DIGEST_CHUNK), b""):
+                    hasher.update(chunk)
+        digest = hasher.hexdigest()
+        memo.parent.mkdir(exist_ok=True)
+        memo.write_text(digest)
+        return digest
+
+    def get(self, key: str) -> CacheEntry | None:
+        """Return the memory-mapped entry for ``key``, or ``None`` on a miss."""
+        array_path, metadata_path = self._paths(key)
+        try:
+            metadata = json.loads(metadata_path.read_text())
+            array = np.load(array_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        os.utime(array_path)
+        return CacheEntry(array, metadata)
+
+    @contextmanager
+    def create(self, key: str, shape: Tuple[int, ...], dtype: Any) -> Iterator[CacheEntry]:
+        """Yield a writable memory-mapped entry that is published when the block exits.
+
+        The array is written under a temporary name and renamed into place last,
+        so readers never see a partial entry.
+        """
+        array_path, metadata_path = self._paths(key)
+        partial = array_path.with_name(f"{array_path.name}.partial")
+        entry = CacheEntry(open_memmap(partial, mode="w+", dtype=dtype, shape=shape))
+        try:
+            yield entry
+            entry.array.flush()
+            metadata_path.write_text(json.dumps(entry.metadata))
+            os.replace(partial, array_path)
+        finally:
+            partial.unlink(missing_ok=True)
+        self.evict(keep=key)
+
+    def evict(self, *, keep: str | None = None) -> None:
+        """Delete least recently used entries until the cache fits in ``max_bytes``."""
+        entries = []
+        for array_path in self.root.glob("*.npy"):
+            metadata_path = array_path.with_suffix(".json")
+            try:
+                stat = array_path.stat()
+                size = stat.st_size
+                if metadata_path.exists():
+                    size += metadata_path.stat().st_size
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, size, array_path.stem))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for path in self._paths(key):
+                path.unlink(missing_ok=True)
+            total -= size
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        return self.root / f"{key}.npy", self.root / f"{key}.json"
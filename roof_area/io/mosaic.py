@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import logging
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+import numpy as np
+import rasterio
+from affine import Affine
+
+
+Bounds = Tuple[float, float, float, float]
+
+# Files picked up from a mosaic directory. VRTs are left out, so the mosaic VRT
+# written for a directory never becomes one of its own sources.
+MOSAIC_SUFFIXES = (".tif", ".tiff", ".jp2", ".img")
+# Largest offset from the common pixel grid, in pixels, still treated as aligned.
+_GRID_TOLERANCE = 1e-3
+_GDAL_TYPES = {
+    "uint8": "Byte",
+    "int8": "Int8",
+    "uint16": "UInt16",
+    "int16": "Int16",
+    "uint32": "UInt32",
+    "int32": "Int32",
+    "uint64": "UInt64",
+    "int64": "Int64",
+    "float32": "Float32",
+    "float64": "Float64",
+}
+
+
+@dataclass(frozen=True)
+class MosaicSource:
+    """One source raster and its pixel rectangle in the mosaic grid."""
+
+    path: str
+    bounds: Bounds
+    col_off: int
+    row_off: int
+    width: int
+    height: int
+    block_shape: Tuple[int, int]
+
+
+class MosaicIndex:
+    """Adjacent rasters placed on one pixel grid, with their offsets in it.
+
+    All sources must share CRS, resolution, band count, data type and nodata,
+    and be offset from each other by whole pixels. The mosaic grid is the union
+    of their extents; where sources overlap, later ones (in path order) win.
+    """
+
+    def __init__(self, paths: Sequence[str]) -> None:
+        if not paths:
+            raise ValueError("A raster mosaic needs at least one source raster.")
+        headers = []
+        for path in paths:
+            with rasterio.open(path) as dataset:
+                layout = (dataset.crs, dataset.count, dataset.dtypes[0], dataset.nodata)
+                headers.append(
+                    (
+                        str(Path(path).resolve()),
+                        dataset.transform,
+                        dataset.width,
+                        dataset.height,
+                        tuple(dataset.block_shapes[0]),
+                        layout,
+                    )
+                )
+                if len(headers) == 1:
+                    self.colorinterp = [color.name for color in dataset.colorinterp]
+        self.crs, self.count, dtype, self.nodata = headers[0][5]
+        self.dtype = np.dtype(dtype)
+
+        first = headers[0]
+        res_x, res_y = first[1].a, first[1].e
+        for path, transform, _, _, _, layout in headers:
+            if layout != first[5]:
+                raise ValueError(
+                    f"Mosaic source {path} differs from {first[0]} in CRS, band count, "
+                    "data type or nodata."
+                )
+            if transform.b or transform.d:
+                raise ValueError(f"Mosaic source {path} is rotated; only north-up rasters mosaic.")
+            if not (math.isclose(transform.a, res_x) and math.isclose(transform.e, res_y)):
+                raise ValueError(
+                    f"Mosaic source {path} has a different resolution than {first[0]}."
+                )
+
+        left = min(header[1].c for header in headers)
+        top = max(header[1].f for header in headers)
+        self.transform = Affine(res_x, 0.0, left, 0.0, res_y, top)
+        self.sources: List[MosaicSource] = []
+        for path, transform, width, height, block_shape, _ in headers:
+            col_off = _grid_offset(path, (transform.c - left) / res_x)
+            row_off = _grid_offset(path, (transform.f - top) / res_y)
+            x0, y0 = transform * (0, 0)
+            x1, y1 = transform * (width, height)
+            self.sources.append(
+                MosaicSource(
+                    path=path,
+                    bounds=(min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)),
+                    col_off=col_off,
+                    row_off=row_off,
+                    width=width,
+                    height=height,
+                    block_shape=block_shape,
+                )
+            )
+        self.width = max(source.col_off + source.width for source in self.sources)
+        self.height = max(source.row_off + source.height for source in self.sources)
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    @property
+    def bounds(self) -> Bounds:
+        x0, y0 = self.transform * (0, 0)
+        x1, y1 = self.transform * (self.width, self.height)
+        return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+    def to_vrt(self) -> str:
+        """Return a GDAL VRT that reads every window from the sources it overlaps.
+
+        The VRT records the size and modification time of every source, so its
+        text, and with it cache and snapshot keys, changes when a source does.
+        """
+        data_type = _GDAL_TYPES[self.dtype.name]
+        keys = [_file_key(source.path) for source in self.sources]
+        digest = hashlib.blake2b(json.dumps(keys).encode(), digest_size=16).hexdigest()
+        lines = [
+            f'<VRTDataset rasterXSize="{self.width}" rasterYSize="{self.height}">',
+        ]
+        if self.crs is not None:
+            lines.append(f"  <SRS>{escape(self.crs.to_wkt())}</SRS>")
+        geotransform = self.transform.to_gdal()
+        lines.append(f"  <GeoTransform>{', '.join(repr(v) for v in geotransform)}</GeoTransform>")
+        lines.append(f'  <Metadata><MDI key="ROOF_AREA_SOURCES">{digest}</MDI></Metadata>')
+        source_tag = "SimpleSource" if self.nodata is None else "ComplexSource"
+        for band in range(1, self.count + 1):
+            lines.append(f'  <VRTRasterBand dataType="{data_type}" band="{band}">')
+            if self.nodata is not None:
+                lines.append(f"    <NoDataValue>{self.nodata!r}</NoDataValue>")
+            lines.append(f"    <ColorInterp>{self.colorinterp[band - 1].title()}</ColorInterp>")
+            for source in self.sources:
+                block_y, block_x = source.block_shape
+                lines.extend(
+                    [
+                        f"    <{source_tag}>",
+                        "      <SourceFilename relativeToVRT=\"0\">"
+                        f"{escape(source.path)}</SourceFilename>",
+                        f"      <SourceBand>{band}</SourceBand>",
+                        f'      <SourceProperties RasterXSize="{source.width}" '
+                        f'RasterYSize="{source.height}" DataType="{data_type}" '
+                        f'BlockXSize="{block_x}" BlockYSize="{block_y}"/>',
+                        f'      <SrcRect xOff="0" yOff="0" xSize="{source.width}" '
+                        f'ySize="{source.height}"/>',
+                        f'      <DstRect xOff="{source.col_off}" yOff="{source.row_off}" '
+                        f'xSize="{source.width}" ySize="{source.height}"/>',
+                    ]
+                )
+                if self.nodata is not None:
+                    lines.append(f"      <NODATA>{self.nodata!r}</NODATA>")
+                lines.append(f"    </{source_tag}>")
+            lines.append("  </VRTRasterBand>")
+        lines.append("</VRTDataset>")
+        return "\n".join(lines) + "\n"
+
+
+def is_mosaic_input(path: str) -> bool:
+    """Return whether ``path`` names several rasters: a directory or a glob pattern.
+
+    An existing file is never a pattern, even if its name contains ``[``, ``*``
+    or ``?``.
+    """
+    target = Path(path)
+    if target.is_dir():
+        return True
+    return not target.exists() and glob.has_magic(path)
+
+
+def mosaic_sources(path: str, *, exclude: Iterable[str] = ()) -> List[str]:
+    """Return the sorted raster files of a mosaic directory or glob pattern."""
+    excluded = {Path(item).resolve() for item in exclude}
+    if Path(path).is_dir():
+        candidates = [
+            item for item in Path(path).iterdir() if item.suffix.lower() in MOSAIC_SUFFIXES
+        ]
+    else:
+        candidates = [Path(item) for item in glob.glob(path, recursive=True)]
+    paths = sorted(
+        str(item) for item in candidates if item.is_file() and item.resolve() not in excluded
+    )
+    if not paths:
+        raise ValueError(f"No source rasters found for mosaic {path}.")
+    return paths
+
+
+def mosaic_vrt_path(output_path: str) -> str:
+    """Return where the mosaic VRT for a mask is kept: ``<mask>.mosaic.vrt``."""
+    return str(Path(output_path).with_suffix("")) + ".mosaic.vrt"
+
+
+def resolve_raster(
+    path: str,
+    vrt_path: str,
+    *,
+    exclude: Iterable[str] = (),
+    logger: logging.Logger | None = None,
+) -> str:
+    """Return a single-dataset path for ``path``, writing a mosaic VRT if needed.
+
+    Single rasters and VRTs are returned unchanged. A directory or glob becomes
+    a :class:`MosaicIndex` written as a VRT to ``vrt_path``, so every window read
+    spans source seams without merging the sources. The VRT is only rewritten
+    when its content changes, which keeps its modification time stable.
+    """
+    if not is_mosaic_input(path):
+        return path
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    mosaic = MosaicIndex(mosaic_sources(path, exclude=[*exclude, vrt_path]))
+    text = mosaic.to_vrt()
+    target = Path(vrt_path)
+    if not target.is_file() or target.read_text() != text:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        staging = target.with_name(f".{target.name}.partial")
+        staging.write_text(text)
+        staging.replace(target)
+    logger.info(
+        "Mosaicking %d rasters from %s into a %dx%d grid via %s",
+        len(mosaic),
+        path,
+        mosaic.width,
+        mosaic.height,
+        vrt_path,
+    )
+    return str(target)
+
+
+def _grid_offset(path: str, offset: float) -> int:
+    pixels = round(offset)
+    if abs(offset - pixels) > _GRID_TOLERANCE:
+        raise ValueError(
+            f"Mosaic source {path} is not on the pixel grid of the other sources "
+            f"(offset {offset:.4f} pixels); resample it onto a common grid first."
+        )
+    return int(pixels)
+
+
+def _file_key(path: str) -> Tuple[str, int, int]:
+    stat = Path(path).stat()
+    return path, stat.st_size, stat.st_mtime_ns
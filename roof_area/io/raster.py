@@ -1,15 +1,32 @@
 from __future__ import annotations
 
-from typing import Tuple
+import math
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
 
 import numpy as np
 import rasterio
+import rasterio.shutil
 from numpy.typing import NDArray
+from rasterio.enums import Resampling
+from rasterio.env import set_gdal_config
 from rasterio.windows import Window, from_bounds
 
+from roof_area.pipeline.profiling import stage
+
 
 Bounds = Tuple[float, float, float, float]
 
+MASK_COMPRESSIONS = ("deflate", "zstd", "lzw", "none")
+# Prefetch reads cover whole blocks, grown to at least this many pixels per side
+# so rasters with tiny blocks or one-row strips are not read a row at a time.
+MIN_READ_UNIT = 256
+
 
 def open_raster(path: str) -> rasterio.io.DatasetReader:
     """Open a raster dataset and return the rasterio dataset reader."""
@@ -17,7 +34,11 @@ def open_raster(path: str) -> rasterio.io.DatasetReader:
 
 
 def get_pixel_size_m(dataset: rasterio.io.DatasetReader) -> Tuple[float, float]:
-    """Return the absolute pixel size (x, y) in meters for a dataset."""
+    """Return the absolute pixel size (x, y) of a dataset in its CRS units.
+
+    These are meters for metric CRSs only; geographic rasters need
+    :func:`roof_area.metrics.area.pixel_row_areas` for areas.
+    """
     transform = dataset.transform
     return abs(transform.a), abs(transform.e)
 
@@ -30,3 +51,311 @@ def read_window(
     window = from_bounds(*bounds_crs, transform=dataset.transform)
     data = dataset.read(window=window)
     return window, data
+
+
+def configure_gdal(*, cache_mb: int | None = None, threads: int | str | None = None) -> None:
+    """Set GDAL's block cache size and decoding threads for reads in this process.
+
+    ``threads`` is a thread count or ``"ALL_CPUS"`` for codecs that decode in
+    parallel (e.g. GeoTIFF with DEFLATE or ZSTD). The options are exported to
+    the environment as well, so process-pool workers started later inherit
+    them.
+    """
+    if cache_mb is not None:
+        cache_bytes = int(cache_mb) * 1024**2
+        # Exported in bytes: GDAL reads values below 100000 as megabytes.
+        os.environ["GDAL_CACHEMAX"] = str(cache_bytes)
+        set_gdal_config("GDAL_CACHEMAX", cache_bytes)
+    if threads is not None:
+        os.environ["GDAL_NUM_THREADS"] = str(threads)
+        set_gdal_config("GDAL_NUM_THREADS", str(threads))
+
+
+def prefetch_windows(
+    path: str,
+    windows: Iterable[Window],
+    *,
+    indexes: int | Sequence[int] | None = None,
+    depth: int = 4,
+    workers: int = 2,
+) -> Iterator[Tuple[Window, NDArray[np.generic]]]:
+    """Yield ``(window, data)`` for every window, reading up to ``depth`` windows ahead.
+
+    Reads run on ``workers`` background threads, each with its own dataset
+    handle, so GDAL decompresses the next windows while the caller works on
+    the current one. Windows are cut from read units aligned to the raster's
+    internal blocks. Each unit is read once and dropped after the last window
+    that needs it, so overlapping tiles and halos never decode a block twice.
+    Windows must lie inside the raster. With ``depth`` 0 every window is read
+    inline.
+    """
+    windows = list(windows)
+    if depth <= 0:
+        with rasterio.open(path) as dataset:
+            for window in windows:
+                with stage("read") as record:
+                    data = dataset.read(indexes, window=window)
+                    record.bytes_read += data.nbytes
+                yield window, data
+        return
+
+    with LocalRaster(path) as raster:
+        dataset = raster.get()
+        unit_height, unit_width = _read_unit(dataset)
+        needs = [_window_units(window, unit_height, unit_width) for window in windows]
+        last_use = {unit: position for position, used in enumerate(needs) for unit in used}
+
+        units: Dict[Tuple[int, int], Future] = {}
+        submitted = 0
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="roof-area-read") as pool:
+            for position, window in enumerate(windows):
+                while submitted < min(len(windows), position + depth + 1):
+                    for unit in needs[submitted]:
+                        if unit not in units:
+                            units[unit] = pool.submit(
+                                _read_unit_block, raster, unit, unit_height, unit_width, indexes
+                            )
+                    submitted += 1
+                data = _assemble(
+                    window,
+                    {unit: units[unit].result() for unit in needs[position]},
+                    unit_height,
+                    unit_width,
+                )
+                for unit in needs[position]:
+                    if last_use[unit] == position:
+                        del units[unit]
+                yield window, data
+
+
+def _read_unit(dataset: rasterio.io.DatasetReader) -> Tuple[int, int]:
+    block_height, block_width = dataset.block_shapes[0]
+    return (
+        block_height * max(1, math.ceil(min(MIN_READ_UNIT, dataset.height) / block_height)),
+        block_width * max(1, math.ceil(min(MIN_READ_UNIT, dataset.width) / block_width)),
+    )
+
+
+def _window_units(window: Window, unit_height: int, unit_width: int) -> List[Tuple[int, int]]:
+    row_start, col_start = int(window.row_off), int(window.col_off)
+    row_stop, col_stop = row_start + int(window.height), col_start + int(window.width)
+    return [
+        (row, col)
+        for row in range(row_start // unit_height, (row_stop - 1) // unit_height + 1)
+        for col in range(col_start // unit_width, (col_stop - 1) // unit_width + 1)
+    ]
+
+
+def _read_unit_block(
+    raster: LocalRaster,
+    unit: Tuple[int, int],
+    unit_height: int,
+    unit_width: int,
+    indexes: int | Sequence[int] | None,
+) -> NDArray[np.generic]:
+    dataset = raster.get()
+    row_off, col_off = unit[0] * unit_height, unit[1] * unit_width
+    window = Window(
+        col_off,
+        row_off,
+        min(unit_width, dataset.width - col_off),
+        min(unit_height, dataset.height - row_off),
+    )
+    with stage("read") as record:
+        data = dataset.read(indexes, window=window)
+        record.bytes_read += data.nbytes
+    return data
+
+
+def _assemble(
+    window: Window,
+    blocks: Dict[Tuple[int, int], NDArray[np.generic]],
+    unit_height: int,
+    unit_width: int,
+) -> NDArray[np.generic]:
+    first = next(iter(blocks.values()))
+    row_off, col_off = int(window.row_off), int(window.col_off)
+    height, width = int(window.height), int(window.width)
+    out = np.empty((*first.shape[:-2], height, width), dtype=first.dtype)
+    for (row, col), block in blocks.items():
+        top, left = row * unit_height - row_off, col * unit_width - col_off
+        rows = slice(max(top, 0), min(top + block.shape[-2], height))
+        cols = slice(max(left, 0), min(left + block.shape[-1], width))
+        out[..., rows, cols] = block[
+            ..., rows.start - top : rows.stop - top, cols.start - left : cols.stop - left
+        ]
+    return out
+
+
+class LocalRaster:
+    """Picklable raster handle that lazily opens one dataset per thread.
+
+    rasterio datasets must not be shared between threads, so tile workers call
+    :meth:`get` to obtain their own reader for ``path``. :meth:`close` closes
+    every reader opened through this handle and must run once the workers
+    have finished.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._setup()
+
+    def _setup(self) -> None:
+        self._local = threading.local()
+        self._opened: List[rasterio.io.DatasetReader] = []
+        self._lock = threading.Lock()
+
+    def get(self) -> rasterio.io.DatasetReader:
+        dataset = getattr(self._local, "dataset", None)
+        if dataset is None or dataset.closed:
+            dataset = open_raster(self.path)
+            self._local.dataset = dataset
+            with self._lock:
+                self._opened.append(dataset)
+        return dataset
+
+    def close(self) -> None:
+        with self._lock:
+            opened, self._opened = self._opened, []
+        for dataset in opened:
+            dataset.close()
+
+    def __enter__(self) -> "LocalRaster":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __getstate__(self) -> dict:
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict) -> None:
+        self.path = state["path"]
+        self._setup()
+
+
+def snap_window(dataset: rasterio.io.DatasetReader, bounds: Bounds) -> Window:
+    """Return the whole-pixel window covering ``bounds``, clipped to the raster.
+
+    Raises ``ValueError`` when the bounds do not overlap the raster.
+    """
+    window = from_bounds(*bounds, transform=dataset.transform)
+    col_start = max(int(np.floor(window.col_off)), 0)
+    row_start = max(int(np.floor(window.row_off)), 0)
+    col_stop = min(int(np.ceil(window.col_off + window.width)), dataset.width)
+    row_stop = min(int(np.ceil(window.row_off + window.height)), dataset.height)
+    if col_stop <= col_start or row_stop <= row_start:
+        raise ValueError(f"Bounds {bounds} do not overlap the raster extent {tuple(dataset.bounds)}.")
+    return Window(
+        col_off=col_start,
+        row_off=row_start,
+        width=col_stop - col_start,
+        height=row_stop - row_start,
+    )
+
+
+@dataclass(frozen=True)
+class MaskOutputOptions:
+    """Layout and compression of the uint8 mask rasters written by inference."""
+
+    block_size: int = 512
+    compress: str = "deflate"
+    nbits: int = 8
+    overviews: bool = False
+    cog: bool = False
+
+    def __post_init__(self) -> None:
+        if self.compress not in MASK_COMPRESSIONS:
+            raise ValueError(
+                f"Unknown compression '{self.compress}'. Expected one of {MASK_COMPRESSIONS}."
+            )
+        if self.nbits not in (1, 8):
+            raise ValueError(f"nbits must be 1 or 8, got {self.nbits}.")
+        if self.block_size < 16 or self.block_size % 16:
+            raise ValueError(f"block_size must be a positive multiple of 16, got {self.block_size}.")
+
+    def creation_options(self) -> dict:
+        """Return GTiff/COG creation options shared by both drivers."""
+        options = {}
+        if self.compress != "none":
+            options["compress"] = self.compress
+            # Horizontal differencing turns runs of equal mask values into zeros.
+            # It needs byte-aligned samples, so 1-bit masks go without it.
+            if self.nbits == 8:
+                options["predictor"] = 2
+        if self.nbits == 1:
+            options["nbits"] = 1
+        return options
+
+
+def mask_profile(
+    dataset: rasterio.io.DatasetReader,
+    options: MaskOutputOptions | None = None,
+) -> dict:
+    """Return a tiled single-band uint8 GeoTIFF profile on the grid of ``dataset``."""
+    options = options or MaskOutputOptions()
+    return {
+        "driver": "GTiff",
+        "width": dataset.width,
+        "height": dataset.height,
+        "count": 1,
+        "dtype": rasterio.uint8,
+        "crs": dataset.crs,
+        "transform": dataset.transform,
+        "tiled": True,
+        "blockxsize": options.block_size,
+        "blockysize": options.block_size,
+        "BIGTIFF": "IF_SAFER",
+        **options.creation_options(),
+    }
+
+
+@contextmanager
+def open_mask_writer(
+    path: str,
+    dataset: rasterio.io.DatasetReader,
+    options: MaskOutputOptions | None = None,
+) -> Iterator[rasterio.io.DatasetWriter]:
+    """Open a tiled, compressed mask GeoTIFF for incremental per-window writes.
+
+    Overviews are built once all windows are written. With ``options.cog`` the
+    windows go to a temporary GeoTIFF next to ``path``, which is then copied
+    into Cloud-Optimized GeoTIFF layout (overviews included) and removed.
+    """
+    options = options or MaskOutputOptions()
+    target = Path(path)
+    staging = target.with_name(f".{target.name}.partial.tif") if options.cog else target
+
+    try:
+        with rasterio.open(staging, "w", **mask_profile(dataset, options)) as dst:
+            yield dst
+            if options.overviews or options.cog:
+                factors = overview_factors(dst.width, dst.height, options.block_size)
+                if factors:
+                    dst.build_overviews(factors, Resampling.nearest)
+        if options.cog:
+            rasterio.shutil.copy(
+                staging,
+                target,
+                driver="COG",
+                blocksize=options.block_size,
+                overviews="FORCE_USE_EXISTING",
+                BIGTIFF="IF_SAFER",
+                **{
+                    key: "YES" if key == "predictor" else value
+                    for key, value in options.creation_options().items()
+                },
+            )
+    finally:
+        if staging != target:
+            staging.unlink(missing_ok=True)
+
+
+def overview_factors(width: int, height: int, block_size: int) -> List[int]:
+    """Return power-of-two overview factors until the image fits in one block."""
+    factors = []
+    factor = 2
+    while max(width, height) / (factor // 2) > block_size:
+        factors.append(factor)
+        factor *= 2
+    return factors
@@ -1,12 +1,21 @@
 from __future__ import annotations
 
-from typing import Tuple
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, Tuple
 
+import geopandas as gpd
+import pyogrio
 from pyproj import CRS, Transformer
 
+if TYPE_CHECKING:
+    import pyarrow as pa
+
 
 Bounds = Tuple[float, float, float, float]
 
+GEOPARQUET_SUFFIXES = (".parquet", ".geoparquet")
+
 
 def reproject_bounds(bounds: Bounds, src_crs: CRS | str, dst_crs: CRS | str) -> Bounds:
     """Reproject bounding box coordinates from src_crs to dst_crs."""
@@ -18,3 +27,153 @@ def reproject_bounds(bounds: Bounds, src_crs: CRS | str, dst_crs: CRS | str) ->
     txs, tys = transformer.transform(xs, ys)
 
     return min(txs), min(tys), max(txs), max(tys)
+
+
+def read_footprints(
+    path: str,
+    *,
+    bounds: Bounds | None = None,
+    bounds_crs: CRS | str | None = None,
+) -> gpd.GeoDataFrame:
+    """Read footprints intersecting ``bounds``, filtering inside the reader.
+
+    ``bounds`` are reprojected into the footprint CRS and pushed down as a bbox
+    filter. GDAL uses the layer's spatial index (FlatGeobuf, GeoPackage,
+    shapefile ``.qix``). GeoParquet is filtered on its bbox covering column or
+    row group statistics. I/O therefore scales with the area of interest, not
+    the size of the layer.
+    """
+    bbox = None
+    footprint_crs = read_vector_crs(path) if bounds is not None else None
+    if footprint_crs is not None and bounds_crs is not None:
+        if footprint_crs == CRS.from_user_input(bounds_crs):
+            bbox = tuple(bounds)
+        else:
+            bbox = reproject_bounds(bounds, bounds_crs, footprint_crs)
+
+    if _is_geoparquet(path):
+        return gpd.read_parquet(path, bbox=bbox)
+    return gpd.read_file(path, bbox=bbox)
+
+
+def read_vector_crs(path: str) -> CRS | None:
+    """Return the CRS of a vector layer without reading its features."""
+    if _is_geoparquet(path):
+        return _geoparquet_crs(path)
+
+    crs = pyogrio.read_info(path)["crs"]
+    return CRS.from_user_input(crs) if crs else None
+
+
+def write_vector_chunks(chunks: Iterable[gpd.GeoDataFrame], path: str) -> int:
+    """Stream GeoDataFrame chunks with a shared schema into one layer; return the row count.
+
+    GeoParquet is written one row group per chunk with a bbox covering column.
+    Other formats go through a single OGR Arrow stream, so FlatGeobuf builds its
+    spatial index once at the end. Only one chunk is in memory at a time.
+    Requires pyarrow.
+    """
+    import pyarrow as pa
+
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        raise ValueError("write_vector_chunks needs at least one (possibly empty) chunk.")
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.exists():
+        target.unlink()
+
+    rows = 0
+
+    def batches() -> Iterator[pa.RecordBatch]:
+        nonlocal rows
+        for chunk in _prepend(first, chunks):
+            rows += len(chunk)
+            yield from pa.table(chunk.to_arrow(index=False, geometry_encoding="WKB")).to_batches()
+
+    schema = pa.table(first.iloc[:0].to_arrow(index=False, geometry_encoding="WKB")).schema
+    if _is_geoparquet(path):
+        _write_geoparquet_batches(batches(), target, schema, first)
+    else:
+        pyogrio.write_arrow(
+            pa.RecordBatchReader.from_batches(schema, batches()),
+            str(target),
+            geometry_name=first.geometry.name,
+            geometry_type=_geometry_type(first),
+            crs=first.crs.to_wkt() if first.crs else None,
+        )
+    return rows
+
+
+def _write_geoparquet_batches(
+    batches: Iterator[pa.RecordBatch],
+    target: Path,
+    schema: pa.Schema,
+    first: gpd.GeoDataFrame,
+) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import shapely
+
+    geometry = first.geometry.name
+    bbox_type = pa.struct([(name, pa.float64()) for name in ("xmin", "ymin", "xmax", "ymax")])
+    geo = {
+        "version": "1.1.0",
+        "primary_column": geometry,
+        "columns": {
+            geometry: {
+                "encoding": "WKB",
+                "geometry_types": [_geometry_type(first)] if len(first) else [],
+                "crs": first.crs.to_json_dict() if first.crs else None,
+                "covering": {
+                    "bbox": {key: ["bbox", key] for key in ("xmin", "ymin", "xmax", "ymax")}
+                },
+            }
+        },
+    }
+    schema = pa.schema(
+        [field.remove_metadata() for field in schema] + [pa.field("bbox", bbox_type)],
+        metadata={b"geo": json.dumps(geo).encode()},
+    )
+    with pq.ParquetWriter(target, schema) as writer:
+        for batch in batches:
+            wkb = batch.column(geometry).to_numpy(zero_copy_only=False)
+            bounds = shapely.bounds(shapely.from_wkb(wkb))
+            bbox = pa.StructArray.from_arrays(
+                [pa.array(bounds[:, index], pa.float64()) for index in range(4)],
+                fields=list(bbox_type),
+            )
+            writer.write_batch(
+                pa.RecordBatch.from_arrays([*batch.columns, bbox], schema=schema)
+            )
+
+
+def _geometry_type(gdf: gpd.GeoDataFrame) -> str:
+    types = gdf.geom_type.unique()
+    return types[0] if len(types) == 1 else "Unknown"
+
+
+def _prepend(
+    first: gpd.GeoDataFrame,
+    rest: Iterator[gpd.GeoDataFrame],
+) -> Iterator[gpd.GeoDataFrame]:
+    yield first
+    yield from rest
+
+
+def _is_geoparquet(path: str) -> bool:
+    return Path(path).suffix.lower() in GEOPARQUET_SUFFIXES
+
+
+def _geoparquet_crs(path: str) -> CRS | None:
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_schema(path).metadata or {}
+    geo = json.loads(metadata.get(b"geo", b"{}"))
+    column = geo.get("columns", {}).get(geo.get("primary_column"), {})
+    if "crs" not in column:
+        # GeoParquet defaults to OGC:CRS84 when the crs key is absent.
+        return CRS.from_user_input("OGC:CRS84")
+    crs = column["crs"]
+    return CRS.from_user_input(crs) if crs is not None else None
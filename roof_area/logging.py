@@ -2,22 +2,51 @@
 
 from __future__ import annotations
 
+import json
 import logging
 from typing import Optional
 
+# Attributes every LogRecord has; anything else was passed through ``extra``.
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
 
-def configure_logging(level: str = "INFO", logger_name: Optional[str] = None) -> logging.Logger:
-    """Configure application-wide logging with a standard formatter."""
+
+class JsonFormatter(logging.Formatter):
+    """Format each record as one JSON object, including any ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S%z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS:
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_logging(
+    level: str = "INFO",
+    logger_name: Optional[str] = None,
+    log_format: str = "text",
+) -> logging.Logger:
+    """Configure application-wide logging with a standard or JSON formatter."""
 
     logger = logging.getLogger(logger_name)
     logger.setLevel(level)
 
     if not logger.handlers:
         handler = logging.StreamHandler()
-        formatter = logging.Formatter(
-            fmt="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-        )
+        if log_format == "json":
+            formatter: logging.Formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(
+                fmt="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S",
+            )
         handler.setFormatter(formatter)
         logger.addHandler(handler)
 
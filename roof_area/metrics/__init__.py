@@ -1,5 +1,21 @@
 """Subpackage."""
 
-from roof_area.metrics.area import ensure_metric_crs, mask_area_m2
+from roof_area.metrics.area import (
+    BuildingAreaAccumulator,
+    ensure_metric_crs,
+    geographic_row_areas,
+    label_pixel_counts,
+    mask_area_m2,
+    pixel_area_m2,
+    pixel_row_areas,
+)
 
-__all__ = ["ensure_metric_crs", "mask_area_m2"]
+__all__ = [
+    "BuildingAreaAccumulator",
+    "ensure_metric_crs",
+    "geographic_row_areas",
+    "label_pixel_counts",
+    "mask_area_m2",
+    "pixel_area_m2",
+    "pixel_row_areas",
+]
@@ -1,25 +1,189 @@
 from __future__ import annotations
 
-from typing import Tuple
+from typing import Sequence, Tuple
 
 import numpy as np
+import pandas as pd
+from affine import Affine
 from numpy.typing import NDArray
 from pyproj import CRS
 
 
 def mask_area_m2(
     mask: NDArray[np.bool_] | NDArray[np.integer],
+    pixel_size_x: float | Tuple[float, float] | None = None,
+    pixel_size_y: float | None = None,
+    *,
+    row_areas: NDArray[np.floating] | None = None,
+) -> float:
+    """Compute the masked area in square meters.
+
+    With ``row_areas`` (see :func:`pixel_row_areas`) the per-row mask counts are
+    weighted by the area of a pixel in each row, which geographic rasters need;
+    otherwise every pixel has the constant area of ``pixel_size_x`` × ``pixel_size_y``.
+    """
+    if row_areas is not None:
+        return float(np.count_nonzero(mask, axis=1) @ np.asarray(row_areas, dtype=np.float64))
+    if pixel_size_x is None:
+        raise ValueError("mask_area_m2 needs a pixel size or row_areas.")
+    pixel_area = pixel_area_m2(pixel_size_x, pixel_size_y)
+    pixel_count = int(np.count_nonzero(mask))
+    return float(pixel_count) * pixel_area
+
+
+def pixel_area_m2(
     pixel_size_x: float | Tuple[float, float],
     pixel_size_y: float | None = None,
 ) -> float:
-    """Compute the masked area in square meters."""
+    """Return the area of one pixel from its sizes, given separately or as a tuple."""
     if pixel_size_y is None:
         if not isinstance(pixel_size_x, tuple):
             raise ValueError("pixel_size_y must be provided when pixel_size_x is not a tuple.")
         pixel_size_x, pixel_size_y = pixel_size_x
+    return float(pixel_size_x) * float(pixel_size_y)
 
-    pixel_count = int(np.count_nonzero(mask))
-    return float(pixel_count) * float(pixel_size_x) * float(pixel_size_y)
+
+def pixel_row_areas(
+    transform: Affine,
+    crs: CRS | str | None,
+    height: int,
+) -> NDArray[np.float64]:
+    """Return the area in m² of one pixel in each of the ``height`` rows of a grid.
+
+    On a geographic CRS each row is a band between two parallels, and its area
+    on the CRS ellipsoid follows in closed form from the authalic latitude, so
+    no data is reprojected. Projected CRSs get one planar pixel area in their
+    linear unit, and grids without a CRS are assumed to be in meters.
+    """
+    planar = abs(transform.a * transform.e - transform.b * transform.d)
+    if crs is None:
+        return np.full(height, planar)
+    crs = CRS.from_user_input(crs)
+    unit = crs.axis_info[0].unit_conversion_factor if crs.axis_info else 1.0
+    if not crs.is_geographic:
+        return np.full(height, planar * unit**2)
+    if transform.b or transform.d:
+        raise ValueError("Per-row pixel areas need a north-up geographic raster transform.")
+
+    ellipsoid = crs.ellipsoid
+    semi_major = ellipsoid.semi_major_metre
+    eccentricity = np.sqrt(1.0 - (ellipsoid.semi_minor_metre / semi_major) ** 2)
+    edges = (transform.f + transform.e * np.arange(height + 1)) * unit
+    band = np.abs(np.diff(_authalic_q(np.clip(edges, -np.pi / 2, np.pi / 2), eccentricity)))
+    return band * (semi_major**2 / 2.0) * abs(transform.a) * unit
+
+
+def _authalic_q(latitude: NDArray[np.float64], eccentricity: float) -> NDArray[np.float64]:
+    # Twice the area between the equator and ``latitude`` per radian of longitude,
+    # in units of the squared semi-major axis (Snyder, Map Projections, eq. 3-12).
+    sin = np.sin(latitude)
+    if eccentricity == 0.0:
+        return 2.0 * sin
+    e_sin = eccentricity * sin
+    return (1.0 - eccentricity**2) * (
+        sin / (1.0 - e_sin**2) - np.log((1.0 - e_sin) / (1.0 + e_sin)) / (2.0 * eccentricity)
+    )
+
+
+def geographic_row_areas(dataset: object) -> NDArray[np.float64] | None:
+    """Return :func:`pixel_row_areas` for a dataset on a geographic CRS, else ``None``.
+
+    Projected rasters keep using one pixel size, so their areas are unchanged.
+    """
+    if dataset.crs is None or not dataset.crs.is_geographic:
+        return None
+    return pixel_row_areas(dataset.transform, dataset.crs, dataset.height)
+
+
+def label_pixel_counts(
+    labels: NDArray[np.integer],
+    mask: NDArray[np.bool_],
+    row_areas: NDArray[np.floating] | None = None,
+) -> Tuple[NDArray[np.generic], ...]:
+    """Count footprint and roof pixels per label present in a tile.
+
+    Returns ``(labels, footprint_pixels, roof_pixels)`` for every nonzero label
+    in ``labels``. With ``row_areas`` (the m² of a pixel in each tile row) the
+    footprint and roof areas in m² are appended. The counts use
+    ``np.bincount``, so the cost is linear in pixels however many buildings the
+    tile holds.
+    """
+    footprint = np.bincount(labels.ravel())
+    roof = np.bincount(labels[mask], minlength=footprint.size)
+    present = np.flatnonzero(footprint[1:]) + 1
+    if row_areas is None:
+        return present, footprint[present], roof[present]
+
+    weights = np.broadcast_to(np.asarray(row_areas, dtype=np.float64)[:, None], labels.shape)
+    footprint_area = np.bincount(labels.ravel(), weights=weights.ravel(), minlength=footprint.size)
+    roof_area = np.bincount(labels[mask], weights=weights[mask], minlength=footprint.size)
+    return present, footprint[present], roof[present], footprint_area[present], roof_area[present]
+
+
+class BuildingAreaAccumulator:
+    """Accumulate per-building roof pixel counts over label/mask tiles.
+
+    Labels are 1-based positions into ``building_ids``. Label 0 is background.
+    When tiles come with areas (see :func:`label_pixel_counts`), those are
+    accumulated too and reported instead of pixels times a constant pixel size.
+    """
+
+    def __init__(self, building_ids: Sequence[object]) -> None:
+        self.building_ids = np.asarray(building_ids)
+        self.footprint_pixels = np.zeros(len(building_ids) + 1, dtype=np.int64)
+        self.roof_pixels = np.zeros(len(building_ids) + 1, dtype=np.int64)
+        self.footprint_area_m2: NDArray[np.float64] | None = None
+        self.roof_area_m2: NDArray[np.float64] | None = None
+
+    def add(
+        self,
+        labels: NDArray[np.integer],
+        mask: NDArray[np.bool_],
+        row_areas: NDArray[np.floating] | None = None,
+    ) -> None:
+        self.add_counts(*label_pixel_counts(labels, mask, row_areas))
+
+    def add_counts(
+        self,
+        labels: NDArray[np.integer],
+        footprint_pixels: NDArray[np.integer],
+        roof_pixels: NDArray[np.integer],
+        footprint_area_m2: NDArray[np.floating] | None = None,
+        roof_area_m2: NDArray[np.floating] | None = None,
+    ) -> None:
+        self.footprint_pixels[labels] += footprint_pixels
+        self.roof_pixels[labels] += roof_pixels
+        if footprint_area_m2 is not None:
+            if self.footprint_area_m2 is None:
+                self.footprint_area_m2 = np.zeros(self.footprint_pixels.size)
+                self.roof_area_m2 = np.zeros(self.roof_pixels.size)
+            self.footprint_area_m2[labels] += footprint_area_m2
+            self.roof_area_m2[labels] += roof_area_m2
+
+    def to_frame(
+        self,
+        pixel_size_x: float | Tuple[float, float],
+        pixel_size_y: float | None = None,
+        *,
+        min_area_m2: float = 0.0,
+    ) -> pd.DataFrame:
+        """Return per-building areas in m², dropping roofs below ``min_area_m2``."""
+        pixel_area = pixel_area_m2(pixel_size_x, pixel_size_y)
+        if self.roof_area_m2 is not None:
+            footprint_area, roof_area = self.footprint_area_m2[1:], self.roof_area_m2[1:]
+        else:
+            footprint_area = self.footprint_pixels[1:] * pixel_area
+            roof_area = self.roof_pixels[1:] * pixel_area
+        frame = pd.DataFrame(
+            {
+                "building_id": self.building_ids,
+                "footprint_pixels": self.footprint_pixels[1:],
+                "roof_pixels": self.roof_pixels[1:],
+                "footprint_area_m2": footprint_area,
+                "area_m2": roof_area,
+            }
+        )
+        return frame[frame["area_m2"] >= min_area_m2].reset_index(drop=True)
 
 
 def ensure_metric_crs(
@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio import windows
+from rasterio.windows import Window, bounds as window_bounds
+
+from roof_area.io.raster import LocalRaster, get_pixel_size_m, open_raster
+from roof_area.io.vector import read_footprints
+from roof_area.metrics.area import geographic_row_areas, pixel_area_m2
+from roof_area.pipeline.executor import map_ordered
+from roof_area.preprocess.footprints import FootprintIndex
+from roof_area.preprocess.tiling import iter_windows
+
+
+RASTER_SUFFIXES = (".tif", ".tiff", ".vrt", ".img", ".jp2")
+
+# Pixels are coded as 2 * prediction + truth, so bincount yields [tn, fn, fp, tp].
+CONFUSION_COLUMNS = ["tn", "fn", "fp", "tp"]
+
+
+@dataclass(frozen=True)
+class EvaluationPair:
+    """A predicted mask and its ground truth (raster or polygons)."""
+
+    pred: str
+    truth: str
+    footprints: str | None = None
+
+
+@dataclass
+class EvaluationResult:
+    """Confusion counts for one prediction/truth pair, globally, per tile and per building.
+
+    ``confusion_area_m2`` holds the area of each confusion cell. It is set for
+    geographic rasters, whose pixel area varies by row; otherwise areas are the
+    counts times ``pixel_area_m2``.
+    """
+
+    pair: EvaluationPair
+    pixel_area_m2: float
+    confusion: np.ndarray
+    tiles: pd.DataFrame
+    buildings: pd.DataFrame | None = None
+    confusion_area_m2: np.ndarray | None = None
+
+    def pred_truth_area_m2(self) -> Tuple[float, float]:
+        """Return the predicted and the true roof area in m²."""
+        if self.confusion_area_m2 is not None:
+            _, fn, fp, tp = (float(value) for value in self.confusion_area_m2)
+            return tp + fp, tp + fn
+        _, fn, fp, tp = (int(value) for value in self.confusion)
+        return (tp + fp) * self.pixel_area_m2, (tp + fn) * self.pixel_area_m2
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "pred": self.pair.pred,
+            "truth": self.pair.truth,
+            **_confusion_summary(self.confusion),
+            **_area_summary(*self.pred_truth_area_m2()),
+        }
+
+
+def confusion_metrics(
+    tp: np.ndarray | int,
+    fp: np.ndarray | int,
+    fn: np.ndarray | int,
+) -> Dict[str, np.ndarray]:
+    """Return IoU, F1, precision and recall, with NaN where a metric is undefined."""
+    tp, fp, fn = (np.asarray(value, dtype=np.float64) for value in (tp, fp, fn))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "iou": tp / (tp + fp + fn),
+            "f1": 2 * tp / (2 * tp + fp + fn),
+            "precision": tp / (tp + fp),
+            "recall": tp / (tp + fn),
+        }
+
+
+def evaluate_masks(
+    pred_path: str,
+    truth_path: str,
+    *,
+    footprints_path: str | None = None,
+    tile_size: int = 512,
+) -> EvaluationResult:
+    """Evaluate a predicted mask against ground truth tile by tile.
+
+    ``truth_path`` is either a raster on the same grid as the prediction or a
+    vector layer of roof polygons. Polygons are rasterized per window. Every
+    tile is reduced to a confusion matrix with one ``np.bincount`` over
+    ``2 * prediction + truth``. With footprints, the same counts are also
+    binned per building label. Neither raster is ever read in full. On
+    geographic rasters the areas weight every pixel by its row's area (see
+    :func:`roof_area.metrics.area.pixel_row_areas`).
+    """
+    pair = EvaluationPair(pred_path, truth_path, footprints_path)
+    with open_raster(pred_path) as pred:
+        pixel_area = pixel_area_m2(get_pixel_size_m(pred))
+        row_areas = geographic_row_areas(pred)
+        truth = open_truth(truth_path, pred)
+        footprints = _footprint_index(footprints_path, pred) if footprints_path else None
+        building_counts = (
+            np.zeros((len(footprints) + 1, 4), dtype=np.int64) if footprints is not None else None
+        )
+        building_areas = (
+            np.zeros(building_counts.shape)
+            if building_counts is not None and row_areas is not None
+            else None
+        )
+
+        confusion = np.zeros(4, dtype=np.int64)
+        confusion_area = np.zeros(4) if row_areas is not None else None
+        tile_rows = []
+        tile_areas = []
+        try:
+            for tile_id, window in enumerate(iter_windows(pred, tile_size)):
+                predicted = pred.read(1, window=window) > 0
+                codes = predicted.astype(np.uint8) * 2 + truth.read(window)
+                tile_confusion = np.bincount(codes.ravel(), minlength=4)
+                confusion += tile_confusion
+                tile_rows.append(
+                    [tile_id, window.col_off, window.row_off, window.width, window.height]
+                    + tile_confusion.tolist()
+                )
+                weights = None
+                if row_areas is not None:
+                    row_off = int(window.row_off)
+                    weights = np.broadcast_to(
+                        row_areas[row_off : row_off + int(window.height), None], codes.shape
+                    )
+                    tile_area = np.bincount(codes.ravel(), weights=weights.ravel(), minlength=4)
+                    confusion_area += tile_area
+                    tile_areas.append(tile_area)
+
+                if footprints is not None:
+                    labels = footprints.labels(
+                        window_bounds(window, pred.transform),
+                        out_shape=codes.shape,
+                        transform=pred.window_transform(window),
+                    )
+                    _add_label_confusion(building_counts, labels, codes)
+                    if building_areas is not None:
+                        _add_label_confusion(building_areas, labels, codes, weights)
+        finally:
+            truth.close()
+
+    tiles = _confusion_frame(
+        pd.DataFrame(
+            tile_rows,
+            columns=["tile_id", "col_off", "row_off", "width", "height", *CONFUSION_COLUMNS],
+        ),
+        pixel_area,
+        np.array(tile_areas).reshape(-1, 4) if row_areas is not None else None,
+    )
+    buildings = None
+    if footprints is not None:
+        covered = building_counts[1:].sum(axis=1) > 0
+        buildings = _confusion_frame(
+            pd.concat(
+                [
+                    pd.DataFrame({"building_id": footprints.building_ids}),
+                    pd.DataFrame(building_counts[1:], columns=CONFUSION_COLUMNS),
+                ],
+                axis=1,
+            )[covered].reset_index(drop=True),
+            pixel_area,
+            building_areas[1:][covered] if building_areas is not None else None,
+        )
+
+    return EvaluationResult(
+        pair=pair,
+        pixel_area_m2=pixel_area,
+        confusion=confusion,
+        tiles=tiles,
+        buildings=buildings,
+        confusion_area_m2=confusion_area,
+    )
+
+
+def evaluate_many(
+    pairs: Sequence[EvaluationPair],
+    *,
+    tile_size: int = 512,
+    workers: int = 1,
+    executor: str = "process",
+) -> List[EvaluationResult]:
+    """Evaluate many prediction/truth pairs in parallel, one pair per task."""
+    return list(
+        map_ordered(_evaluate_pair, tile_size, pairs, workers=workers, backend=executor)
+    )
+
+
+def evaluation_report(results: Sequence[EvaluationResult]) -> Dict[str, object]:
+    """Summarize each scene and the pooled confusion matrix over all scenes."""
+    confusion = np.zeros(4, dtype=np.int64)
+    pred_area = truth_area = 0.0
+    for result in results:
+        confusion += result.confusion
+        pred, truth = result.pred_truth_area_m2()
+        pred_area += pred
+        truth_area += truth
+
+    overall = _confusion_summary(confusion)
+    overall.update(_area_summary(pred_area, truth_area))
+    return {"overall": overall, "scenes": [result.summary() for result in results]}
+
+
+def concat_tables(results: Sequence[EvaluationResult], table: str) -> pd.DataFrame | None:
+    """Stack per-tile or per-building tables of several scenes with a ``pred`` column."""
+    frames = [
+        getattr(result, table).assign(pred=result.pair.pred)
+        for result in results
+        if getattr(result, table) is not None
+    ]
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def _evaluate_pair(tile_size: int, pair: EvaluationPair) -> EvaluationResult:
+    return evaluate_masks(
+        pair.pred,
+        pair.truth,
+        footprints_path=pair.footprints,
+        tile_size=tile_size,
+    )
+
+
+def _add_label_confusion(
+    counts: np.ndarray,
+    labels: np.ndarray,
+    codes: np.ndarray,
+    weights: np.ndarray | None = None,
+) -> None:
+    present = int(labels.max()) + 1
+    binned = np.bincount(
+        (labels.astype(np.int64) * 4 + codes).ravel(),
+        weights=None if weights is None else weights.ravel(),
+        minlength=present * 4,
+    )
+    counts[:present] += binned.reshape(present, 4)
+
+
+def _confusion_frame(
+    frame: pd.DataFrame,
+    pixel_area: float,
+    areas: np.ndarray | None = None,
+) -> pd.DataFrame:
+    # ``areas`` holds per-row m² of each confusion cell where pixel areas vary.
+    metrics = confusion_metrics(frame["tp"], frame["fp"], frame["fn"])
+    if areas is None:
+        pred_area = (frame["tp"] + frame["fp"]) * pixel_area
+        truth_area = (frame["tp"] + frame["fn"]) * pixel_area
+    else:
+        tn, fn, fp, tp = areas.T
+        pred_area, truth_area = tp + fp, tp + fn
+    return frame.assign(
+        **metrics,
+        pred_area_m2=pred_area,
+        truth_area_m2=truth_area,
+        area_error_m2=pred_area - truth_area,
+    )
+
+
+def _confusion_summary(confusion: np.ndarray) -> Dict[str, object]:
+    tn, fn, fp, tp = (int(value) for value in confusion)
+    summary: Dict[str, object] = {"tp": tp, "fp": fp, "fn": fn, "tn": tn}
+    summary.update(
+        {name: float(value) for name, value in confusion_metrics(tp, fp, fn).items()}
+    )
+    return summary
+
+
+def _area_summary(pred_area: float, truth_area: float) -> Dict[str, float]:
+    return {
+        "pred_area_m2": pred_area,
+        "truth_area_m2": truth_area,
+        "area_error_m2": pred_area - truth_area,
+        "relative_area_error": (pred_area - truth_area) / truth_area if truth_area else float("nan"),
+    }
+
+
+def _footprint_index(path: str, dataset: rasterio.io.DatasetReader) -> FootprintIndex:
+    gdf = read_footprints(path, bounds=tuple(dataset.bounds), bounds_crs=dataset.crs)
+    if gdf.crs is None:
+        raise ValueError(f"Vector layer {path} is missing a CRS definition.")
+    return FootprintIndex(gdf.to_crs(dataset.crs))
+
+
+def open_truth(path: str, pred: rasterio.io.DatasetReader) -> "TruthReader":
+    """Open ground truth (a raster on the ``pred`` grid or roof polygons) for windowed reads.
+
+    The reader is picklable and opens one dataset per thread, so tile workers
+    can share it.
+    """
+    if Path(path).suffix.lower() in RASTER_SUFFIXES:
+        return _TruthRaster(path, pred)
+    return _TruthPolygons(_footprint_index(path, pred), pred)
+
+
+class _TruthRaster:
+    def __init__(self, path: str, pred: rasterio.io.DatasetReader) -> None:
+        self._raster = LocalRaster(path)
+        dataset = self._raster.get()
+        if dataset.shape != pred.shape or dataset.transform != pred.transform:
+            self._raster.close()
+            raise ValueError(
+                f"Ground truth {path} must share the prediction grid "
+                f"(shape {pred.shape}, transform {tuple(pred.transform)[:6]})."
+            )
+
+    def read(self, window: Window) -> np.ndarray:
+        return (self._raster.get().read(1, window=window) > 0).astype(np.uint8)
+
+    def close(self) -> None:
+        self._raster.close()
+
+
+class _TruthPolygons:
+    def __init__(self, index: FootprintIndex, pred: rasterio.io.DatasetReader) -> None:
+        self._index = index
+        self._transform = pred.transform
+
+    def read(self, window: Window) -> np.ndarray:
+        return self._index.rasterize(
+            window_bounds(window, self._transform),
+            out_shape=(int(window.height), int(window.width)),
+            transform=windows.transform(window, self._transform),
+        ).astype(np.uint8)
+
+    def close(self) -> None:
+        pass
+
+
+TruthReader = Union[_TruthRaster, _TruthPolygons]
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from typing import Any, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.typing import NDArray
+
+from roof_area.metrics.area import pixel_area_m2
+from roof_area.metrics.evaluate import confusion_metrics
+
+
+# (labels, histograms, truth_histogram, truth_pixels[, area_histograms, truth_area_m2])
+SweepCounts = Tuple[Any, ...]
+
+
+def parse_thresholds(spec: str) -> List[float]:
+    """Parse ``"0.1,0.2,0.5"`` or an inclusive ``"start:stop:step"`` range."""
+    if ":" in spec:
+        parts = [float(part) for part in spec.split(":")]
+        if len(parts) != 3 or parts[2] <= 0:
+            raise ValueError(f"Threshold range must be start:stop:step with step > 0, got '{spec}'.")
+        start, stop, step = parts
+        count = int(np.floor((stop - start) / step + 1e-9)) + 1
+        thresholds = [round(start + index * step, 6) for index in range(max(count, 0))]
+    else:
+        thresholds = [float(part) for part in spec.split(",") if part.strip()]
+    if not thresholds:
+        raise ValueError(f"No thresholds in '{spec}'.")
+    return thresholds
+
+
+def threshold_levels(thresholds: Sequence[float]) -> NDArray[np.float32]:
+    """Return the float32 magnitude levels ``cv2.threshold`` compares against."""
+    return (np.clip(np.asarray(thresholds, dtype=np.float64), 0.0, 1.0) * 255.0).astype(
+        np.float32
+    )
+
+
+def threshold_bins(values: NDArray[np.floating], levels: NDArray[np.float32]) -> NDArray[np.intp]:
+    """Return, per pixel, how many of the sorted ``levels`` it strictly exceeds."""
+    return np.searchsorted(levels, values.astype(np.float32, copy=False), side="left")
+
+
+def sweep_counts(
+    labels: NDArray[np.integer],
+    bins: NDArray[np.integer],
+    n_bins: int,
+    truth: NDArray[np.bool_] | None = None,
+    row_areas: NDArray[np.floating] | None = None,
+) -> SweepCounts:
+    """Histogram threshold bins per building label present in a tile.
+
+    Returns ``(labels, histograms, truth_histogram, truth_pixels)``. The truth
+    histogram only counts truth pixels inside footprints, since the baseline
+    mask is zero elsewhere. With ``row_areas`` (the m² of a pixel in each tile
+    row) the area-weighted histograms and the truth area in m² are appended.
+    Labels are compacted first, so the cost is linear in pixels however many
+    buildings the scene holds.
+    """
+    footprint = np.bincount(labels.ravel())
+    present = np.flatnonzero(footprint[1:]) + 1
+    lookup = np.zeros(footprint.size, dtype=np.int64)
+    lookup[present] = np.arange(1, present.size + 1)
+    codes = lookup[labels] * n_bins + bins
+    size = (present.size + 1) * n_bins
+    histograms = np.bincount(codes.ravel(), minlength=size)
+    histograms = histograms.reshape(present.size + 1, n_bins)[1:]
+
+    truth_histogram = None
+    truth_pixels = 0
+    if truth is not None:
+        truth_histogram = np.bincount(bins[truth & (labels > 0)], minlength=n_bins)
+        truth_pixels = int(np.count_nonzero(truth))
+    if row_areas is None:
+        return present, histograms, truth_histogram, truth_pixels
+
+    weights = np.broadcast_to(np.asarray(row_areas, dtype=np.float64)[:, None], labels.shape)
+    area_histograms = np.bincount(codes.ravel(), weights=weights.ravel(), minlength=size)
+    area_histograms = area_histograms.reshape(present.size + 1, n_bins)[1:]
+    truth_area = float(weights[truth].sum()) if truth is not None else 0.0
+    return present, histograms, truth_histogram, truth_pixels, area_histograms, truth_area
+
+
+class ThresholdSweep:
+    """Accumulate per-building threshold histograms to report many thresholds at once.
+
+    Bin ``k`` holds pixels that pass exactly the ``k`` lowest thresholds, so the
+    roof pixels at threshold ``j`` are the pixels in bins above ``j``.
+    Labels are 1-based positions into ``building_ids``. Label 0 is background.
+    When tiles come with areas (see :func:`sweep_counts`), those are reported
+    instead of pixels times a constant pixel size.
+    """
+
+    def __init__(self, thresholds: Sequence[float], building_ids: Sequence[object]) -> None:
+        thresholds = np.unique(np.asarray(thresholds, dtype=np.float64))
+        if thresholds.size == 0 or thresholds[0] < 0.0 or thresholds[-1] > 1.0:
+            raise ValueError("Sweep thresholds must be non-empty and within [0, 1].")
+        self.thresholds = thresholds
+        self.levels = threshold_levels(thresholds)
+        self.building_ids = np.asarray(building_ids)
+        self.histograms = np.zeros((len(building_ids) + 1, self.n_bins), dtype=np.int64)
+        self.truth_histogram: NDArray[np.int64] | None = None
+        self.truth_pixels = 0
+        self.area_histograms: NDArray[np.float64] | None = None
+        self.truth_area_m2 = 0.0
+
+    @property
+    def n_bins(self) -> int:
+        return self.thresholds.size + 1
+
+    def add(
+        self,
+        labels: NDArray[np.integer],
+        bins: NDArray[np.integer],
+        truth: NDArray[np.bool_] | None = None,
+        row_areas: NDArray[np.floating] | None = None,
+    ) -> None:
+        self.add_counts(*sweep_counts(labels, bins, self.n_bins, truth, row_areas))
+
+    def add_counts(
+        self,
+        labels: NDArray[np.integer],
+        histograms: NDArray[np.integer],
+        truth_histogram: NDArray[np.integer] | None = None,
+        truth_pixels: int = 0,
+        area_histograms: NDArray[np.floating] | None = None,
+        truth_area_m2: float = 0.0,
+    ) -> None:
+        self.histograms[labels] += histograms
+        if truth_histogram is not None:
+            if self.truth_histogram is None:
+                self.truth_histogram = np.zeros(self.n_bins, dtype=np.int64)
+            self.truth_histogram += truth_histogram
+            self.truth_pixels += truth_pixels
+        if area_histograms is not None:
+            if self.area_histograms is None:
+                self.area_histograms = np.zeros(self.histograms.shape)
+            self.area_histograms[labels] += area_histograms
+            self.truth_area_m2 += truth_area_m2
+
+    def roof_pixels(self) -> NDArray[np.int64]:
+        """Return roof pixels per building (rows) and threshold (columns)."""
+        return _passing(self.histograms)[1:]
+
+    def roof_areas(
+        self,
+        pixel_size_x: float | Tuple[float, float],
+        pixel_size_y: float | None = None,
+    ) -> NDArray[np.float64]:
+        """Return roof areas in m² per building (rows) and threshold (columns)."""
+        pixel_area = pixel_area_m2(pixel_size_x, pixel_size_y)
+        if self.area_histograms is not None:
+            return _passing(self.area_histograms)[1:]
+        return self.roof_pixels() * pixel_area
+
+    def to_frame(
+        self,
+        pixel_size_x: float | Tuple[float, float],
+        pixel_size_y: float | None = None,
+        *,
+        min_area_m2: float = 0.0,
+    ) -> pd.DataFrame:
+        """Return mask area, building area and (with truth) IoU/F1 per threshold.
+
+        ``building_area_m2`` and ``buildings`` only count roofs of at least
+        ``min_area_m2``, like the per-building area table.
+        """
+        pixel_area = pixel_area_m2(pixel_size_x, pixel_size_y)
+        roof_pixels = self.roof_pixels()
+        building_areas = self.roof_areas(pixel_size_x, pixel_size_y)
+        kept = (building_areas >= min_area_m2) & (roof_pixels > 0)
+        roof = roof_pixels.sum(axis=0)
+        if self.area_histograms is not None:
+            area, truth_area = building_areas.sum(axis=0), self.truth_area_m2
+        else:
+            area, truth_area = roof * pixel_area, self.truth_pixels * pixel_area
+        frame = pd.DataFrame(
+            {
+                "threshold": self.thresholds,
+                "roof_pixels": roof,
+                "area_m2": area,
+                "buildings": kept.sum(axis=0),
+                "building_area_m2": np.where(kept, building_areas, 0.0).sum(axis=0),
+            }
+        )
+        if self.truth_histogram is not None:
+            tp = _passing(self.truth_histogram)
+            fp = roof - tp
+            fn = self.truth_pixels - tp
+            frame = frame.assign(
+                tp=tp,
+                fp=fp,
+                fn=fn,
+                truth_area_m2=truth_area,
+                **confusion_metrics(tp, fp, fn),
+            )
+        return frame
+
+    def buildings_frame(
+        self,
+        pixel_size_x: float | Tuple[float, float],
+        pixel_size_y: float | None = None,
+    ) -> pd.DataFrame:
+        """Return one row per building and threshold for buildings seen in the raster."""
+        footprint = self.histograms[1:].sum(axis=1)
+        covered = np.flatnonzero(footprint)
+        roof = self.roof_pixels()[covered]
+        areas = self.roof_areas(pixel_size_x, pixel_size_y)[covered]
+        count = self.thresholds.size
+        return pd.DataFrame(
+            {
+                "building_id": np.repeat(self.building_ids[covered], count),
+                "threshold": np.tile(self.thresholds, covered.size),
+                "footprint_pixels": np.repeat(footprint[covered], count),
+                "roof_pixels": roof.ravel(),
+                "area_m2": areas.ravel(),
+            }
+        )
+
+
+def _passing(histograms: NDArray[np.int64]) -> NDArray[np.int64]:
+    # Pixels in bins above j pass threshold j: a reversed cumulative sum, minus bin 0.
+    return np.cumsum(histograms[..., ::-1], axis=-1)[..., ::-1][..., 1:]
+
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import shapely
+
+
+# Bump when snapshots written by older versions can no longer be diffed.
+SNAPSHOT_VERSION = 1
+_METADATA_KEY = b"roof_area"
+_BOUNDS = ["minx", "miny", "maxx", "maxy"]
+
+
+@dataclass(frozen=True)
+class FootprintSnapshot:
+    """Footprints and per-building pixel counts of the run that produced a mask.
+
+    ``buildings`` has one row per building with its ``building_id``,
+    ``geometry_hash``, bounds in the raster CRS, and ``footprint_pixels`` and
+    ``roof_pixels``. ``metadata`` records what the mask was computed from.
+    """
+
+    buildings: pd.DataFrame
+    metadata: Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class FootprintDiff:
+    """Building IDs added, removed or modified since a snapshot."""
+
+    added: np.ndarray
+    removed: np.ndarray
+    modified: np.ndarray
+    dirty_bounds: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.added) + len(self.removed) + len(self.modified)
+
+
+def snapshot_path(output_path: str) -> str:
+    """Return where the footprint snapshot of a mask is kept: ``<mask>.snapshot.parquet``."""
+    return f"{output_path}.snapshot.parquet"
+
+
+def file_key(path: str) -> Dict[str, int]:
+    stat = Path(path).stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def geometry_hashes(geometries: Sequence[object]) -> np.ndarray:
+    """Return a hex digest of each geometry's WKB, so edits show up as changed hashes."""
+    wkb = shapely.to_wkb(np.asarray(geometries, dtype=object))
+    return np.array(
+        [
+            hashlib.blake2b(value or b"", digest_size=16).hexdigest()
+            for value in wkb
+        ],
+        dtype=object,
+    )
+
+
+def build_snapshot(
+    building_ids: np.ndarray,
+    geometries: Sequence[object],
+    *,
+    footprint_pixels: np.ndarray,
+    roof_pixels: np.ndarray,
+    metadata: Dict[str, Any],
+    footprint_area_m2: np.ndarray | None = None,
+    roof_area_m2: np.ndarray | None = None,
+) -> FootprintSnapshot:
+    geometries = np.asarray(geometries, dtype=object)
+    buildings = pd.DataFrame(shapely.bounds(geometries), columns=_BOUNDS)
+    buildings.insert(0, "building_id", building_ids)
+    buildings.insert(1, "geometry_hash", geometry_hashes(geometries))
+    buildings["footprint_pixels"] = footprint_pixels
+    buildings["roof_pixels"] = roof_pixels
+    if footprint_area_m2 is not None:
+        buildings["footprint_area_m2"] = footprint_area_m2
+        buildings["roof_area_m2"] = roof_area_m2
+    return FootprintSnapshot(buildings, {**metadata, "version": SNAPSHOT_VERSION})
+
+
+def write_snapshot(snapshot: FootprintSnapshot, path: str) -> None:
+    pa, pq = _pyarrow()
+    table = pa.Table.from_pandas(snapshot.buildings, preserve_index=False)
+    metadata = {
+        **(table.schema.metadata or {}),
+        _METADATA_KEY: json.dumps(snapshot.metadata).encode(),
+    }
+    # Written next to the target and renamed, so a crash never leaves a
+    # snapshot that does not describe the mask.
+    staging = Path(path).with_name(f".{Path(path).name}.partial")
+    pq.write_table(table.replace_schema_metadata(metadata), staging)
+    staging.replace(path)
+
+
+def read_snapshot(path: str) -> FootprintSnapshot | None:
+    """Return the snapshot at ``path``, or ``None`` if it is missing or unreadable."""
+    pa, pq = _pyarrow()
+    try:
+        table = pq.read_table(path)
+        metadata = json.loads(table.schema.metadata[_METADATA_KEY])
+    except (OSError, KeyError, ValueError, TypeError, pa.ArrowException):
+        return None
+    if metadata.get("version") != SNAPSHOT_VERSION:
+        return None
+    return FootprintSnapshot(table.to_pandas(), metadata)
+
+
+def _pyarrow() -> Tuple[Any, Any]:
+    # Snapshots are Parquet, but pyarrow is an optional extra; only load it when used.
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError(
+            "Incremental snapshots require pyarrow. "
+            "Install it with pip install 'roof-area[geoparquet]'."
+        ) from exc
+    return pa, pq
+
+
+def diff_footprints(
+    snapshot: FootprintSnapshot,
+    building_ids: np.ndarray,
+    geometries: Sequence[object],
+) -> FootprintDiff:
+    """Compare footprints against a snapshot by building ID and geometry hash.
+
+    ``dirty_bounds`` holds the old bounds of removed and modified buildings and
+    the new bounds of added and modified ones: the only places where the mask
+    or the per-building counts can change.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    old = snapshot.buildings.set_index("building_id")
+    new = pd.DataFrame(
+        shapely.bounds(geometries),
+        columns=_BOUNDS,
+        index=pd.Index(building_ids, name="building_id"),
+    )
+    new["geometry_hash"] = geometry_hashes(geometries)
+    for label, frame in (("snapshot", old), ("footprint", new)):
+        if not frame.index.is_unique:
+            duplicates = frame.index[frame.index.duplicated()].unique()[:5].tolist()
+            raise ValueError(
+                f"Incremental runs need unique building IDs; the {label} layer repeats "
+                f"{duplicates}."
+            )
+
+    common = old.index.intersection(new.index)
+    changed = old.loc[common, "geometry_hash"].to_numpy() != new.loc[common, "geometry_hash"]
+    modified = common[np.asarray(changed)]
+    added = new.index.difference(old.index)
+    removed = old.index.difference(new.index)
+
+    dirty_bounds = np.concatenate(
+        [
+            old.loc[removed.append(modified), _BOUNDS].to_numpy(dtype=np.float64),
+            new.loc[added.append(modified), _BOUNDS].to_numpy(dtype=np.float64),
+        ]
+    ).reshape(-1, 4)
+    return FootprintDiff(
+        added=added.to_numpy(),
+        removed=removed.to_numpy(),
+        modified=modified.to_numpy(),
+        # Empty geometries have NaN bounds and cover no pixels.
+        dirty_bounds=dirty_bounds[np.isfinite(dirty_bounds).all(axis=1)],
+    )
+
+
+def snapshot_counts(
+    snapshot: FootprintSnapshot,
+    building_ids: np.ndarray,
+    columns: Sequence[str] = ("footprint_pixels", "roof_pixels"),
+) -> Tuple[np.ndarray, ...]:
+    """Return the snapshot's ``columns`` for ``building_ids`` (0 if new).
+
+    The defaults are the footprint and roof pixel counts; snapshots of
+    geographic rasters also hold ``footprint_area_m2`` and ``roof_area_m2``.
+    """
+    old = snapshot.buildings.set_index("building_id")
+    positions = old.index.get_indexer(pd.Index(building_ids))
+    found = positions >= 0
+    counts = []
+    for column in columns:
+        source = old[column].to_numpy()
+        values = np.zeros(len(building_ids), dtype=source.dtype)
+        values[found] = source[positions[found]]
+        counts.append(values)
+    return tuple(counts)
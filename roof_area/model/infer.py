@@ -1,15 +1,76 @@
 from __future__ import annotations
 
+import json
 import logging
+import math
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable
+from typing import Any, Callable, Iterable, Iterator, List, Sequence, Tuple
 
 import cv2
 import geopandas as gpd
 import numpy as np
+import pandas as pd
 import rasterio
-from rasterio import features
-from shapely.geometry import Polygon
+import shapely
+from rasterio.enums import Resampling
+from rasterio.windows import Window, bounds as window_bounds
+
+from roof_area.io.cache import ArrayCache, CacheEntry
+from roof_area.io.mosaic import is_mosaic_input, mosaic_vrt_path, resolve_raster
+from roof_area.io.raster import (
+    LocalRaster,
+    MaskOutputOptions,
+    get_pixel_size_m,
+    open_mask_writer,
+    prefetch_windows,
+)
+from roof_area.io.vector import read_footprints
+from roof_area.metrics.area import (
+    BuildingAreaAccumulator,
+    geographic_row_areas,
+    label_pixel_counts,
+)
+from roof_area.metrics.evaluate import TruthReader, open_truth
+from roof_area.metrics.sweep import SweepCounts, ThresholdSweep, sweep_counts, threshold_bins
+from roof_area.model.incremental import (
+    FootprintSnapshot,
+    build_snapshot,
+    diff_footprints,
+    file_key,
+    read_snapshot,
+    snapshot_counts,
+    snapshot_path,
+    write_snapshot,
+)
+from roof_area.model.runner import ModelRunner, load_model
+from roof_area.pipeline.executor import map_ordered
+from roof_area.pipeline.profiling import stage, tile_scope
+from roof_area.pipeline.run import write_table
+from roof_area.preprocess.footprints import FootprintIndex, iter_polygons, rasterize_footprints
+from roof_area.preprocess.scratch import ScratchBuffers, thread_scratch
+from roof_area.preprocess.tiling import (
+    iter_windows,
+    occupied_tiles,
+    pad_window,
+    plan_tiles,
+    window_slices,
+    windows_intersecting,
+)
+
+
+# Pixels of context needed by the 5x5 Gaussian blur followed by the 3x3 Sobel.
+BASELINE_HALO = 3
+# Tile size used by model inference when the caller does not pick one.
+DEFAULT_MODEL_TILE_SIZE = 512
+# Right-edge padding that covers the widest OpenCV SIMD register (16 float32 lanes).
+_SIMD_TAIL_PAD = 16
+# Bump when the cached gradient magnitude would change for the same raster.
+_GRADIENT_CACHE_VERSION = 1
+# Bands averaged into the grayscale used by the baseline.
+_GRAY_BANDS = 3
 
 
 class InferenceError(RuntimeError):
@@ -23,19 +84,75 @@ def run_inference(
     output_path: str | None,
     model_path: str | None,
     threshold: float,
+    tile_size: int | None = None,
+    overlap: int = 0,
+    gradient_overviews: bool = False,
+    gradient_sidecar: bool = False,
+    workers: int = 1,
+    executor: str = "thread",
+    batch_size: int = 8,
+    model_threads: int | None = None,
+    read_prefetch: int = 4,
+    areas_path: str | None = None,
+    min_area_m2: float = 0.0,
+    output_options: MaskOutputOptions | None = None,
+    sparse: bool = False,
+    incremental: bool = False,
+    model: ModelRunner | None = None,
+    cache: ArrayCache | None = None,
     logger: logging.Logger | None = None,
 ) -> str:
-    """Run inference using either a baseline or a model-defined pipeline."""
+    """Run inference using either a baseline or a model-defined pipeline.
+
+    When ``tile_size`` is given the baseline streams the raster window by window,
+    so peak memory depends on the tile size instead of the raster size. Model
+    inference always runs tiled, ``batch_size`` tiles at a time, while up to
+    ``read_prefetch`` tiles are read ahead on background threads. With
+    ``areas_path`` a per-building roof area table is written as well.
+    ``output_options`` controls the mask's tiling, compression, bit depth,
+    overviews and COG layout. With ``sparse`` the tiled baseline only processes
+    tiles that intersect a footprint and writes zeros everywhere else, and caches
+    the scene-wide gradient maximum in its sidecar for later runs. A
+    preloaded ``model`` is used instead of loading ``model_path``, so callers
+    processing many rasters load it once. With a ``cache`` the baseline keeps
+    the gradient magnitude and footprint labels on disk, so re-runs that only
+    change ``threshold`` or ``min_area_m2`` skip both stages. With
+    ``incremental`` the tiled baseline keeps a footprint snapshot next to the
+    mask; later runs diff the footprints against it and only recompute the tiles
+    of added, removed or modified buildings (see :func:`_update_streaming_mask`).
+    ``raster_path`` may also be a directory or glob of adjacent rasters, which is
+    read through a mosaic VRT written next to the mask (see
+    :func:`~roof_area.io.mosaic.resolve_raster`).
+    """
     if logger is None:
         logger = logging.getLogger(__name__)
+    if is_mosaic_input(raster_path):
+        output_path = output_path or default_output_path(raster_path)
+        try:
+            raster_path = resolve_raster(
+                raster_path, mosaic_vrt_path(output_path), exclude=[output_path], logger=logger
+            )
+        except ValueError as exc:
+            raise InferenceError(str(exc)) from exc
 
-    if model_path:
+    if model is not None or model_path:
+        if incremental:
+            raise InferenceError("Incremental mode is only supported by the baseline.")
         return _run_model_inference(
             raster_path=raster_path,
             footprints_path=footprints_path,
             output_path=output_path,
             model_path=model_path,
             threshold=threshold,
+            tile_size=tile_size,
+            overlap=overlap,
+            batch_size=batch_size,
+            model_threads=model_threads,
+            read_prefetch=read_prefetch,
+            areas_path=areas_path,
+            min_area_m2=min_area_m2,
+            output_options=output_options,
+            model=model,
             logger=logger,
         )
 
@@ -44,6 +161,18 @@ def run_inference(
         footprints_path=footprints_path,
         output_path=output_path,
         threshold=threshold,
+        tile_size=tile_size,
+        overlap=overlap,
+        gradient_overviews=gradient_overviews,
+        gradient_sidecar=gradient_sidecar,
+        workers=workers,
+        executor=executor,
+        areas_path=areas_path,
+        min_area_m2=min_area_m2,
+        output_options=output_options,
+        sparse=sparse,
+        incremental=incremental,
+        cache=cache,
         logger=logger,
     )
 
@@ -53,15 +182,216 @@ def _run_model_inference(
     raster_path: str,
     footprints_path: str | None,
     output_path: str | None,
-    model_path: str,
+    model_path: str | None,
     threshold: float,
+    tile_size: int | None,
+    overlap: int,
+    batch_size: int,
+    model_threads: int | None,
+    read_prefetch: int,
+    areas_path: str | None,
+    min_area_m2: float,
+    output_options: MaskOutputOptions | None,
+    model: ModelRunner | None,
     logger: logging.Logger,
 ) -> str:
-    """Placeholder for ML-model-based inference."""
-    raise NotImplementedError(
-        "ML model inference is not implemented yet. "
-        "Omit --model to use the heuristic baseline or implement a UNet/DeepLab runner."
+    """Run a CPU ONNX/TorchScript model over batched, blended raster tiles."""
+    output_path = output_path or default_output_path(raster_path)
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    tile_size = tile_size or DEFAULT_MODEL_TILE_SIZE
+    if model is None:
+        model = load_model(model_path, threads=model_threads)
+
+    start = time.perf_counter()
+    tiles = 0
+    with rasterio.open(raster_path) as dataset:
+        indexes = _model_band_indexes(dataset, model.channels)
+        footprints = (
+            FootprintIndex(load_footprints(dataset, footprints_path))
+            if footprints_path
+            else None
+        )
+        areas = _area_accumulator(footprints, areas_path)
+        row_areas = geographic_row_areas(dataset)
+        blender = _RowBlender(
+            width=dataset.width,
+            height=dataset.height,
+            weights=_blend_weights(tile_size, overlap),
+        )
+
+        with open_mask_writer(output_path, dataset, output_options) as dst:
+
+            def write_rows(window: Window, probabilities: np.ndarray) -> None:
+                mask = probabilities > threshold
+                if footprints is not None:
+                    labels = footprints.labels(
+                        window_bounds(window, dataset.transform),
+                        out_shape=mask.shape,
+                        transform=dataset.window_transform(window),
+                    )
+                    mask &= labels > 0
+                    if areas is not None:
+                        areas.add(labels, mask, _window_row_areas(row_areas, window))
+                _write(dst, mask.astype(rasterio.uint8), window=window)
+
+            reads = prefetch_windows(
+                dataset.name,
+                iter_windows(dataset, tile_size, overlap),
+                indexes=indexes,
+                depth=read_prefetch,
+            )
+            for tiles_read in _batched(reads, batch_size):
+                windows = [window for window, _ in tiles_read]
+                batch = np.stack([_model_tile(data, tile_size) for _, data in tiles_read])
+                with stage("predict"):
+                    probabilities = model.predict(batch)
+                for window, prediction in zip(windows, probabilities):
+                    height, width = int(window.height), int(window.width)
+                    for rows in blender.add(window, prediction[:height, :width]):
+                        write_rows(*rows)
+                tiles += len(windows)
+
+            for rows in blender.flush():
+                write_rows(*rows)
+
+        if areas is not None:
+            _write_area_table(areas, dataset, areas_path, min_area_m2, logger)
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "Model inference processed %d tiles in %.2fs (%.1f tiles/s, batch_size=%d)",
+        tiles,
+        elapsed,
+        tiles / elapsed if elapsed > 0 else float("inf"),
+        batch_size,
     )
+    logger.info("Model inference saved mask to %s", output_path)
+    return output_path
+
+
+def model_window_probabilities(
+    dataset: rasterio.io.DatasetReader,
+    window: Window,
+    predict: Callable[[np.ndarray], np.ndarray],
+    *,
+    tile_size: int = DEFAULT_MODEL_TILE_SIZE,
+    overlap: int = 0,
+    channels: int | None = None,
+) -> np.ndarray:
+    """Return blended model probabilities for one window of the raster.
+
+    The window is covered by the same tile grid that a full-raster run uses,
+    and the tiles are blended in the same order, so the probabilities match it
+    exactly. ``predict`` maps an N×C×H×W batch to N×H×W probabilities.
+    """
+    indexes = _model_band_indexes(dataset, channels)
+    weights = _blend_weights(tile_size, overlap)
+    tiles = windows_intersecting(dataset, tile_size, window, overlap)
+    predictions = predict(
+        np.stack([_model_tile(_read(dataset, indexes, window=tile), tile_size) for tile in tiles])
+    )
+
+    shape = (int(window.height), int(window.width))
+    total = np.zeros(shape, dtype=np.float32)
+    weight = np.zeros(shape, dtype=np.float32)
+    for tile, prediction in zip(tiles, predictions):
+        height, width = int(tile.height), int(tile.width)
+        tile_weights = weights[:height, :width]
+        shared = tile.intersection(window)
+        inside = window_slices(shared, tile)
+        target = window_slices(shared, window)
+        total[target] += (prediction[:height, :width] * tile_weights)[inside]
+        weight[target] += tile_weights[inside]
+    return total / weight
+
+
+def _model_band_indexes(
+    dataset: rasterio.io.DatasetReader,
+    channels: int | None,
+) -> List[int]:
+    channels = channels or dataset.count
+    if channels > dataset.count:
+        raise InferenceError(
+            f"Model expects {channels} input channels but the raster has {dataset.count} bands."
+        )
+    return list(range(1, channels + 1))
+
+
+def _model_tile(data: np.ndarray, tile_size: int) -> np.ndarray:
+    """Scale a C×H×W tile to float32 and zero-pad edge tiles to the model tile size."""
+    tile = data.astype(np.float32)
+    if np.issubdtype(data.dtype, np.integer):
+        tile *= 1.0 / np.iinfo(data.dtype).max
+
+    pad_rows = tile_size - tile.shape[1]
+    pad_cols = tile_size - tile.shape[2]
+    if pad_rows or pad_cols:
+        tile = np.pad(tile, ((0, 0), (0, pad_rows), (0, pad_cols)))
+    return tile
+
+
+def _batched(items: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    batch: List[Any] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _blend_weights(tile_size: int, overlap: int) -> np.ndarray:
+    """Return a tile weight window that ramps linearly across the overlap."""
+    ramp = np.arange(1, tile_size + 1, dtype=np.float32)
+    ramp = np.minimum(np.minimum(ramp, ramp[::-1]), overlap + 1) / (overlap + 1)
+    return np.outer(ramp, ramp)
+
+
+class _RowBlender:
+    """Weighted blend of overlapping tile predictions in a band that slides down the raster.
+
+    Tiles must arrive in raster order. Once a tile starts a new tile row, the
+    rows above it can receive no more contributions. Those rows are emitted and
+    the band shifts, so memory is ``tile_size × raster width`` instead of the
+    full raster.
+    """
+
+    def __init__(self, *, width: int, height: int, weights: np.ndarray) -> None:
+        self._width = width
+        self._height = height
+        self._weights = weights
+        self._sum = np.zeros((weights.shape[0], width), dtype=np.float32)
+        self._weight = np.zeros_like(self._sum)
+        self._row = 0
+
+    def add(self, window: Window, prediction: np.ndarray) -> Iterator[Tuple[Window, np.ndarray]]:
+        row_off = int(window.row_off)
+        if row_off > self._row:
+            yield self._emit(row_off - self._row)
+
+        height, width = prediction.shape
+        weights = self._weights[:height, :width]
+        rows = slice(row_off - self._row, row_off - self._row + height)
+        cols = slice(int(window.col_off), int(window.col_off) + width)
+        self._sum[rows, cols] += prediction * weights
+        self._weight[rows, cols] += weights
+
+    def flush(self) -> Iterator[Tuple[Window, np.ndarray]]:
+        remaining = min(self._sum.shape[0], self._height - self._row)
+        if remaining > 0:
+            yield self._emit(remaining)
+
+    def _emit(self, rows: int) -> Tuple[Window, np.ndarray]:
+        probabilities = self._sum[:rows] / self._weight[:rows]
+        window = Window(col_off=0, row_off=self._row, width=self._width, height=rows)
+
+        self._sum[:-rows] = self._sum[rows:]
+        self._sum[-rows:] = 0.0
+        self._weight[:-rows] = self._weight[rows:]
+        self._weight[-rows:] = 0.0
+        self._row += rows
+        return window, probabilities
 
 
 def _run_baseline_inference(
@@ -70,6 +400,18 @@ def _run_baseline_inference(
     footprints_path: str | None,
     output_path: str | None,
     threshold: float,
+    tile_size: int | None,
+    overlap: int,
+    gradient_overviews: bool,
+    gradient_sidecar: bool,
+    workers: int,
+    executor: str,
+    areas_path: str | None,
+    min_area_m2: float,
+    output_options: MaskOutputOptions | None,
+    sparse: bool,
+    incremental: bool,
+    cache: ArrayCache | None,
     logger: logging.Logger,
 ) -> str:
     if not footprints_path:
@@ -78,54 +420,1053 @@ def _run_baseline_inference(
             "or train a model and pass --model."
         )
 
-    output_path = output_path or _default_output_path(raster_path)
+    if sparse and tile_size is None:
+        raise InferenceError("Sparse mode streams tiles and requires a tile size.")
+    if sparse and cache is not None:
+        raise InferenceError("Sparse mode computes partial intermediates and cannot use a cache.")
+    if incremental and (tile_size is None or cache is not None):
+        raise InferenceError(
+            "Incremental mode patches streamed tiles and needs a tile size and no cache."
+        )
+    if incremental and output_options is not None and output_options.cog:
+        raise InferenceError(
+            "Incremental mode patches the mask in place and cannot keep a COG layout."
+        )
+
+    output_path = output_path or default_output_path(raster_path)
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
 
     with rasterio.open(raster_path) as dataset:
-        image = dataset.read()
-        grayscale = _to_grayscale(image)
-        gradient_mask = _gradient_threshold_mask(grayscale, threshold)
-        footprint_mask = _mask_by_footprints(
+        if cache is not None:
+            areas = _write_cached_mask(
+                dataset=dataset,
+                footprints_path=footprints_path,
+                output_path=output_path,
+                threshold=threshold,
+                tile_size=tile_size,
+                overlap=overlap,
+                workers=workers,
+                executor=executor,
+                collect_areas=areas_path is not None,
+                output_options=output_options,
+                cache=cache,
+                logger=logger,
+            )
+        elif tile_size is not None:
+            halo = max(overlap, BASELINE_HALO)
+            metadata = _snapshot_metadata(
+                dataset, threshold=threshold, tile_size=tile_size, halo=halo
+            )
+            snapshot = (
+                _reusable_snapshot(output_path, metadata, logger) if incremental else None
+            )
+            if snapshot is not None:
+                areas = _update_streaming_mask(
+                    dataset=dataset,
+                    footprints_path=footprints_path,
+                    output_path=output_path,
+                    snapshot=snapshot,
+                    workers=workers,
+                    executor=executor,
+                    logger=logger,
+                )
+            else:
+                areas = _write_streaming_mask(
+                    dataset=dataset,
+                    footprints_path=footprints_path,
+                    output_path=output_path,
+                    threshold=threshold,
+                    tile_size=tile_size,
+                    overlap=overlap,
+                    gradient_overviews=gradient_overviews,
+                    gradient_sidecar=gradient_sidecar,
+                    workers=workers,
+                    executor=executor,
+                    collect_areas=areas_path is not None,
+                    output_options=output_options,
+                    sparse=sparse,
+                    snapshot_metadata=metadata if incremental else None,
+                    logger=logger,
+                )
+        else:
+            image = _read(dataset)
+            grayscale = _to_grayscale(image)
+            gradient_mask = _gradient_threshold_mask(grayscale, threshold)
+            if areas_path is None:
+                areas = None
+                footprint_mask = _mask_by_footprints(
+                    dataset=dataset,
+                    footprints_path=footprints_path,
+                    base_mask=gradient_mask,
+                    logger=logger,
+                )
+            else:
+                footprints = FootprintIndex(load_footprints(dataset, footprints_path))
+                labels = footprints.labels(
+                    tuple(dataset.bounds),
+                    out_shape=gradient_mask.shape,
+                    transform=dataset.transform,
+                )
+                footprint_mask = gradient_mask & (labels > 0)
+                areas = _area_accumulator(footprints, areas_path)
+                areas.add(labels, footprint_mask, geographic_row_areas(dataset))
+
+            with open_mask_writer(output_path, dataset, output_options) as dst:
+                _write(dst, footprint_mask.astype(rasterio.uint8))
+
+        if areas_path is not None:
+            _write_area_table(areas, dataset, areas_path, min_area_m2, logger)
+
+    logger.info("Baseline inference saved mask to %s", output_path)
+    return output_path
+
+
+def _write_streaming_mask(
+    *,
+    dataset: rasterio.io.DatasetReader,
+    footprints_path: str,
+    output_path: str,
+    threshold: float,
+    tile_size: int,
+    overlap: int,
+    gradient_overviews: bool,
+    gradient_sidecar: bool,
+    workers: int,
+    executor: str,
+    collect_areas: bool,
+    output_options: MaskOutputOptions | None,
+    sparse: bool,
+    logger: logging.Logger,
+    snapshot_metadata: dict | None = None,
+) -> BuildingAreaAccumulator | None:
+    """Compute the baseline mask tile by tile and write each output window.
+
+    With ``collect_areas`` the per-building pixel counts of every tile are
+    accumulated and returned. Tiles come from :func:`plan_tiles`: block-aligned,
+    in Hilbert order, with all-nodata tiles outside footprints written as zeros. With ``sparse``
+    only tiles that intersect a footprint bounding box are computed as well.
+    The gradient maximum always covers the whole raster, so sparse masks match
+    dense ones; sparse runs always use the gradient sidecar, so only the first
+    one pays for that scene-wide pass. With ``snapshot_metadata`` a footprint snapshot
+    for later incremental runs is saved next to the mask.
+    """
+    gdf = load_footprints(dataset, footprints_path)
+    footprints = FootprintIndex(gdf)
+    collect_areas = collect_areas or snapshot_metadata is not None
+    halo = max(overlap, BASELINE_HALO)
+    # Masks are zero outside footprints, so only footprint-free tiles may be
+    # skipped as nodata; tiles under a footprint keep its pixel counts.
+    plan = plan_tiles(
+        dataset,
+        tile_size,
+        bounds=footprints.bounds() if sparse else None,
+        keep_bounds=footprints.bounds(),
+    )
+    logger.info("Tile plan: %s", plan.summary())
+    computed = plan.windows
+
+    max_magnitude = compute_gradient_max(
+        dataset,
+        tile_size=tile_size,
+        halo=halo,
+        use_overviews=gradient_overviews,
+        sidecar=gradient_sidecar or sparse,
+        workers=workers,
+        executor=executor,
+        logger=logger,
+    )
+
+    with LocalRaster(dataset.name) as raster:
+        tiles = _BaselineTiles(
+            raster=raster,
+            footprints=footprints,
+            threshold=threshold,
+            max_magnitude=max_magnitude,
+            halo=halo,
+            collect_areas=collect_areas,
+            row_areas=geographic_row_areas(dataset),
+        )
+        areas = BuildingAreaAccumulator(footprints.building_ids) if collect_areas else None
+        results = map_ordered(
+            _baseline_tile, tiles, computed, workers=workers, backend=executor
+        )
+        empty = np.zeros(plan.tile_size[::-1], dtype=rasterio.uint8)
+        with open_mask_writer(output_path, dataset, output_options) as dst:
+            for window in plan.skipped:
+                _write(dst, empty[: int(window.height), : int(window.width)], window=window)
+            for window, (mask, counts) in zip(computed, results):
+                _write(dst, mask, window=window)
+                if areas is not None:
+                    areas.add_counts(*counts)
+
+    if snapshot_metadata is not None:
+        _save_snapshot(
+            output_path, gdf, areas, {**snapshot_metadata, "max_magnitude": max_magnitude}
+        )
+    logger.info(
+        "Streamed baseline mask over %d tiles (tile_size=%dx%d, halo=%d, workers=%d) "
+        "for %d footprints",
+        plan.total_tiles,
+        *plan.tile_size,
+        halo,
+        workers,
+        len(footprints),
+    )
+    return areas
+
+
+def _snapshot_metadata(
+    dataset: rasterio.io.DatasetReader,
+    *,
+    threshold: float,
+    tile_size: int,
+    halo: int,
+) -> dict:
+    raster = file_key(dataset.name) if Path(dataset.name).is_file() else {"name": dataset.name}
+    return {
+        "raster": raster,
+        "threshold": threshold,
+        "tile_size": tile_size,
+        "halo": halo,
+        # Snapshots of geographic rasters also carry per-building areas in m².
+        "row_areas": bool(dataset.crs and dataset.crs.is_geographic),
+    }
+
+
+def _reusable_snapshot(
+    output_path: str,
+    metadata: dict,
+    logger: logging.Logger,
+) -> FootprintSnapshot | None:
+    """Return the mask's snapshot if the mask can be patched for ``metadata``, else ``None``."""
+    path = snapshot_path(output_path)
+    snapshot = read_snapshot(path)
+    if snapshot is None:
+        logger.info("No footprint snapshot at %s; computing the full mask", path)
+        return None
+    if not Path(output_path).is_file() or snapshot.metadata.get("mask") != file_key(output_path):
+        logger.info("Mask %s changed since its snapshot; computing the full mask", output_path)
+        return None
+    changed = [key for key, value in metadata.items() if snapshot.metadata.get(key) != value]
+    if changed:
+        logger.info(
+            "Snapshot %s was taken with a different %s; computing the full mask",
+            path,
+            ", ".join(changed),
+        )
+        return None
+    return snapshot
+
+
+def _save_snapshot(
+    output_path: str,
+    gdf: gpd.GeoDataFrame,
+    areas: BuildingAreaAccumulator,
+    metadata: dict,
+) -> None:
+    footprint_area, roof_area = areas.footprint_area_m2, areas.roof_area_m2
+    snapshot = build_snapshot(
+        areas.building_ids,
+        gdf.geometry.to_numpy(),
+        footprint_pixels=areas.footprint_pixels[1:],
+        roof_pixels=areas.roof_pixels[1:],
+        metadata={**metadata, "mask": file_key(output_path)},
+        footprint_area_m2=None if footprint_area is None else footprint_area[1:],
+        roof_area_m2=None if roof_area is None else roof_area[1:],
+    )
+    write_snapshot(snapshot, snapshot_path(output_path))
+
+
+def _update_streaming_mask(
+    *,
+    dataset: rasterio.io.DatasetReader,
+    footprints_path: str,
+    output_path: str,
+    snapshot: FootprintSnapshot,
+    workers: int,
+    executor: str,
+    logger: logging.Logger,
+) -> BuildingAreaAccumulator:
+    """Patch a streamed baseline mask and its building counts for edited footprints.
+
+    Only the tiles touched by the old or new bounds of added, removed and
+    modified buildings are recomputed, with the threshold, tiling and gradient
+    maximum recorded in ``snapshot``, and written into the existing mask. The
+    counts of buildings reaching into those tiles are recounted from the patched
+    mask; all others come from the snapshot. The cost therefore scales with the
+    edits, plus reading and hashing the footprint layer. Overlapping buildings
+    are assumed to keep their relative order in the layer.
+    """
+    gdf = load_footprints(dataset, footprints_path)
+    footprints = FootprintIndex(gdf)
+    geometries = gdf.geometry.to_numpy()
+    try:
+        diff = diff_footprints(snapshot, footprints.building_ids, geometries)
+    except ValueError as exc:
+        raise InferenceError(str(exc)) from exc
+
+    tile_size = snapshot.metadata["tile_size"]
+    # The full run's tile plan restricted to dirty tiles. Nodata tiles under a
+    # removed or moved building may still hold its old roof pixels, so they are
+    # recomputed too; with no footprint left there they come out empty.
+    plan = plan_tiles(
+        dataset,
+        tile_size,
+        bounds=diff.dirty_bounds,
+        keep_bounds=np.concatenate([footprints.bounds(), diff.dirty_bounds]),
+    )
+    dirty_windows = plan.windows
+
+    row_areas = geographic_row_areas(dataset)
+    areas = BuildingAreaAccumulator(footprints.building_ids)
+    areas.footprint_pixels[1:], areas.roof_pixels[1:] = snapshot_counts(
+        snapshot, footprints.building_ids
+    )
+    if row_areas is not None:
+        areas.footprint_area_m2 = np.zeros(areas.footprint_pixels.size)
+        areas.roof_area_m2 = np.zeros(areas.roof_pixels.size)
+        areas.footprint_area_m2[1:], areas.roof_area_m2[1:] = snapshot_counts(
+            snapshot, footprints.building_ids, ("footprint_area_m2", "roof_area_m2")
+        )
+    if dirty_windows:
+        with LocalRaster(dataset.name) as raster, rasterio.open(output_path, "r+") as dst:
+            tiles = _BaselineTiles(
+                raster=raster,
+                footprints=footprints,
+                threshold=snapshot.metadata["threshold"],
+                max_magnitude=snapshot.metadata["max_magnitude"],
+                halo=snapshot.metadata["halo"],
+            )
+            results = map_ordered(
+                _baseline_tile, tiles, dirty_windows, workers=workers, backend=executor
+            )
+            for window, (mask, _) in zip(dirty_windows, results):
+                _write(dst, mask, window=window)
+
+            touched = np.unique(
+                np.concatenate(
+                    [
+                        footprints.building_labels(window_bounds(window, dataset.transform))
+                        for window in dirty_windows
+                    ]
+                )
+            )
+            _recount_buildings(
+                dst,
+                footprints,
+                areas,
+                touched,
+                shapely.bounds(geometries),
+                tile_size,
+                row_areas,
+            )
+            overviews = dst.overviews(1)
+            if overviews:
+                dst.build_overviews(overviews, Resampling.nearest)
+
+    _save_snapshot(output_path, gdf, areas, snapshot.metadata)
+    logger.info(
+        "Incremental update: %d added, %d removed, %d modified buildings; "
+        "recomputed %d of %d tiles",
+        len(diff.added),
+        len(diff.removed),
+        len(diff.modified),
+        len(dirty_windows),
+        plan.total_tiles,
+    )
+    return areas
+
+
+def _recount_buildings(
+    dst: rasterio.io.DatasetWriter,
+    footprints: FootprintIndex,
+    areas: BuildingAreaAccumulator,
+    touched: np.ndarray,
+    building_bounds: np.ndarray,
+    tile_size: int,
+    row_areas: np.ndarray | None = None,
+) -> None:
+    """Replace the counts of ``touched`` labels with counts over their whole extent."""
+    areas.footprint_pixels[touched] = 0
+    areas.roof_pixels[touched] = 0
+    if areas.roof_area_m2 is not None:
+        areas.footprint_area_m2[touched] = 0.0
+        areas.roof_area_m2[touched] = 0.0
+    covering = occupied_tiles(dst, tile_size, building_bounds[touched - 1]).ravel()
+    for window, hit in zip(iter_windows(dst, tile_size), covering):
+        if not hit:
+            continue
+        with tile_scope(window):
+            mask = _read(dst, 1, window=window) > 0
+            with stage("footprints"):
+                labels = footprints.labels(
+                    window_bounds(window, dst.transform),
+                    out_shape=mask.shape,
+                    transform=dst.window_transform(window),
+                )
+                counts = label_pixel_counts(labels, mask, _window_row_areas(row_areas, window))
+                keep = np.isin(counts[0], touched)
+                areas.add_counts(*(values[keep] for values in counts))
+
+
+def baseline_window_mask(
+    dataset: rasterio.io.DatasetReader,
+    window: Window,
+    *,
+    threshold: float,
+    max_magnitude: float,
+    halo: int = BASELINE_HALO,
+) -> np.ndarray:
+    """Threshold the gradient of one window, as a full-raster run would.
+
+    ``halo`` pixels of context are read around the window and ``max_magnitude``
+    is the raster-wide maximum from :func:`compute_gradient_max`.
+    """
+    padded = pad_window(window, halo, width=dataset.width, height=dataset.height)
+    scratch = thread_scratch()
+    grayscale = _to_grayscale(_read_gray_bands(dataset, padded, scratch), scratch)
+    mask = _gradient_threshold_mask(
+        grayscale, threshold, max_magnitude=max_magnitude, scratch=scratch
+    )
+    return mask[window_slices(window, padded)]
+
+
+def _write_cached_mask(
+    *,
+    dataset: rasterio.io.DatasetReader,
+    footprints_path: str,
+    output_path: str,
+    threshold: float,
+    tile_size: int | None,
+    overlap: int,
+    workers: int,
+    executor: str,
+    collect_areas: bool,
+    output_options: MaskOutputOptions | None,
+    cache: ArrayCache,
+    logger: logging.Logger,
+) -> BuildingAreaAccumulator | None:
+    """Threshold cached full-raster intermediates tile by tile.
+
+    The gradient magnitude is keyed by the raster content, and the label raster
+    by the footprint content and the raster grid. Missing entries are computed
+    in one tiled pass, after which only the cheap threshold and count stages run.
+    """
+    windows = (
+        list(iter_windows(dataset, tile_size))
+        if tile_size
+        else [Window(col_off=0, row_off=0, width=dataset.width, height=dataset.height)]
+    )
+    raster_digest = cache.digest(dataset.name)
+    gradient_key = cache.key("gradient", raster=raster_digest, version=_GRADIENT_CACHE_VERSION)
+    labels_key = cache.key(
+        "labels",
+        footprints=cache.digest(footprints_path),
+        shape=dataset.shape,
+        transform=tuple(dataset.transform)[:6],
+        crs=dataset.crs.to_wkt() if dataset.crs else None,
+    )
+    gradient = cache.get(gradient_key)
+    labels = cache.get(labels_key)
+    logger.info(
+        "Intermediate cache in %s: gradient %s, labels %s",
+        cache.root,
+        "hit" if gradient else "miss",
+        "hit" if labels else "miss",
+    )
+    if gradient is None or labels is None:
+        gradient, labels = _fill_intermediates(
             dataset=dataset,
             footprints_path=footprints_path,
-            base_mask=gradient_mask,
+            windows=windows,
+            halo=max(overlap, BASELINE_HALO),
+            workers=workers,
+            executor=executor,
+            cache=cache,
+            gradient=(gradient_key, gradient),
+            labels=(labels_key, labels),
+        )
+
+    max_magnitude = gradient.metadata["max_magnitude"]
+    areas = BuildingAreaAccumulator(labels.metadata["building_ids"]) if collect_areas else None
+    row_areas = geographic_row_areas(dataset)
+    with open_mask_writer(output_path, dataset, output_options) as dst:
+        for window in windows:
+            rows, cols = window.toslices()
+            tile_labels = np.asarray(labels.array[rows, cols])
+            magnitude = _scale_magnitude(np.asarray(gradient.array[rows, cols]), max_magnitude)
+            mask = _threshold_magnitude(magnitude, threshold) & (tile_labels > 0)
+            _write(dst, mask.astype(rasterio.uint8), window=window)
+            if areas is not None:
+                areas.add(tile_labels, mask, _window_row_areas(row_areas, window))
+    return areas
+
+
+def _fill_intermediates(
+    *,
+    dataset: rasterio.io.DatasetReader,
+    footprints_path: str,
+    windows: List[Window],
+    halo: int,
+    workers: int,
+    executor: str,
+    cache: ArrayCache,
+    gradient: Tuple[str, CacheEntry | None],
+    labels: Tuple[str, CacheEntry | None],
+) -> Tuple[CacheEntry, CacheEntry]:
+    (gradient_key, gradient_entry), (labels_key, labels_entry) = gradient, labels
+    footprints = None
+    if labels_entry is None:
+        footprints = FootprintIndex(load_footprints(dataset, footprints_path))
+
+    with ExitStack() as stack:
+        if gradient_entry is None:
+            gradient_entry = stack.enter_context(
+                cache.create(gradient_key, dataset.shape, np.float32)
+            )
+            gradient_target = gradient_entry.array
+        else:
+            gradient_target = None
+        if labels_entry is None:
+            labels_entry = stack.enter_context(cache.create(labels_key, dataset.shape, np.uint32))
+            labels_entry.metadata["building_ids"] = footprints.building_ids.tolist()
+            labels_target = labels_entry.array
+        else:
+            labels_target = None
+
+        max_magnitude = 0.0
+        with LocalRaster(dataset.name) as raster:
+            tiles = _IntermediateTiles(
+                raster=raster,
+                footprints=footprints,
+                halo=halo,
+                gradient=gradient_target is not None,
+            )
+            results = map_ordered(
+                _intermediate_tile, tiles, windows, workers=workers, backend=executor
+            )
+            for window, (magnitude, tile_labels) in zip(windows, results):
+                rows, cols = window.toslices()
+                if magnitude is not None:
+                    gradient_target[rows, cols] = magnitude
+                    max_magnitude = max(max_magnitude, float(np.max(magnitude)))
+                if tile_labels is not None:
+                    labels_target[rows, cols] = tile_labels
+        if gradient_target is not None:
+            gradient_entry.metadata["max_magnitude"] = max_magnitude
+    return gradient_entry, labels_entry
+
+
+@dataclass(frozen=True)
+class _IntermediateTiles:
+    raster: LocalRaster
+    footprints: FootprintIndex | None
+    halo: int
+    gradient: bool
+
+
+def _intermediate_tile(
+    tiles: _IntermediateTiles,
+    window: Window,
+) -> Tuple[np.ndarray | None, np.ndarray | None]:
+    with tile_scope(window):
+        dataset = tiles.raster.get()
+        magnitude = labels = None
+        if tiles.gradient:
+            padded = pad_window(window, tiles.halo, width=dataset.width, height=dataset.height)
+            magnitude = _gradient_magnitude(_to_grayscale(_read(dataset, window=padded)))[
+                window_slices(window, padded)
+            ]
+        if tiles.footprints is not None:
+            labels = tiles.footprints.labels(
+                window_bounds(window, dataset.transform),
+                out_shape=(int(window.height), int(window.width)),
+                transform=dataset.window_transform(window),
+            )
+        return magnitude, labels
+
+
+@dataclass(frozen=True)
+class _BaselineTiles:
+    raster: LocalRaster
+    footprints: FootprintIndex
+    threshold: float
+    max_magnitude: float
+    halo: int
+    collect_areas: bool = False
+    row_areas: np.ndarray | None = None
+
+
+TileCounts = Tuple[np.ndarray, ...]
+
+
+def _baseline_tile(
+    tiles: _BaselineTiles,
+    window: Window,
+) -> Tuple[np.ndarray, TileCounts | None]:
+    with tile_scope(window):
+        dataset = tiles.raster.get()
+        gradient_mask = baseline_window_mask(
+            dataset,
+            window,
+            threshold=tiles.threshold,
+            max_magnitude=tiles.max_magnitude,
+            halo=tiles.halo,
+        )
+        with stage("footprints"):
+            labels = tiles.footprints.labels(
+                window_bounds(window, dataset.transform),
+                out_shape=gradient_mask.shape,
+                transform=dataset.window_transform(window),
+            )
+            mask = gradient_mask & (labels > 0)
+            counts = (
+                label_pixel_counts(labels, mask, _window_row_areas(tiles.row_areas, window))
+                if tiles.collect_areas
+                else None
+            )
+        return mask.astype(rasterio.uint8), counts
+
+
+def run_threshold_sweep(
+    *,
+    raster_path: str,
+    footprints_path: str | None,
+    thresholds: Sequence[float],
+    sweep_path: str | None = None,
+    truth_path: str | None = None,
+    model_path: str | None = None,
+    tile_size: int = 512,
+    overlap: int = 0,
+    gradient_overviews: bool = False,
+    gradient_sidecar: bool = False,
+    workers: int = 1,
+    executor: str = "thread",
+    areas_path: str | None = None,
+    min_area_m2: float = 0.0,
+    logger: logging.Logger | None = None,
+) -> pd.DataFrame:
+    """Report baseline roof area (and IoU against ``truth_path``) for many thresholds.
+
+    The normalized gradient magnitude is computed once per tile and binned
+    against every threshold, so the whole sweep costs one pass over the raster.
+    Returns the threshold table, which is also written to ``sweep_path``.
+    ``areas_path`` receives one row per building and threshold.
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    if model_path:
+        raise InferenceError("Threshold sweeps are only supported for the gradient baseline.")
+    if not footprints_path:
+        raise InferenceError("Threshold sweeps require --footprints.")
+
+    start = time.perf_counter()
+    with rasterio.open(raster_path) as dataset:
+        footprints = FootprintIndex(load_footprints(dataset, footprints_path))
+        sweep = ThresholdSweep(thresholds, footprints.building_ids)
+        halo = max(overlap, BASELINE_HALO)
+        max_magnitude = compute_gradient_max(
+            dataset,
+            tile_size=tile_size,
+            halo=halo,
+            use_overviews=gradient_overviews,
+            sidecar=gradient_sidecar,
+            workers=workers,
+            executor=executor,
             logger=logger,
         )
 
-        profile = dataset.profile.copy()
-        profile.update(dtype=rasterio.uint8, count=1)
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        with rasterio.open(output_path, "w", **profile) as dst:
-            dst.write(footprint_mask.astype(rasterio.uint8), 1)
+        truth = open_truth(truth_path, dataset) if truth_path else None
+        windows = list(iter_windows(dataset, tile_size))
+        try:
+            with LocalRaster(dataset.name) as raster:
+                tiles = _SweepTiles(
+                    raster=raster,
+                    footprints=footprints,
+                    levels=sweep.levels,
+                    max_magnitude=max_magnitude,
+                    halo=halo,
+                    truth=truth,
+                    row_areas=geographic_row_areas(dataset),
+                )
+                for counts in map_ordered(
+                    _sweep_tile, tiles, windows, workers=workers, backend=executor
+                ):
+                    sweep.add_counts(*counts)
+        finally:
+            if truth is not None:
+                truth.close()
+
+        pixel_size = get_pixel_size_m(dataset)
+
+    table = sweep.to_frame(pixel_size, min_area_m2=min_area_m2)
+    if sweep_path:
+        write_table(table, sweep_path)
+    if areas_path:
+        write_table(sweep.buildings_frame(pixel_size), areas_path)
+    logger.info(
+        "Swept %d thresholds over %d tiles in %.2fs%s",
+        len(sweep.thresholds),
+        len(windows),
+        time.perf_counter() - start,
+        f"; saved to {sweep_path}" if sweep_path else "",
+    )
+    return table
+
+
+@dataclass(frozen=True)
+class _SweepTiles:
+    raster: LocalRaster
+    footprints: FootprintIndex
+    levels: np.ndarray
+    max_magnitude: float
+    halo: int
+    truth: TruthReader | None = None
+    row_areas: np.ndarray | None = None
+
+
+def _sweep_tile(tiles: _SweepTiles, window: Window) -> SweepCounts:
+    with tile_scope(window):
+        dataset = tiles.raster.get()
+        padded = pad_window(window, tiles.halo, width=dataset.width, height=dataset.height)
+        scratch = thread_scratch()
+        grayscale = _to_grayscale(_read_gray_bands(dataset, padded, scratch), scratch)
+        magnitude = _normalized_magnitude(
+            grayscale, max_magnitude=tiles.max_magnitude, scratch=scratch
+        )
+        bins = threshold_bins(magnitude[window_slices(window, padded)], tiles.levels)
+        labels = tiles.footprints.labels(
+            window_bounds(window, dataset.transform),
+            out_shape=bins.shape,
+            transform=dataset.window_transform(window),
+        )
+        truth = tiles.truth.read(window) > 0 if tiles.truth is not None else None
+        return sweep_counts(
+            labels,
+            bins,
+            tiles.levels.size + 1,
+            truth,
+            _window_row_areas(tiles.row_areas, window),
+        )
+
+
+def _area_accumulator(
+    footprints: FootprintIndex | None,
+    areas_path: str | None,
+) -> BuildingAreaAccumulator | None:
+    if areas_path is None:
+        return None
+    if footprints is None:
+        raise InferenceError("Per-building areas require --footprints.")
+    return BuildingAreaAccumulator(footprints.building_ids)
+
+
+def _window_row_areas(row_areas: np.ndarray | None, window: Window) -> np.ndarray | None:
+    if row_areas is None:
+        return None
+    row_off = int(window.row_off)
+    return row_areas[row_off : row_off + int(window.height)]
+
+
+def _write_area_table(
+    areas: BuildingAreaAccumulator,
+    dataset: rasterio.io.DatasetReader,
+    areas_path: str,
+    min_area_m2: float,
+    logger: logging.Logger,
+) -> None:
+    with stage("area_table"):
+        table = areas.to_frame(get_pixel_size_m(dataset), min_area_m2=min_area_m2)
+        write_table(table, areas_path)
+    logger.info(
+        "Saved roof areas for %d buildings (min_area_m2=%.2f) to %s",
+        len(table),
+        min_area_m2,
+        areas_path,
+    )
+
+
+def compute_gradient_max(
+    dataset: rasterio.io.DatasetReader,
+    *,
+    tile_size: int,
+    halo: int = BASELINE_HALO,
+    use_overviews: bool = False,
+    sidecar: bool = False,
+    workers: int = 1,
+    executor: str = "thread",
+    logger: logging.Logger | None = None,
+) -> float:
+    """Return the gradient magnitude maximum used to normalize the baseline threshold.
+
+    The exact maximum is streamed over halo windows, so tiled runs threshold
+    exactly like a full-image run. It must see every full-resolution gradient, so
+    it only saves the per-pixel square root, thresholding, rasterizing and
+    writing of the mask pass. With ``use_overviews`` the maximum is estimated
+    from the finest overview instead, which reads far fewer pixels but is
+    approximate, so it stays opt-in. With ``sidecar`` the result is cached next to the raster and
+    reused while the raster file is unchanged.
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    factor = _finest_overview_factor(dataset) if use_overviews else 1
+    method = "full" if factor == 1 else f"overview:{factor}"
+    sidecar_path = _gradient_sidecar_path(dataset) if sidecar else None
+    sidecar_key = _gradient_sidecar_key(dataset, method) if sidecar_path else None
+
+    if sidecar_path is not None:
+        cached = _read_gradient_sidecar(sidecar_path, sidecar_key)
+        if cached is not None:
+            logger.info("Reusing gradient maximum %.6g from %s", cached, sidecar_path)
+            return cached
+
+    windows = iter_windows(dataset, tile_size * factor)
+    with stage("gradient_max"), LocalRaster(dataset.name) as raster:
+        tiles = _GradientMaxTiles(raster=raster, halo=halo, factor=factor)
+        max_magnitude = max(
+            map_ordered(
+                _tile_gradient_max,
+                tiles,
+                windows,
+                workers=workers,
+                backend=executor,
+            ),
+            default=0.0,
+        )
+
+    logger.info("Computed gradient maximum %.6g (%s)", max_magnitude, method)
+    if sidecar_path is not None:
+        _write_gradient_sidecar(sidecar_path, sidecar_key, max_magnitude, logger)
+    return max_magnitude
+
+
+@dataclass(frozen=True)
+class _GradientMaxTiles:
+    raster: LocalRaster
+    halo: int
+    factor: int
 
-    logger.info("Baseline inference saved mask to %s", output_path)
-    return output_path
 
+def _tile_gradient_max(tiles: _GradientMaxTiles, window: Window) -> float:
+    with tile_scope(window):
+        dataset = tiles.raster.get()
+        factor = tiles.factor
+        padded = pad_window(window, tiles.halo * factor, width=dataset.width, height=dataset.height)
+        out_shape = (math.ceil(padded.height / factor), math.ceil(padded.width / factor))
+        scratch = thread_scratch()
+        image = _read_gray_bands(dataset, padded, scratch, out_shape)
+        squared = _squared_gradient(_to_grayscale(image, scratch), scratch)
+        rows, cols = window_slices(window, padded)
+        core = (
+            slice(rows.start // factor, math.ceil(rows.stop / factor)),
+            slice(cols.start // factor, math.ceil(cols.stop / factor)),
+        )
+        # float32 sqrt is correctly rounded and monotonic, so this equals the
+        # maximum of the per-pixel magnitudes without a square root per pixel.
+        return float(np.sqrt(np.max(squared[core])))
+
+
+def _finest_overview_factor(dataset: rasterio.io.DatasetReader) -> int:
+    overviews = dataset.overviews(1)
+    return min(overviews) if overviews else 1
+
+
+def _gradient_sidecar_path(dataset: rasterio.io.DatasetReader) -> Path | None:
+    if not Path(dataset.name).is_file():
+        return None
+    return Path(f"{dataset.name}.gradmax.json")
+
+
+def _gradient_sidecar_key(dataset: rasterio.io.DatasetReader, method: str) -> dict:
+    stat = Path(dataset.name).stat()
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "method": method,
+        "version": _GRADIENT_CACHE_VERSION,
+    }
+
+
+def _read_gradient_sidecar(path: Path, key: dict) -> float | None:
+    try:
+        payload = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    if payload.get("key") != key:
+        return None
+    return float(payload["max_magnitude"])
+
+
+def _write_gradient_sidecar(
+    path: Path,
+    key: dict,
+    max_magnitude: float,
+    logger: logging.Logger,
+) -> None:
+    try:
+        path.write_text(json.dumps({"key": key, "max_magnitude": max_magnitude}))
+    except OSError as exc:
+        logger.warning("Could not write gradient sidecar %s: %s", path, exc)
+
+
+def _read(dataset: rasterio.io.DatasetReader, *args: Any, **kwargs: Any) -> np.ndarray:
+    with stage("read") as record:
+        data = dataset.read(*args, **kwargs)
+        record.bytes_read += data.nbytes
+    return data
+
+
+def _write(dst: rasterio.io.DatasetWriter, mask: np.ndarray, window: Window | None = None) -> None:
+    with stage("write") as record:
+        dst.write(mask, 1, window=window)
+        record.bytes_written += mask.nbytes
+
+
+def _read_gray_bands(
+    dataset: rasterio.io.DatasetReader,
+    window: Window,
+    scratch: ScratchBuffers,
+    out_shape: Tuple[int, int] | None = None,
+) -> np.ndarray:
+    """Read the bands :func:`_to_grayscale` uses into a reused buffer."""
+    indexes = list(range(1, min(dataset.count, _GRAY_BANDS) + 1))
+    height, width = out_shape or (int(window.height), int(window.width))
+    out = scratch.get("bands", (len(indexes), height, width), dataset.dtypes[0])
+    return _read(dataset, indexes, window=window, out=out)
+
+
+def _to_grayscale(image: np.ndarray, scratch: ScratchBuffers | None = None) -> np.ndarray:
+    """Convert a multi-band image to grayscale for gradient analysis.
+
+    The grayscale is the float32 mean of the first three bands. Integer bands of
+    up to 16 bits are summed exactly in int32 and divided once, which gives the
+    same values without a float32 copy of every band. With ``scratch`` the
+    output and the sum reuse buffers from earlier tiles.
+    """
+    with stage("grayscale"):
+        bands = image[None] if image.ndim == 2 else image[:_GRAY_BANDS]
+        shape = bands.shape[1:]
+        grayscale = _buffer(scratch, "grayscale", shape, np.float32)
+        if bands.shape[0] == 1:
+            np.copyto(grayscale, bands[0], casting="unsafe")
+        elif bands.dtype.kind in "ui" and bands.dtype.itemsize <= 2:
+            total = _buffer(scratch, "grayscale_sum", shape, np.int32)
+            np.add(bands[0], bands[1], out=total, dtype=np.int32)
+            for band in bands[2:]:
+                np.add(total, band, out=total, dtype=np.int32)
+            np.divide(total, bands.shape[0], out=grayscale, dtype=np.float32)
+        else:
+            np.mean(bands.astype(np.float32), axis=0, out=grayscale)
+        return grayscale
+
+
+def _gradient_magnitude(image: np.ndarray, scratch: ScratchBuffers | None = None) -> np.ndarray:
+    """Compute the Sobel gradient magnitude of blurred grayscale imagery.
+
+    Three padded float32 work arrays are used; with ``scratch`` they are reused
+    across tiles and the returned magnitude is a view into one of them.
+    """
+    squared = _squared_gradient(image, scratch)
+    with stage("gradient"):
+        return np.sqrt(squared, out=squared)
+
+
+def _squared_gradient(image: np.ndarray, scratch: ScratchBuffers | None = None) -> np.ndarray:
+    # Squared Sobel magnitude; the square root is monotonic, so a maximum needs only one.
+    with stage("gradient"):
+        height, width = image.shape
+        shape = (height, width + _SIMD_TAIL_PAD)
+        # OpenCV filters the last (width % SIMD lanes) columns with scalar code that rounds
+        # differently. Reflect-padding the right edge keeps every real pixel on the
+        # vectorized path, so tiles stay bit-identical to the full image.
+        padded = cv2.copyMakeBorder(
+            image,
+            0,
+            0,
+            0,
+            _SIMD_TAIL_PAD,
+            cv2.BORDER_REFLECT_101,
+            dst=_buffer(scratch, "gradient_padded", shape, np.float32),
+        )
+        blurred = cv2.GaussianBlur(
+            padded, (5, 5), 0, dst=_buffer(scratch, "gradient_blurred", shape, np.float32)
+        )
+        grad_x = cv2.Sobel(
+            blurred,
+            cv2.CV_32F,
+            1,
+            0,
+            dst=_buffer(scratch, "gradient_x", shape, np.float32),
+            ksize=3,
+        )[:, :width]
+        # The padded input is no longer needed, so it takes the y derivative.
+        grad_y = cv2.Sobel(blurred, cv2.CV_32F, 0, 1, dst=padded, ksize=3)[:, :width]
+        # cv2.magnitude picks alignment-dependent SIMD paths; numpy's correctly rounded
+        # sqrt gives the same result for every tile and every run.
+        np.multiply(grad_x, grad_x, out=grad_x)
+        np.multiply(grad_y, grad_y, out=grad_y)
+        grad_x += grad_y
+        return grad_x
+
+
+def _buffer(
+    scratch: ScratchBuffers | None,
+    name: str,
+    shape: Tuple[int, ...],
+    dtype: Any,
+) -> np.ndarray:
+    return np.empty(shape, dtype=dtype) if scratch is None else scratch.get(name, shape, dtype)
+
+
+def _normalized_magnitude(
+    image: np.ndarray,
+    *,
+    max_magnitude: float | None = None,
+    scratch: ScratchBuffers | None = None,
+) -> np.ndarray:
+    """Scale the gradient magnitude to [0, 255] by ``max_magnitude`` (default: image max)."""
+    return _scale_magnitude(_gradient_magnitude(image, scratch), max_magnitude, inplace=True)
+
+
+def _scale_magnitude(
+    magnitude: np.ndarray,
+    max_magnitude: float | None = None,
+    *,
+    inplace: bool = False,
+) -> np.ndarray:
+    if max_magnitude is None:
+        max_magnitude = np.max(magnitude)
 
-def _to_grayscale(image: np.ndarray) -> np.ndarray:
-    """Convert a multi-band image to grayscale for gradient analysis."""
-    if image.ndim == 2:
-        return image.astype(np.float32)
-    if image.shape[0] == 1:
-        return image[0].astype(np.float32)
+    if max_magnitude > 0:
+        out = magnitude if inplace else None
+        magnitude = np.divide(magnitude, max_magnitude, out=out)
+        np.multiply(magnitude, 255.0, out=magnitude)
+    return magnitude
 
-    channels = image[:3].astype(np.float32)
-    grayscale = np.mean(channels, axis=0)
-    return grayscale
 
+def _gradient_threshold_mask(
+    image: np.ndarray,
+    threshold: float,
+    *,
+    max_magnitude: float | None = None,
+    scratch: ScratchBuffers | None = None,
+) -> np.ndarray:
+    """Compute a gradient-based mask from grayscale imagery.
 
-def _gradient_threshold_mask(image: np.ndarray, threshold: float) -> np.ndarray:
-    """Compute a gradient-based mask from grayscale imagery."""
-    blurred = cv2.GaussianBlur(image, (5, 5), 0)
-    grad_x = cv2.Sobel(blurred, cv2.CV_32F, 1, 0, ksize=3)
-    grad_y = cv2.Sobel(blurred, cv2.CV_32F, 0, 1, ksize=3)
-    magnitude = cv2.magnitude(grad_x, grad_y)
+    ``max_magnitude`` overrides the normalization constant so that tiles of a
+    larger image are thresholded exactly like the full image.
+    """
+    magnitude = _normalized_magnitude(image, max_magnitude=max_magnitude, scratch=scratch)
+    return _threshold_magnitude(magnitude, threshold)
 
-    if np.max(magnitude) > 0:
-        magnitude = (magnitude / np.max(magnitude)) * 255.0
 
-    threshold_value = np.clip(threshold, 0.0, 1.0) * 255.0
-    _, mask = cv2.threshold(magnitude, threshold_value, 255.0, cv2.THRESH_BINARY)
-    return mask.astype(bool)
+def _threshold_magnitude(magnitude: np.ndarray, threshold: float) -> np.ndarray:
+    """Threshold a [0, 255] normalized magnitude at ``threshold`` in [0, 1]."""
+    with stage("threshold"):
+        # Same test as cv2.threshold(THRESH_BINARY) on float32, which keeps pixels
+        # strictly above the float32 threshold, but writes the boolean mask directly.
+        return np.greater(magnitude, np.float32(np.clip(threshold, 0.0, 1.0) * 255.0))
 
 
 def _mask_by_footprints(
@@ -135,43 +1476,48 @@ def _mask_by_footprints(
     base_mask: np.ndarray,
     logger: logging.Logger,
 ) -> np.ndarray:
-    gdf = gpd.read_file(footprints_path)
+    gdf = load_footprints(dataset, footprints_path)
+    with stage("footprints"):
+        footprint_mask = rasterize_footprints(
+            list(iter_polygons(gdf.geometry)),
+            out_shape=base_mask.shape,
+            transform=dataset.transform,
+        )
+        output_mask = base_mask & footprint_mask
+
+    logger.info("Applied baseline mask to %d building footprints", len(gdf))
+    return output_mask
+
+
+def load_footprints(
+    dataset: rasterio.io.DatasetReader,
+    footprints_path: str,
+) -> gpd.GeoDataFrame:
+    """Read the footprints inside the raster bounds, reprojected to the raster CRS."""
+    with stage("load_footprints"):
+        gdf = read_footprints(
+            footprints_path,
+            bounds=tuple(dataset.bounds),
+            bounds_crs=dataset.crs,
+        )
     if gdf.empty:
         raise InferenceError(
-            "No building footprints found in the provided file. "
+            "No building footprints found within the raster bounds in the provided file. "
             "Provide footprints or train a model and pass --model."
         )
 
     if gdf.crs is None:
         raise InferenceError("Building footprints are missing a CRS definition.")
 
-    gdf = gdf.to_crs(dataset.crs)
-    output_mask = np.zeros(base_mask.shape, dtype=bool)
-
-    for geom in _iter_polygons(gdf.geometry):
-        geometry_mask = features.geometry_mask(
-            [geom],
-            out_shape=base_mask.shape,
-            transform=dataset.transform,
-            invert=True,
-        )
-        output_mask |= base_mask & geometry_mask
-
-    logger.info("Applied baseline mask to %d building footprints", len(gdf))
-    return output_mask
+    return gdf.to_crs(dataset.crs)
 
 
-def _iter_polygons(geometries: Iterable[object]) -> Iterable[Polygon]:
-    for geometry in geometries:
-        if geometry is None:
-            continue
-        if geometry.geom_type == "Polygon":
-            yield geometry
-        elif geometry.geom_type == "MultiPolygon":
-            for polygon in geometry.geoms:
-                yield polygon
-
+def default_output_path(raster_path: str) -> str:
+    """Return the mask path used when no output is given: ``<raster>_roof_mask.tif``.
 
-def _default_output_path(raster_path: str) -> str:
+    For a glob of mosaic sources the directory holding the pattern is used.
+    """
     base = Path(raster_path)
+    if is_mosaic_input(raster_path) and not base.is_dir():
+        base = base.parent
     return str(base.with_suffix("")) + "_roof_mask.tif"
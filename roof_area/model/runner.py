@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Protocol
+
+import numpy as np
+
+
+ONNX_SUFFIXES = (".onnx",)
+TORCHSCRIPT_SUFFIXES = (".pt", ".pth", ".ts", ".torchscript")
+
+
+class ModelRunner(Protocol):
+    """CPU model that maps N×C×H×W float32 tiles to N×H×W roof probabilities."""
+
+    channels: int | None
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        ...
+
+
+class OnnxRunner:
+    """Run an ONNX model with onnxruntime on the CPU execution provider."""
+
+    def __init__(self, path: str, *, threads: int | None = None) -> None:
+        try:
+            import onnxruntime as ort
+        except ImportError as exc:
+            raise ImportError(
+                "ONNX models require onnxruntime. Install it with "
+                "pip install 'roof-area[onnx]'."
+            ) from exc
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self._session = ort.InferenceSession(
+            path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        shape = model_input.shape
+        self.channels = shape[1] if len(shape) == 4 and isinstance(shape[1], int) else None
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        output = self._session.run(None, {self._input_name: batch})[0]
+        return _as_probabilities(output)
+
+
+class TorchScriptRunner:
+    """Run a TorchScript module on the CPU in inference mode."""
+
+    def __init__(self, path: str, *, threads: int | None = None) -> None:
+        try:
+            import torch
+        except ImportError as exc:
+            raise ImportError(
+                "TorchScript models require torch. Install it with "
+                "pip install 'roof-area[train]'."
+            ) from exc
+
+        if threads:
+            torch.set_num_threads(threads)
+        self._torch = torch
+        self._module = torch.jit.load(path, map_location="cpu").eval()
+        self.channels = getattr(self._module, "in_channels", None)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        with self._torch.inference_mode():
+            output = self._module(self._torch.from_numpy(batch))
+        return _as_probabilities(output.numpy())
+
+
+def load_model(path: str, *, threads: int | None = None) -> ModelRunner:
+    """Load an ONNX or TorchScript model once for batched CPU inference."""
+    suffix = Path(path).suffix.lower()
+    if suffix in ONNX_SUFFIXES:
+        return OnnxRunner(path, threads=threads)
+    if suffix in TORCHSCRIPT_SUFFIXES:
+        return TorchScriptRunner(path, threads=threads)
+    raise ValueError(
+        f"Unsupported model format '{suffix}'. "
+        f"Expected one of {ONNX_SUFFIXES + TORCHSCRIPT_SUFFIXES}."
+    )
+
+
+def _as_probabilities(output: np.ndarray) -> np.ndarray:
+    if output.ndim == 4:
+        if output.shape[1] != 1:
+            raise ValueError(
+                f"Model must output a single roof probability channel, got {output.shape[1]}."
+            )
+        output = output[:, 0]
+    if output.ndim != 3:
+        raise ValueError(f"Model output must be N×1×H×W or N×H×W, got {output.shape}.")
+    return output.astype(np.float32, copy=False)
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import logging
+import time
+from pathlib import Path
+from typing import Any
+
+import rasterio
+
+from roof_area.io.mosaic import resolve_raster
+from roof_area.model.incremental import file_key
+from roof_area.model.infer import load_footprints
+from roof_area.pipeline.profiling import stage
+from roof_area.preprocess.chips import ChipShards, iter_chip_batches, write_chip_shards
+from roof_area.preprocess.footprints import FootprintIndex
+
+
+def prepare_chips(
+    raster_path: str,
+    footprints_path: str,
+    chips_dir: str,
+    *,
+    chip_size: int,
+    workers: int = 1,
+    logger: logging.Logger | None = None,
+) -> ChipShards:
+    """Return the chip shards of a raster, cutting them only if the inputs changed.
+
+    Shards in ``chips_dir`` are reused while the raster, the footprints and
+    ``chip_size`` match the ones they were cut from, so repeated experiments
+    never decode the GeoTIFF again. A directory or glob of rasters is cut from a
+    mosaic VRT kept in ``chips_dir``.
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    raster_path = resolve_raster(raster_path, str(Path(chips_dir) / "mosaic.vrt"), logger=logger)
+    metadata = {
+        "raster": {"path": str(Path(raster_path).resolve()), **file_key(raster_path)},
+        "footprints": {"path": str(Path(footprints_path).resolve()), **file_key(footprints_path)},
+    }
+    try:
+        chips = ChipShards(chips_dir)
+    except (OSError, ValueError, KeyError):
+        chips = None
+    if chips is not None and chips.metadata == metadata and chips.chip_size == chip_size:
+        logger.info("Reusing %d training chips from %s", len(chips), chips_dir)
+        return chips
+
+    with rasterio.open(raster_path) as dataset:
+        footprints = FootprintIndex(load_footprints(dataset, footprints_path))
+    return write_chip_shards(
+        raster_path,
+        footprints,
+        chips_dir,
+        chip_size=chip_size,
+        workers=workers,
+        metadata=metadata,
+        logger=logger,
+    )
+
+
+def train_model(
+    chips: ChipShards,
+    model_path: str,
+    *,
+    epochs: int = 10,
+    batch_size: int = 8,
+    learning_rate: float = 1e-3,
+    workers: int = 2,
+    prefetch: int = 4,
+    seed: int = 42,
+    threads: int | None = None,
+    logger: logging.Logger | None = None,
+) -> str:
+    """Train a small fully convolutional roof segmenter on chip shards and save it.
+
+    Batches come from :func:`iter_chip_batches`, so ``workers`` threads copy
+    the next ``prefetch`` batches out of the memory-mapped shards while the
+    model trains. The model maps N×C×H×W inputs to N×1×H×W roof probabilities
+    and is saved as TorchScript, which ``roof-area infer --model`` loads.
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    try:
+        import torch
+    except ImportError as exc:
+        raise ImportError(
+            "Training requires torch. Install it with pip install 'roof-area[train]'."
+        ) from exc
+
+    if not len(chips):
+        raise ValueError(f"No training chips in {chips.root}.")
+    torch.manual_seed(seed)
+    if threads:
+        torch.set_num_threads(threads)
+
+    model = _roof_net(torch, chips.bands)
+    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
+    loss_fn = torch.nn.BCELoss()
+    for epoch in range(epochs):
+        model.train()
+        start, total_loss, seen = time.perf_counter(), 0.0, 0
+        batches = iter_chip_batches(
+            chips,
+            batch_size=batch_size,
+            seed=seed + epoch,
+            workers=workers,
+            prefetch=prefetch,
+        )
+        for images, labels in batches:
+            with stage("train_step"):
+                optimizer.zero_grad()
+                loss = loss_fn(model(torch.from_numpy(images)), torch.from_numpy(labels))
+                loss.backward()
+                optimizer.step()
+            total_loss += float(loss) * len(images)
+            seen += len(images)
+        elapsed = time.perf_counter() - start
+        logger.info(
+            "Epoch %d/%d: loss %.4f, %.1f chips/s",
+            epoch + 1,
+            epochs,
+            total_loss / seen,
+            seen / elapsed if elapsed > 0 else float("inf"),
+        )
+
+    Path(model_path).parent.mkdir(parents=True, exist_ok=True)
+    model.eval()
+    torch.jit.script(model).save(model_path)
+    logger.info("Saved TorchScript model to %s", model_path)
+    return model_path
+
+
+def _roof_net(torch: Any, channels: int) -> Any:
+    nn = torch.nn
+    return nn.Sequential(
+        nn.Conv2d(channels, 16, 3, padding=1),
+        nn.ReLU(),
+        nn.Conv2d(16, 16, 3, padding=1),
+        nn.ReLU(),
+        nn.Conv2d(16, 1, 1),
+        nn.Sigmoid(),
+    )
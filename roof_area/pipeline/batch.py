@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+from roof_area.model.infer import default_output_path, run_inference
+from roof_area.model.runner import ModelRunner, load_model
+from roof_area.pipeline.executor import map_unordered
+from roof_area.pipeline.run import read_manifest
+
+
+BATCH_REQUIRED_COLUMNS = ("raster",)
+BATCH_OPTIONAL_COLUMNS = ("footprints", "output", "areas")
+
+
+@dataclass(frozen=True)
+class BatchItem:
+    """One raster of a batch job and the paths its outputs go to."""
+
+    raster: str
+    output: str
+    footprints: str | None = None
+    areas: str | None = None
+
+
+@dataclass(frozen=True)
+class BatchContext:
+    """Settings shared by every item; shipped to each worker process once."""
+
+    inference: Dict[str, Any] = field(default_factory=dict)
+    model_path: str | None = None
+    model_threads: int | None = None
+
+
+def read_batch_manifest(path: str) -> List[BatchItem]:
+    """Read a ``raster[,footprints,output,areas]`` CSV manifest into batch items."""
+    rows = read_manifest(path, required=BATCH_REQUIRED_COLUMNS, optional=BATCH_OPTIONAL_COLUMNS)
+    return [
+        BatchItem(
+            raster=row["raster"],
+            output=row["output"] or default_output_path(row["raster"]),
+            footprints=row["footprints"],
+            areas=row["areas"],
+        )
+        for row in rows
+    ]
+
+
+class BatchState:
+    """Append-only JSON Lines log of finished batch items, used to resume a job.
+
+    Each line records one attempt. The last record for an output wins, and a
+    torn final line left by a crash is ignored.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self.records: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            with self.path.open() as handle:
+                for line in handle:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.records[record["output"]] = record
+
+    def is_done(self, item: BatchItem) -> bool:
+        record = self.records.get(item.output)
+        return (
+            record is not None
+            and record.get("status") == "done"
+            and Path(item.output).exists()
+        )
+
+    def record(self, record: Dict[str, Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a") as handle:
+            handle.write(json.dumps(record) + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+        self.records[record["output"]] = record
+
+
+def run_batch(
+    items: Sequence[BatchItem],
+    *,
+    state_path: str,
+    context: BatchContext,
+    jobs: int = 1,
+    logger: logging.Logger | None = None,
+) -> Dict[str, int]:
+    """Run inference for every item on a process pool, skipping finished ones.
+
+    Worker processes stay alive across items, so imports, GDAL driver
+    registration and the loaded model are paid once per worker rather than
+    once per raster. Every result is appended to the state file as soon as it
+    completes. A rerun skips items recorded as done whose output still exists,
+    and retries everything else. Returns counts of done, failed and skipped items.
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    state = BatchState(state_path)
+    pending = [item for item in items if not state.is_done(item)]
+    counts = {"done": 0, "failed": 0, "skipped": len(items) - len(pending)}
+    logger.info(
+        "Batch of %d items: %d already done, %d to run with %d jobs",
+        len(items),
+        counts["skipped"],
+        len(pending),
+        jobs,
+    )
+
+    start = time.perf_counter()
+    records = map_unordered(_run_batch_item, context, pending, workers=jobs, backend="process")
+    for record in records:
+        state.record(record)
+        counts[record["status"]] += 1
+        if record["status"] == "failed":
+            logger.error("Failed %s: %s", record["raster"], record["error"])
+        else:
+            logger.info("Finished %s in %.2fs", record["raster"], record["seconds"])
+
+    logger.info(
+        "Batch finished in %.2fs: %d done, %d failed, %d skipped",
+        time.perf_counter() - start,
+        counts["done"],
+        counts["failed"],
+        counts["skipped"],
+    )
+    return counts
+
+
+def _run_batch_item(context: BatchContext, item: BatchItem) -> Dict[str, Any]:
+    start = time.perf_counter()
+    status, error = "done", None
+    try:
+        run_inference(
+            raster_path=item.raster,
+            footprints_path=item.footprints,
+            output_path=item.output,
+            areas_path=item.areas,
+            model_path=context.model_path,
+            model=_cached_model(context.model_path, context.model_threads)
+            if context.model_path
+            else None,
+            logger=logging.getLogger("roof_area.batch"),
+            **context.inference,
+        )
+    except Exception as exc:
+        status, error = "failed", f"{type(exc).__name__}: {exc}"
+
+    return {
+        "raster": item.raster,
+        "output": item.output,
+        "status": status,
+        "error": error,
+        "seconds": round(time.perf_counter() - start, 3),
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+@lru_cache(maxsize=4)
+def _cached_model(path: str, threads: int | None) -> ModelRunner:
+    # Per-process cache: each worker loads the model once for all of its items.
+    return load_model(path, threads=threads)
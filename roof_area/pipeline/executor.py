@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Any, Callable, Deque, Iterable, Iterator, Set, TypeVar
+
+
+BACKENDS = ("thread", "process")
+
+ContextT = TypeVar("ContextT")
+ItemT = TypeVar("ItemT")
+ResultT = TypeVar("ResultT")
+
+_WORKER_CONTEXT: Any = None
+
+
+def map_ordered(
+    func: Callable[[ContextT, ItemT], ResultT],
+    context: ContextT,
+    items: Iterable[ItemT],
+    *,
+    workers: int = 1,
+    backend: str = "thread",
+    max_in_flight: int | None = None,
+) -> Iterator[ResultT]:
+    """Yield ``func(context, item)`` for every item, in input order.
+
+    At most ``max_in_flight`` items (default ``2 * workers``) are submitted
+    ahead of the consumer, so memory stays bounded however long ``items`` is.
+    Results come back in input order, so a single consumer can write outputs
+    deterministically whatever the worker count. The process backend ships
+    ``context`` to each worker once. ``func`` must then be a module-level
+    function.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown executor backend '{backend}'. Expected one of {BACKENDS}.")
+    if workers <= 1:
+        for item in items:
+            yield func(context, item)
+        return
+
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be at least 1")
+
+    with _make_executor(backend, workers, context) as executor:
+        pending: Deque[Future] = deque()
+        try:
+            for item in items:
+                if len(pending) >= max_in_flight:
+                    yield pending.popleft().result()
+                pending.append(_submit(executor, backend, func, context, item))
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def map_unordered(
+    func: Callable[[ContextT, ItemT], ResultT],
+    context: ContextT,
+    items: Iterable[ItemT],
+    *,
+    workers: int = 1,
+    backend: str = "process",
+    max_in_flight: int | None = None,
+) -> Iterator[ResultT]:
+    """Yield ``func(context, item)`` for every item as soon as it completes.
+
+    Like :func:`map_ordered`, but a slow item never holds back the results of
+    items submitted after it. Use it when each result is recorded on its own.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown executor backend '{backend}'. Expected one of {BACKENDS}.")
+    if workers <= 1:
+        for item in items:
+            yield func(context, item)
+        return
+
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be at least 1")
+
+    with _make_executor(backend, workers, context) as executor:
+        pending: Set[Future] = set()
+        try:
+            for item in items:
+                while len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                pending.add(_submit(executor, backend, func, context, item))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _make_executor(backend: str, workers: int, context: Any) -> Executor:
+    if backend == "process":
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(context,),
+        )
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="roof-area-tile")
+
+
+def _submit(
+    executor: Executor,
+    backend: str,
+    func: Callable[[Any, Any], Any],
+    context: Any,
+    item: Any,
+) -> Future:
+    if backend == "process":
+        return executor.submit(_call_with_worker_context, func, item)
+    return executor.submit(func, context, item)
+
+
+def _init_worker(context: Any) -> None:
+    global _WORKER_CONTEXT
+    _WORKER_CONTEXT = context
+
+
+def _call_with_worker_context(func: Callable[[Any, Any], Any], item: Any) -> Any:
+    return func(_WORKER_CONTEXT, item)
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+
+@dataclass
+class StageRecord:
+    """Wall time, thread CPU time, I/O bytes and peak RSS growth of one stage call.
+
+    ``rss_growth_bytes`` is how far the call raised the process's peak resident
+    set size, so stages that stay below an earlier peak record 0.
+    """
+
+    stage: str
+    tile: Tuple[int, int, int, int] | None = None
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    rss_growth_bytes: int = 0
+
+
+class RunProfiler:
+    """Collect :class:`StageRecord` entries for one run and summarize them as a report.
+
+    Stages nest, so an outer stage's time includes its inner stages. CPU time is
+    that of the calling thread, which keeps per-tile numbers meaningful when tiles
+    run on a thread pool. Peak RSS is process-wide, so its growth is attributed to
+    every stage open at the time, on any thread. Tiles computed in worker
+    processes are not recorded.
+    With a ``logger`` every finished stage is also logged at DEBUG level, with the
+    record attached as the ``stage`` attribute for structured log formatters.
+    """
+
+    def __init__(self, *, logger: logging.Logger | None = None) -> None:
+        self.logger = logger
+        self.records: List[StageRecord] = []
+        self._lock = threading.Lock()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageRecord]:
+        """Time the enclosed block; callers add I/O byte counts to the yielded record."""
+        record = StageRecord(stage=name, tile=getattr(_current, "tile", None))
+        start_wall, start_cpu = time.perf_counter(), time.thread_time()
+        start_rss = peak_rss_bytes()
+        try:
+            yield record
+        finally:
+            record.wall_s = time.perf_counter() - start_wall
+            record.cpu_s = time.thread_time() - start_cpu
+            record.rss_growth_bytes = peak_rss_bytes() - start_rss
+            with self._lock:
+                self.records.append(record)
+            if self.logger is not None:
+                self.logger.debug(
+                    "Stage %s took %.4fs", name, record.wall_s, extra={"stage": asdict(record)}
+                )
+
+    def report(self, **metadata: Any) -> Dict[str, Any]:
+        """Return run totals, per-stage aggregates and per-tile records as a JSON-ready dict."""
+        with self._lock:
+            records = list(self.records)
+
+        stages: Dict[str, Dict[str, Any]] = {}
+        for record in records:
+            totals = stages.setdefault(
+                record.stage,
+                {
+                    "calls": 0,
+                    "wall_s": 0.0,
+                    "cpu_s": 0.0,
+                    "bytes_read": 0,
+                    "bytes_written": 0,
+                    "rss_growth_bytes": 0,
+                },
+            )
+            totals["calls"] += 1
+            totals["wall_s"] += record.wall_s
+            totals["cpu_s"] += record.cpu_s
+            totals["bytes_read"] += record.bytes_read
+            totals["bytes_written"] += record.bytes_written
+            totals["rss_growth_bytes"] += record.rss_growth_bytes
+
+        return {
+            **metadata,
+            "wall_s": time.perf_counter() - self._start_wall,
+            "cpu_s": time.process_time() - self._start_cpu,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "stages": stages,
+            "tiles": [asdict(record) for record in records if record.tile is not None],
+        }
+
+    def write(self, path: str, **metadata: Any) -> Dict[str, Any]:
+        report = self.report(**metadata)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(report, indent=2))
+        return report
+
+
+_active: RunProfiler | None = None
+_current = threading.local()
+_DISCARDED = StageRecord(stage="")
+
+
+@contextmanager
+def profiling(profiler: RunProfiler) -> Iterator[RunProfiler]:
+    """Make ``profiler`` receive every :func:`stage` recorded inside the block."""
+    global _active
+    previous, _active = _active, profiler
+    try:
+        yield profiler
+    finally:
+        _active = previous
+
+
+def stage(name: str) -> ContextManager[StageRecord]:
+    """Record ``name`` on the active profiler, or do nothing when none is active."""
+    if _active is None:
+        return nullcontext(_DISCARDED)
+    return _active.stage(name)
+
+
+@contextmanager
+def tile_scope(window: Any) -> Iterator[None]:
+    """Attribute stages recorded by this thread inside the block to tile ``window``."""
+    if _active is None:
+        yield
+        return
+    previous = getattr(_current, "tile", None)
+    _current.tile = (
+        int(window.col_off),
+        int(window.row_off),
+        int(window.width),
+        int(window.height),
+    )
+    try:
+        yield
+    finally:
+        _current.tile = previous
+
+
+def peak_rss_bytes() -> int:
+    """Return the process's peak resident set size so far, or 0 where unsupported."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return int(peak if sys.platform == "darwin" else peak * 1024)
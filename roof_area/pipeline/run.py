@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Tuple
+import csv
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
 
 import geopandas as gpd
 import pandas as pd
@@ -51,3 +53,47 @@ def aggregate_area(
         .sum()
         .reset_index(drop=True)
     )
+
+
+def write_table(data: pd.DataFrame, path: str) -> str:
+    """Write a table to CSV or Parquet depending on the file suffix."""
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.suffix.lower() in (".parquet", ".geoparquet"):
+        data.to_parquet(target, index=False)
+    else:
+        data.to_csv(target, index=False)
+    return str(target)
+
+
+def read_manifest(
+    path: str,
+    *,
+    required: Sequence[str],
+    optional: Sequence[str] = (),
+) -> List[Dict[str, str | None]]:
+    """Read a CSV manifest of file paths.
+
+    Relative paths are resolved against the manifest's directory. Empty optional
+    cells become ``None``.
+    """
+    manifest = Path(path)
+    with manifest.open(newline="") as handle:
+        reader = csv.DictReader(handle)
+        missing = [column for column in required if column not in (reader.fieldnames or [])]
+        if missing:
+            raise KeyError(f"Manifest {path} is missing columns: {', '.join(missing)}")
+
+        rows = []
+        for row in reader:
+            entry: Dict[str, str | None] = {}
+            for column in (*required, *optional):
+                value = (row.get(column) or "").strip()
+                if not value:
+                    if column in required:
+                        raise ValueError(f"Manifest {path} has an empty '{column}' value.")
+                    entry[column] = None
+                    continue
+                entry[column] = value if Path(value).is_absolute() else str(manifest.parent / value)
+            rows.append(entry)
+    return rows
@@ -1 +1,5 @@
 """Subpackage."""
+
+from roof_area.postprocess.polygonize import iter_roof_polygons, polygonize_mask
+
+__all__ = ["iter_roof_polygons", "polygonize_mask"]
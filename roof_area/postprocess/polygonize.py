@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import logging
+from typing import Iterator, List
+
+import cv2
+import geopandas as gpd
+import numpy as np
+import rasterio
+import shapely
+from affine import Affine
+from rasterio import features
+from rasterio.windows import Window
+from shapely.geometry import Polygon, shape
+
+from roof_area.io.raster import get_pixel_size_m
+from roof_area.metrics.area import geographic_row_areas
+from roof_area.io.vector import write_vector_chunks
+from roof_area.pipeline.profiling import stage, tile_scope
+from roof_area.preprocess.tiling import pad_window, window_slices
+
+
+DEFAULT_POLYGON_TILE_SIZE = 1024
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+def polygonize_mask(
+    mask_path: str,
+    output_path: str,
+    *,
+    tile_size: int = DEFAULT_POLYGON_TILE_SIZE,
+    min_area_m2: float = 0.0,
+    simplify_tolerance: float = 0.0,
+    opening: int = 0,
+    closing: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    logger: logging.Logger | None = None,
+) -> int:
+    """Vectorize the roof pixels of a mask raster into a polygon layer and return its size.
+
+    The mask is read in ``tile_size`` windows, cleaned with a morphological
+    opening and closing of the given pixel radii, and polygonized per window.
+    Pieces that touch a tile seam are merged with their neighbours, so output
+    polygons do not depend on the tile size. Polygons smaller than
+    ``min_area_m2`` are dropped and the rest are simplified with
+    ``simplify_tolerance`` (CRS units, topology preserving). They are written in
+    chunks of ``chunk_size`` to GeoParquet or any OGR format (e.g. FlatGeobuf),
+    so only one row of tiles and the polygons crossing its lower seam are held
+    in memory.
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    with rasterio.open(mask_path) as dataset:
+        pixel_area_m2 = float(np.prod(get_pixel_size_m(dataset)))
+        polygons = iter_roof_polygons(
+            dataset, tile_size=tile_size, opening=opening, closing=closing
+        )
+        chunks = _polygon_chunks(
+            polygons,
+            transform=dataset.transform,
+            crs=dataset.crs,
+            pixel_area_m2=pixel_area_m2,
+            row_areas=geographic_row_areas(dataset),
+            min_area_m2=min_area_m2,
+            simplify_tolerance=simplify_tolerance,
+            chunk_size=chunk_size,
+        )
+        with stage("polygonize"):
+            count = write_vector_chunks(chunks, output_path)
+
+    logger.info(
+        "Saved %d roof polygons (min_area_m2=%.2f, simplify=%.3g) to %s",
+        count,
+        min_area_m2,
+        simplify_tolerance,
+        output_path,
+    )
+    return count
+
+
+def iter_roof_polygons(
+    dataset: rasterio.io.DatasetReader,
+    *,
+    tile_size: int = DEFAULT_POLYGON_TILE_SIZE,
+    opening: int = 0,
+    closing: int = 0,
+) -> Iterator[Polygon]:
+    """Yield the 4-connected roof regions of a mask as polygons in pixel coordinates.
+
+    Tiles are processed one row at a time. Pieces touching an inner seam are
+    unioned with the pieces across it. A polygon is yielded as soon as it cannot
+    reach the next tile row.
+    """
+    height, width = dataset.height, dataset.width
+    pending: List[Polygon] = []
+    for row_off in range(0, height, tile_size):
+        row_end = min(row_off + tile_size, height)
+        # Pending polygons end on this row's top seam, so they may continue here.
+        seam, finished = pending, []
+        for col_off in range(0, width, tile_size):
+            col_end = min(col_off + tile_size, width)
+            window = Window(col_off, row_off, col_end - col_off, row_end - row_off)
+            with tile_scope(window):
+                for polygon in _tile_polygons(dataset, window, opening=opening, closing=closing):
+                    minx, miny, maxx, _ = polygon.bounds
+                    on_seam = (
+                        (minx == col_off and col_off > 0)
+                        or (maxx == col_end and col_end < width)
+                        or (miny == row_off and row_off > 0)
+                    )
+                    (seam if on_seam else finished).append(polygon)
+        if seam:
+            finished.extend(shapely.get_parts(shapely.union_all(seam)))
+
+        pending = []
+        for polygon in finished:
+            if row_end < height and polygon.bounds[3] == row_end:
+                pending.append(polygon)
+            else:
+                yield polygon
+
+
+def _tile_polygons(
+    dataset: rasterio.io.DatasetReader,
+    window: Window,
+    *,
+    opening: int,
+    closing: int,
+) -> List[Polygon]:
+    # Opening and closing each look 2 * radius pixels away.
+    halo = 2 * (opening + closing)
+    padded = pad_window(window, halo, width=dataset.width, height=dataset.height)
+    with stage("read") as record:
+        data = dataset.read(1, window=padded)
+        record.bytes_read += data.nbytes
+    with stage("morphology"):
+        mask = (data > 0).astype(np.uint8)
+        if opening:
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, _disk(opening))
+        if closing:
+            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, _disk(closing))
+        mask = np.ascontiguousarray(mask[window_slices(window, padded)])
+    with stage("shapes"):
+        return [
+            shape(geometry)
+            for geometry, _ in features.shapes(
+                mask,
+                mask=mask.astype(bool),
+                connectivity=4,
+                transform=Affine.translation(window.col_off, window.row_off),
+            )
+        ]
+
+
+def _disk(radius: int) -> np.ndarray:
+    return cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * radius + 1, 2 * radius + 1))
+
+
+def _polygon_chunks(
+    polygons: Iterator[Polygon],
+    *,
+    transform: Affine,
+    crs: object,
+    pixel_area_m2: float,
+    min_area_m2: float,
+    simplify_tolerance: float,
+    chunk_size: int,
+    row_areas: np.ndarray | None = None,
+) -> Iterator[gpd.GeoDataFrame]:
+    """Filter, georeference and simplify pixel polygons into GeoDataFrame chunks.
+
+    With ``row_areas`` (geographic rasters) each polygon's pixel area is the one
+    of the row holding its centroid.
+    """
+    coefficients = np.array([[transform.a, transform.d], [transform.b, transform.e]])
+    offset = np.array([transform.c, transform.f])
+    next_id = 0
+    for batch in _batched(polygons, chunk_size):
+        geometries = np.asarray(batch, dtype=object)
+        if row_areas is None:
+            area_m2 = shapely.area(geometries) * pixel_area_m2
+        else:
+            rows = shapely.get_y(shapely.centroid(geometries)).astype(np.int64)
+            area_m2 = shapely.area(geometries) * row_areas[np.clip(rows, 0, len(row_areas) - 1)]
+        keep = area_m2 >= min_area_m2
+        geometries, area_m2 = geometries[keep], area_m2[keep]
+        if not len(geometries) and next_id:
+            continue
+        geometries = shapely.transform(geometries, lambda xy: xy @ coefficients + offset)
+        if simplify_tolerance > 0:
+            geometries = shapely.simplify(geometries, simplify_tolerance, preserve_topology=True)
+        yield gpd.GeoDataFrame(
+            {
+                "polygon_id": np.arange(next_id, next_id + len(geometries), dtype=np.int64),
+                "area_m2": area_m2,
+            },
+            geometry=gpd.GeoSeries(geometries, crs=crs),
+        )
+        next_id += len(geometries)
+
+
+def _batched(polygons: Iterator[Polygon], size: int) -> Iterator[List[Polygon]]:
+    # The final, possibly empty, batch is always yielded so an empty mask still
+    # produces a (schema-only) chunk.
+    batch: List[Polygon] = []
+    for polygon in polygons:
+        batch.append(polygon)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    yield batch
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+import rasterio
+from numpy.lib.format import open_memmap
+from rasterio.windows import Window, bounds as window_bounds
+
+from roof_area.io.raster import LocalRaster
+from roof_area.pipeline.executor import map_ordered
+from roof_area.pipeline.profiling import stage, tile_scope
+from roof_area.preprocess.footprints import FootprintIndex
+from roof_area.preprocess.tiling import iter_windows, occupied_tiles
+
+
+# Bump when shards written by older versions can no longer be read.
+CHIPS_VERSION = 1
+DEFAULT_SHARD_CHIPS = 512
+INDEX_NAME = "index.json"
+
+
+def write_chip_shards(
+    raster_path: str,
+    footprints: FootprintIndex,
+    output_dir: str,
+    *,
+    chip_size: int,
+    shard_chips: int = DEFAULT_SHARD_CHIPS,
+    include_empty: bool = False,
+    workers: int = 1,
+    metadata: Dict[str, Any] | None = None,
+    logger: logging.Logger | None = None,
+) -> "ChipShards":
+    """Cut image and footprint label chips once and store them as memory-mapped shards.
+
+    The raster is cut into ``chip_size`` windows with :func:`iter_windows`. Each
+    window's bands and its rasterized footprint mask are stored in
+    ``images-NNNNN.npy`` (N×C×H×W, raster dtype) and ``labels-NNNNN.npy``
+    (N×H×W, uint8) files of up to ``shard_chips`` chips. Edge chips are
+    zero-padded to the full chip size. Unless ``include_empty`` is set, chips
+    without any footprint are skipped. ``index.json`` lists the shards, the
+    window of every chip and ``metadata``; it is written last, so an
+    interrupted run leaves no readable index.
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    root = Path(output_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    # Drop the index first, so a half-rewritten directory is never read as valid.
+    (root / INDEX_NAME).unlink(missing_ok=True)
+    for stale in (*root.glob("images-*.npy"), *root.glob("labels-*.npy")):
+        stale.unlink()
+
+    with rasterio.open(raster_path) as dataset:
+        windows = list(iter_windows(dataset, chip_size))
+        if not include_empty:
+            occupied = occupied_tiles(dataset, chip_size, footprints.bounds()).ravel()
+            windows = [window for window, busy in zip(windows, occupied) if busy]
+        bands, dtype = dataset.count, np.dtype(dataset.dtypes[0])
+
+    shards: List[Dict[str, Any]] = []
+    with LocalRaster(raster_path) as raster:
+        context = _ChipContext(raster=raster, footprints=footprints, chip_size=chip_size)
+        chips = map_ordered(_cut_chip, context, windows, workers=workers)
+        for start in range(0, len(windows), shard_chips):
+            shard_windows = windows[start : start + shard_chips]
+            name = f"{len(shards):05d}"
+            images = open_memmap(
+                root / f"images-{name}.npy",
+                mode="w+",
+                dtype=dtype,
+                shape=(len(shard_windows), bands, chip_size, chip_size),
+            )
+            labels = open_memmap(
+                root / f"labels-{name}.npy",
+                mode="w+",
+                dtype=np.uint8,
+                shape=(len(shard_windows), chip_size, chip_size),
+            )
+            for offset in range(len(shard_windows)):
+                images[offset], labels[offset] = next(chips)
+            images.flush()
+            labels.flush()
+            del images, labels
+            shards.append(
+                {
+                    "images": f"images-{name}.npy",
+                    "labels": f"labels-{name}.npy",
+                    "windows": [
+                        [
+                            int(window.col_off),
+                            int(window.row_off),
+                            int(window.width),
+                            int(window.height),
+                        ]
+                        for window in shard_windows
+                    ],
+                }
+            )
+
+    index = {
+        "version": CHIPS_VERSION,
+        "chip_size": chip_size,
+        "bands": bands,
+        "dtype": dtype.name,
+        "metadata": metadata or {},
+        "shards": shards,
+    }
+    (root / INDEX_NAME).write_text(json.dumps(index))
+    logger.info(
+        "Wrote %d chips of %dx%d pixels in %d shards to %s",
+        len(windows),
+        chip_size,
+        chip_size,
+        len(shards),
+        root,
+    )
+    return ChipShards(str(root))
+
+
+@dataclass(frozen=True)
+class _ChipContext:
+    raster: LocalRaster
+    footprints: FootprintIndex
+    chip_size: int
+
+
+def _cut_chip(context: _ChipContext, window: Window) -> Tuple[np.ndarray, np.ndarray]:
+    with tile_scope(window):
+        dataset = context.raster.get()
+        size = context.chip_size
+        height, width = int(window.height), int(window.width)
+        with stage("read") as record:
+            image = np.zeros((dataset.count, size, size), dtype=dataset.dtypes[0])
+            dataset.read(window=window, out=image[:, :height, :width])
+            record.bytes_read += image.nbytes
+        with stage("footprints"):
+            label = np.zeros((size, size), dtype=np.uint8)
+            label[:height, :width] = context.footprints.rasterize(
+                window_bounds(window, dataset.transform),
+                out_shape=(height, width),
+                transform=dataset.window_transform(window),
+            )
+        return image, label
+
+
+class ChipShards:
+    """Read-only view of chip shards written by :func:`write_chip_shards`.
+
+    Shards are memory-mapped on first use, so opening a chip set is cheap and
+    reading a batch only touches the pages of the chips in it.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = Path(root)
+        index = json.loads((self.root / INDEX_NAME).read_text())
+        if index.get("version") != CHIPS_VERSION:
+            raise ValueError(
+                f"Chip index {self.root / INDEX_NAME} has version {index.get('version')}, "
+                f"expected {CHIPS_VERSION}."
+            )
+        self.chip_size: int = index["chip_size"]
+        self.bands: int = index["bands"]
+        self.dtype = np.dtype(index["dtype"])
+        self.metadata: Dict[str, Any] = index["metadata"]
+        self._shards = index["shards"]
+        sizes = [len(shard["windows"]) for shard in self._shards]
+        self._starts = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        self._arrays: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return int(self._starts[-1])
+
+    @property
+    def windows(self) -> List[Window]:
+        return [Window(*window) for shard in self._shards for window in shard["windows"]]
+
+    def read(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the ``(images, labels)`` of chips ``indices``, in that order."""
+        indices = np.asarray(indices, dtype=np.int64)
+        images = np.empty(
+            (len(indices), self.bands, self.chip_size, self.chip_size), dtype=self.dtype
+        )
+        labels = np.empty((len(indices), self.chip_size, self.chip_size), dtype=np.uint8)
+        shard_ids = np.searchsorted(self._starts, indices, side="right") - 1
+        for shard_id in np.unique(shard_ids):
+            rows = np.flatnonzero(shard_ids == shard_id)
+            offsets = indices[rows] - self._starts[shard_id]
+            shard_images, shard_labels = self._shard(int(shard_id))
+            # Reading in ascending offset order walks each file forward.
+            order = np.argsort(offsets, kind="stable")
+            images[rows[order]] = shard_images[offsets[order]]
+            labels[rows[order]] = shard_labels[offsets[order]]
+        return images, labels
+
+    def _shard(self, shard_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(shard_id)
+        if arrays is None:
+            shard = self._shards[shard_id]
+            arrays = (
+                np.load(self.root / shard["images"], mmap_mode="r"),
+                np.load(self.root / shard["labels"], mmap_mode="r"),
+            )
+            self._arrays[shard_id] = arrays
+        return arrays
+
+
+def iter_chip_batches(
+    chips: ChipShards,
+    *,
+    batch_size: int,
+    shuffle: bool = True,
+    seed: int = 0,
+    workers: int = 2,
+    prefetch: int = 4,
+    drop_last: bool = False,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Yield float32 ``(images, labels)`` batches, loading up to ``prefetch`` ahead.
+
+    Images are N×C×H×W scaled like model inference input (integers divided by
+    their dtype maximum) and labels N×1×H×W in {0, 1}. ``workers`` threads copy
+    chips out of the memory-mapped shards while the caller trains on earlier
+    batches; with one worker batches are loaded inline. The order is a
+    permutation drawn from ``seed``, so deriving the seed from the epoch number
+    reshuffles deterministically.
+    """
+    order = np.arange(len(chips))
+    if shuffle:
+        order = np.random.default_rng(seed).permutation(order)
+    stop = len(order) - len(order) % batch_size if drop_last else len(order)
+    batches = (order[start : start + batch_size] for start in range(0, stop, batch_size))
+    return map_ordered(
+        _load_batch,
+        chips,
+        batches,
+        workers=workers,
+        backend="thread",
+        max_in_flight=prefetch,
+    )
+
+
+def _load_batch(chips: ChipShards, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    with stage("load_chips") as record:
+        images, labels = chips.read(indices)
+        record.bytes_read += images.nbytes + labels.nbytes
+    batch = images.astype(np.float32)
+    if np.issubdtype(images.dtype, np.integer):
+        batch *= 1.0 / np.iinfo(images.dtype).max
+    return batch, labels[:, None].astype(np.float32)
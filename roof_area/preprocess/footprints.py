@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from typing import Iterable, List, Sequence, Tuple
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from affine import Affine
+from rasterio import features
+from shapely import STRtree
+from shapely.geometry import Polygon, box
+
+
+class FootprintIndex:
+    """Spatial index over footprint polygons for per-window rasterization.
+
+    Each polygon carries the 1-based label of the building it belongs to, so one
+    rasterization yields both the footprint mask and the building-ID labels.
+    """
+
+    def __init__(self, gdf: gpd.GeoDataFrame) -> None:
+        self.building_ids = building_ids(gdf)
+        self._polygons: List[Polygon] = []
+        labels: List[int] = []
+        for label, geometry in enumerate(gdf.geometry, start=1):
+            for polygon in iter_polygons([geometry]):
+                self._polygons.append(polygon)
+                labels.append(label)
+        self._labels = np.asarray(labels, dtype=np.uint32)
+        self._tree = STRtree(self._polygons)
+
+    def __len__(self) -> int:
+        return len(self.building_ids)
+
+    def __getstate__(self) -> dict:
+        return {
+            "building_ids": self.building_ids,
+            "polygons": self._polygons,
+            "labels": self._labels,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.building_ids = state["building_ids"]
+        self._polygons = state["polygons"]
+        self._labels = state["labels"]
+        self._tree = STRtree(self._polygons)
+
+    def bounds(self, within: Tuple[float, float, float, float] | None = None) -> np.ndarray:
+        """Return ``(n, 4)`` polygon bounding boxes, optionally only those intersecting ``within``."""
+        polygons = np.asarray(self._polygons, dtype=object)
+        if within is not None:
+            polygons = polygons[self._query(within)]
+        return shapely.bounds(polygons).reshape(-1, 4)
+
+    def rasterize(
+        self,
+        bounds: Tuple[float, float, float, float],
+        *,
+        out_shape: Tuple[int, int],
+        transform: Affine,
+    ) -> np.ndarray:
+        indices = self._query(bounds)
+        polygons = [self._polygons[index] for index in indices]
+        return rasterize_footprints(polygons, out_shape=out_shape, transform=transform)
+
+    def labels(
+        self,
+        bounds: Tuple[float, float, float, float],
+        *,
+        out_shape: Tuple[int, int],
+        transform: Affine,
+    ) -> np.ndarray:
+        """Burn building labels into a uint32 raster; later buildings win overlaps."""
+        indices = self._query(bounds)
+        if not len(indices):
+            return np.zeros(out_shape, dtype=np.uint32)
+        return features.rasterize(
+            ((self._polygons[index], int(self._labels[index])) for index in indices),
+            out_shape=out_shape,
+            transform=transform,
+            fill=0,
+            dtype=np.uint32,
+        )
+
+    def building_labels(self, bounds: Tuple[float, float, float, float]) -> np.ndarray:
+        """Return the sorted 1-based labels of buildings with a polygon box touching ``bounds``."""
+        return np.unique(self._labels[self._query(bounds)])
+
+    def _query(self, bounds: Tuple[float, float, float, float]) -> np.ndarray:
+        return np.sort(self._tree.query(box(*bounds)))
+
+
+def building_ids(gdf: gpd.GeoDataFrame) -> np.ndarray:
+    for column in ("building_id", "id"):
+        if column in gdf.columns:
+            return gdf[column].to_numpy()
+    return gdf.index.to_numpy()
+
+
+def rasterize_footprints(
+    polygons: Sequence[Polygon],
+    *,
+    out_shape: Tuple[int, int],
+    transform: Affine,
+) -> np.ndarray:
+    """Burn all footprint polygons into a boolean mask in a single pass."""
+    if not polygons:
+        return np.zeros(out_shape, dtype=bool)
+
+    return features.geometry_mask(
+        polygons,
+        out_shape=out_shape,
+        transform=transform,
+        invert=True,
+    )
+
+
+def iter_polygons(geometries: Iterable[object]) -> Iterable[Polygon]:
+    for geometry in geometries:
+        if geometry is None:
+            continue
+        if geometry.geom_type == "Polygon":
+            yield geometry
+        elif geometry.geom_type == "MultiPolygon":
+            for polygon in geometry.geoms:
+                yield polygon
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+
+class ScratchBuffers:
+    """Named, growable work arrays reused from one tile to the next.
+
+    :meth:`get` returns a C-contiguous view of the requested shape into a flat
+    buffer that only grows, so a worker processing same-sized tiles allocates
+    once. A view stays valid until the same name is requested again, so results
+    that outlive a tile must be copied out.
+    """
+
+    def __init__(self) -> None:
+        self._buffers: Dict[str, np.ndarray] = {}
+
+    def get(self, name: str, shape: Tuple[int, ...], dtype: Any) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape))
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.dtype != dtype or buffer.size < size:
+            buffer = np.empty(size, dtype=dtype)
+            self._buffers[name] = buffer
+        return buffer[:size].reshape(shape)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buffer.nbytes for buffer in self._buffers.values())
+
+
+_local = threading.local()
+
+
+def thread_scratch() -> ScratchBuffers:
+    """Return the calling thread's scratch buffers, creating them on first use."""
+    scratch = getattr(_local, "scratch", None)
+    if scratch is None:
+        scratch = _local.scratch = ScratchBuffers()
+    return scratch
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
-from typing import Generator, Tuple
+import math
+from dataclasses import dataclass
+from typing import Generator, Iterator, List, Tuple
 
+import numpy as np
 import rasterio
+from rasterio.enums import MaskFlags
 from rasterio.windows import Window
 
 
 TileSize = Tuple[int, int]
+TILE_ORDERS = ("hilbert", "raster")
+# Overview samples wanted along each tile side when looking for empty tiles.
+_MASK_SAMPLES_PER_TILE = 4
 
 
 def _normalize_tile_size(tile_size: int | TileSize) -> TileSize:
@@ -33,3 +40,297 @@ def iter_windows(
             width = min(tile_width, dataset.width - x)
             height = min(tile_height, dataset.height - y)
             yield Window(col_off=x, row_off=y, width=width, height=height)
+
+
+def windows_intersecting(
+    dataset: rasterio.io.DatasetReader,
+    tile_size: int | TileSize,
+    window: Window,
+    overlap: int = 0,
+) -> List[Window]:
+    """Return the ``iter_windows`` tiles that intersect ``window``, in the same order."""
+    tile_width, tile_height = _normalize_tile_size(tile_size)
+    if overlap >= tile_width or overlap >= tile_height:
+        raise ValueError("overlap must be smaller than tile dimensions")
+
+    cols = _intersecting_starts(
+        int(window.col_off), int(window.col_off + window.width), tile_width, overlap
+    )
+    rows = _intersecting_starts(
+        int(window.row_off), int(window.row_off + window.height), tile_height, overlap
+    )
+    return [
+        Window(
+            col_off=x,
+            row_off=y,
+            width=min(tile_width, dataset.width - x),
+            height=min(tile_height, dataset.height - y),
+        )
+        for y in rows
+        if y < dataset.height
+        for x in cols
+        if x < dataset.width
+    ]
+
+
+def _intersecting_starts(start: int, stop: int, tile: int, overlap: int) -> range:
+    # Tile k covers [k * step, k * step + tile); keep those overlapping [start, stop).
+    step = tile - overlap
+    first = max(0, -(-(start - tile + 1) // step))
+    last = (stop - 1) // step
+    return range(first * step, last * step + 1, step)
+
+
+def pad_window(window: Window, padding: int, *, width: int, height: int) -> Window:
+    """Grow a window by ``padding`` pixels on each side, clipped to the raster extent."""
+    col_start = max(int(window.col_off) - padding, 0)
+    row_start = max(int(window.row_off) - padding, 0)
+    col_stop = min(int(window.col_off + window.width) + padding, width)
+    row_stop = min(int(window.row_off + window.height) + padding, height)
+    return Window(
+        col_off=col_start,
+        row_off=row_start,
+        width=col_stop - col_start,
+        height=row_stop - row_start,
+    )
+
+
+def window_slices(inner: Window, outer: Window) -> Tuple[slice, slice]:
+    """Return (row, col) slices selecting ``inner`` from an array read for ``outer``."""
+    row_start = int(inner.row_off - outer.row_off)
+    col_start = int(inner.col_off - outer.col_off)
+    return (
+        slice(row_start, row_start + int(inner.height)),
+        slice(col_start, col_start + int(inner.width)),
+    )
+
+
+def occupied_tiles(
+    dataset: rasterio.io.DatasetReader,
+    tile_size: int | TileSize,
+    bounds: np.ndarray,
+) -> np.ndarray:
+    """Flag the ``iter_windows`` tiles (overlap 0) touched by any of ``bounds``.
+
+    ``bounds`` is an ``(n, 4)`` array of ``(minx, miny, maxx, maxy)`` boxes in the
+    dataset CRS. Returns a boolean ``(tile rows, tile columns)`` grid in
+    ``iter_windows`` order. Boxes are marked with a 2D difference array, so the
+    cost is linear in boxes plus tiles.
+    """
+    tile_width, tile_height = _normalize_tile_size(tile_size)
+    grid_shape = (-(-dataset.height // tile_height), -(-dataset.width // tile_width))
+    bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+    if not len(bounds):
+        return np.zeros(grid_shape, dtype=bool)
+
+    inverse = ~dataset.transform
+    xs = bounds[:, [0, 0, 2, 2]]
+    ys = bounds[:, [1, 3, 1, 3]]
+    cols = inverse.a * xs + inverse.b * ys + inverse.c
+    rows = inverse.d * xs + inverse.e * ys + inverse.f
+    col_min, col_max = np.floor(cols.min(axis=1)), np.floor(cols.max(axis=1))
+    row_min, row_max = np.floor(rows.min(axis=1)), np.floor(rows.max(axis=1))
+    inside = (
+        (col_max >= 0) & (col_min < dataset.width) & (row_max >= 0) & (row_min < dataset.height)
+    )
+
+    c0, c1 = _tile_range(col_min[inside], col_max[inside], tile_width, dataset.width)
+    r0, r1 = _tile_range(row_min[inside], row_max[inside], tile_height, dataset.height)
+    return _mark_tiles(grid_shape, r0, r1, c0, c1)
+
+
+def block_aligned_tile_size(
+    dataset: rasterio.io.DatasetReader, tile_size: int | TileSize
+) -> TileSize:
+    """Round ``tile_size`` to a whole number of the dataset's internal blocks.
+
+    Each side becomes the nearest positive multiple of the block size, so tile
+    edges fall on block edges and no block is decoded for two tiles. Striped
+    and single-block layouts, whose blocks span the raster, are left as is.
+    """
+    tile_width, tile_height = _normalize_tile_size(tile_size)
+    block_height, block_width = dataset.block_shapes[0]
+    if block_width >= dataset.width or block_height >= dataset.height:
+        return tile_width, tile_height
+    return (
+        max(1, round(tile_width / block_width)) * block_width,
+        max(1, round(tile_height / block_height)) * block_height,
+    )
+
+
+@dataclass(frozen=True)
+class TilePlan:
+    """Non-overlapping tiles of one raster, in the order they should be processed.
+
+    ``windows`` are the tiles to compute; ``skipped`` are the remaining tiles of
+    the grid, in ``iter_windows`` order, which callers write as empty output.
+    A plan is plain data, so the same one can drive several passes.
+    """
+
+    tile_size: TileSize
+    grid_shape: Tuple[int, int]
+    windows: List[Window]
+    skipped: List[Window]
+    nodata_tiles: int
+    bytes_per_pixel: int
+
+    def __len__(self) -> int:
+        return len(self.windows)
+
+    def __iter__(self) -> Iterator[Window]:
+        return iter(self.windows)
+
+    @property
+    def total_tiles(self) -> int:
+        return self.grid_shape[0] * self.grid_shape[1]
+
+    @property
+    def estimated_bytes(self) -> int:
+        """Decoded bytes of all bands over the planned tiles, without halos."""
+        pixels = sum(int(window.width) * int(window.height) for window in self.windows)
+        return pixels * self.bytes_per_pixel
+
+    def summary(self) -> str:
+        width, height = self.tile_size
+        return (
+            f"{len(self.windows)} of {self.total_tiles} {width}x{height} tiles, "
+            f"{self.nodata_tiles} skipped as nodata, ~{self.estimated_bytes / 2**20:.1f} MiB"
+        )
+
+
+def plan_tiles(
+    dataset: rasterio.io.DatasetReader,
+    tile_size: int | TileSize,
+    *,
+    bounds: np.ndarray | None = None,
+    keep_bounds: np.ndarray | None = None,
+    align: bool = True,
+    skip_nodata: bool = True,
+    order: str = "hilbert",
+) -> TilePlan:
+    """Plan the non-overlapping tiles to compute for ``dataset``.
+
+    With ``align`` the tile size is rounded by :func:`block_aligned_tile_size`.
+    With ``bounds`` only tiles touched by those boxes are kept, as in
+    :func:`occupied_tiles`. With ``skip_nodata`` tiles whose pixels are all
+    masked are dropped, except tiles touched by ``keep_bounds``. A tile is only
+    dropped once the full-resolution dataset mask confirms it; overviews merely
+    spare that check for tiles they already show valid pixels in. Masks derived
+    from a nodata value are only checked when the raster has overviews, since
+    otherwise every tile would be decoded twice. ``order="hilbert"`` sorts the
+    tiles along a Hilbert curve, so consecutive tiles are spatial neighbours
+    and share cached blocks and halos.
+    """
+    if order not in TILE_ORDERS:
+        raise ValueError(f"order must be one of {', '.join(TILE_ORDERS)}, got {order!r}")
+    if align:
+        tile_size = block_aligned_tile_size(dataset, tile_size)
+    tile_width, tile_height = _normalize_tile_size(tile_size)
+    grid_shape = (-(-dataset.height // tile_height), -(-dataset.width // tile_width))
+    windows = list(iter_windows(dataset, (tile_width, tile_height)))
+
+    keep = np.ones(grid_shape, dtype=bool)
+    if bounds is not None:
+        keep &= occupied_tiles(dataset, (tile_width, tile_height), bounds)
+    nodata_tiles = 0
+    if skip_nodata:
+        candidates = keep.copy()
+        if keep_bounds is not None:
+            candidates &= ~occupied_tiles(dataset, (tile_width, tile_height), keep_bounds)
+        empty = _empty_tiles(dataset, (tile_width, tile_height), grid_shape, windows, candidates)
+        if empty is not None:
+            nodata_tiles = int(empty.sum())
+            keep &= ~empty
+
+    selected = np.flatnonzero(keep.ravel())
+    if order == "hilbert" and selected.size:
+        rows, cols = np.divmod(selected, grid_shape[1])
+        side = 1 << max(grid_shape[0] - 1, grid_shape[1] - 1, 1).bit_length()
+        selected = selected[np.argsort(_hilbert_keys(rows, cols, side), kind="stable")]
+    return TilePlan(
+        tile_size=(tile_width, tile_height),
+        grid_shape=grid_shape,
+        windows=[windows[index] for index in selected],
+        skipped=[window for window, busy in zip(windows, keep.ravel()) if not busy],
+        nodata_tiles=nodata_tiles,
+        bytes_per_pixel=sum(np.dtype(dtype).itemsize for dtype in dataset.dtypes),
+    )
+
+
+def _empty_tiles(
+    dataset: rasterio.io.DatasetReader,
+    tile_size: TileSize,
+    grid_shape: Tuple[int, int],
+    windows: List[Window],
+    candidates: np.ndarray,
+) -> np.ndarray | None:
+    # Flag candidate tiles whose pixels are all masked, or None when that is not cheap to know.
+    flags = dataset.mask_flag_enums
+    if all(MaskFlags.all_valid in band_flags for band_flags in flags):
+        return None
+    tile_width, tile_height = tile_size
+    limit = min(tile_width, tile_height) // _MASK_SAMPLES_PER_TILE
+    factors = [factor for factor in dataset.overviews(1) if 1 < factor <= limit]
+    if factors:
+        # A valid overview sample means the tile has data, so only tiles that look
+        # empty at the overview are checked at full resolution.
+        factor = max(factors)
+        out_shape = (math.ceil(dataset.height / factor), math.ceil(dataset.width / factor))
+        rows, cols = np.nonzero(dataset.dataset_mask(out_shape=out_shape))
+        scale_y = dataset.height / out_shape[0]
+        scale_x = dataset.width / out_shape[1]
+        r0, r1 = _tile_range(
+            np.floor(rows * scale_y), np.ceil((rows + 1) * scale_y) - 1, tile_height, dataset.height
+        )
+        c0, c1 = _tile_range(
+            np.floor(cols * scale_x), np.ceil((cols + 1) * scale_x) - 1, tile_width, dataset.width
+        )
+        candidates = candidates & ~_mark_tiles(grid_shape, r0, r1, c0, c1)
+    elif MaskFlags.per_dataset not in flags[0] or MaskFlags.alpha in flags[0]:
+        return None
+    empty = np.zeros(grid_shape, dtype=bool)
+    for index in np.flatnonzero(candidates.ravel()):
+        empty.flat[index] = not dataset.dataset_mask(window=windows[index]).any()
+    return empty
+
+
+def _mark_tiles(
+    grid_shape: Tuple[int, int],
+    r0: np.ndarray,
+    r1: np.ndarray,
+    c0: np.ndarray,
+    c1: np.ndarray,
+) -> np.ndarray:
+    # Flag every tile in the half-open index rectangles with a 2D difference array.
+    marks = np.zeros((grid_shape[0] + 1, grid_shape[1] + 1), dtype=np.int64)
+    np.add.at(marks, (r0, c0), 1)
+    np.add.at(marks, (r0, c1), -1)
+    np.add.at(marks, (r1, c0), -1)
+    np.add.at(marks, (r1, c1), 1)
+    return marks.cumsum(axis=0).cumsum(axis=1)[:-1, :-1] > 0
+
+
+def _hilbert_keys(rows: np.ndarray, cols: np.ndarray, side: int) -> np.ndarray:
+    # Distance along the Hilbert curve filling a side x side grid (side a power of two).
+    x, y = cols.astype(np.int64), rows.astype(np.int64)
+    keys = np.zeros_like(x)
+    s = side // 2
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        keys += s * s * ((3 * rx) ^ ry)
+        flip = rx & ~ry
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        x, y = np.where(ry, x, y), np.where(ry, y, x)
+        s //= 2
+    return keys
+
+
+def _tile_range(
+    low: np.ndarray, high: np.ndarray, size: int, limit: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Half-open [first, last + 1) tile indices of inclusive pixel ranges.
+    first = np.clip(low, 0, limit - 1).astype(np.int64) // size
+    last = np.clip(high, 0, limit - 1).astype(np.int64) // size
+    return first, last + 1
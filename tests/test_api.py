@@ -0,0 +1,152 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+import rasterio
+import geopandas
+from rasterio.io import MemoryFile
+from rasterio.transform import from_origin
+from shapely import geometry as shapely_geometry
+
+from roof_area.api import RoofAreaService, build_server
+from roof_area.config import RoofAreaSettings
+from roof_area.model.infer import run_inference
+
+
+@pytest.fixture()
+def scene(tmp_path):
+    raster_path = tmp_path / "scene.tif"
+    data = np.random.default_rng(9).integers(0, 255, size=(3, 60, 80), dtype=np.uint8)
+    with rasterio.open(
+        raster_path,
+        "w",
+        driver="GTiff",
+        height=60,
+        width=80,
+        count=3,
+        dtype=data.dtype,
+        crs="EPSG:3857",
+        transform=from_origin(100, 200, 0.5, 0.5),
+    ) as dataset:
+        dataset.write(data)
+
+    footprints_path = tmp_path / "footprints.geojson"
+    geometry = [
+        shapely_geometry.box(102, 185, 110, 198),
+        shapely_geometry.box(121, 172, 133, 181),
+        shapely_geometry.box(135, 190, 139, 195),
+    ]
+    geopandas.GeoDataFrame(
+        {"building_id": ["a", "b", "c"]}, geometry=geometry, crs="EPSG:3857"
+    ).to_file(footprints_path, driver="GeoJSON")
+
+    mask_path = tmp_path / "mask.tif"
+    run_inference(
+        raster_path=str(raster_path),
+        footprints_path=str(footprints_path),
+        output_path=str(mask_path),
+        model_path=None,
+        threshold=0.3,
+    )
+    with rasterio.open(mask_path) as dataset:
+        expected = dataset.read(1)
+    settings = RoofAreaSettings(
+        raster_path=str(raster_path),
+        footprints_path=str(footprints_path),
+        threshold=0.3,
+        tile_size=64,
+        min_area_m2=0.0,
+        workers=2,
+    )
+    return settings, expected
+
+
+def test_service_query_matches_full_run_and_grows_to_buildings(scene):
+    settings, expected = scene
+    service = RoofAreaService(settings)
+    try:
+        result = service.query((123, 174, 125, 176), "EPSG:3857")
+    finally:
+        service.close()
+
+    window = result.window
+    assert (window.col_off, window.row_off, window.width, window.height) == (42, 38, 24, 18)
+    rows = slice(window.row_off, window.row_off + window.height)
+    cols = slice(window.col_off, window.col_off + window.width)
+    np.testing.assert_array_equal(result.mask, expected[rows, cols])
+    assert result.buildings["building_id"].tolist() == ["b"]
+    assert result.buildings["roof_pixels"].iloc[0] == np.count_nonzero(expected[rows, cols])
+
+
+def test_http_service_answers_json_and_geotiff(scene):
+    settings, expected = scene
+    service = RoofAreaService(settings)
+    server = build_server(service, "127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = "http://127.0.0.1:%d" % server.server_address[1]
+
+    def post(payload):
+        request = urllib.request.Request(
+            f"{url}/mask",
+            data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request) as response:
+            return response.headers["Content-Type"], response.read()
+
+    try:
+        with urllib.request.urlopen(f"{url}/health") as response:
+            assert json.loads(response.read())["status"] == "ok"
+
+        content_type, body = post({"bounds": [100, 170, 140, 200], "crs": "EPSG:3857"})
+        summary = json.loads(body)
+        assert content_type == "application/json"
+        assert summary["roof_pixels"] == int(np.count_nonzero(expected))
+        assert sorted(row["building_id"] for row in summary["buildings"]) == ["a", "b", "c"]
+
+        content_type, body = post(
+            {"bounds": [100, 170, 140, 200], "crs": "EPSG:3857", "format": "geotiff"}
+        )
+        assert content_type == "image/tiff"
+        with MemoryFile(body) as memfile, memfile.open() as dataset:
+            np.testing.assert_array_equal(dataset.read(1), expected)
+
+        with pytest.raises(urllib.error.HTTPError) as error:
+            post({"bounds": [0, 0, 1, 1], "crs": "EPSG:3857"})
+        assert error.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+class _CountingModel:
+    channels = 3
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, batch):
+        self.batches.append(len(batch))
+        return batch.mean(axis=1)
+
+
+def test_model_tiles_from_concurrent_queries_share_batches(scene):
+    settings, _ = scene
+    settings = settings.model_copy(update={"tile_size": 64, "overlap": 0, "batch_size": 8})
+    model = _CountingModel()
+    service = RoofAreaService(settings, model=model)
+    try:
+        futures = [service.submit((100, 170, 140, 200), "EPSG:3857") for _ in range(4)]
+        results = [future.result() for future in futures]
+    finally:
+        service.close()
+
+    assert sum(model.batches) == 8
+    assert len(model.batches) < 8
+    for result in results[1:]:
+        np.testing.assert_array_equal(result.mask, results[0].mask)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from pyproj import Geod
+from rasterio.transform import from_origin
+
+from roof_area.metrics.area import (
+    BuildingAreaAccumulator,
+    label_pixel_counts,
+    mask_area_m2,
+    pixel_row_areas,
+)
+from roof_area.pipeline.run import aggregate_area
+
+
+def test_label_pixel_counts_matches_per_label_loop():
+    rng = np.random.default_rng(3)
+    labels = rng.integers(0, 6, size=(20, 30)).astype(np.uint32)
+    labels[labels == 4] = 0
+    mask = rng.random((20, 30)) > 0.5
+
+    present, footprint, roof = label_pixel_counts(labels, mask)
+
+    assert present.tolist() == [1, 2, 3, 5]
+    for label, footprint_count, roof_count in zip(present, footprint, roof):
+        assert footprint_count == np.count_nonzero(labels == label)
+        assert roof_count == np.count_nonzero(mask & (labels == label))
+
+
+def test_building_area_accumulator_tiles_and_filters():
+    labels = np.array([[1, 1, 0, 2], [1, 3, 3, 2]], dtype=np.uint32)
+    mask = np.array([[True, True, True, False], [True, True, False, True]])
+    accumulator = BuildingAreaAccumulator(["a", "b", "c"])
+    accumulator.add(labels[:, :2], mask[:, :2])
+    accumulator.add(labels[:, 2:], mask[:, 2:])
+
+    table = accumulator.to_frame((2.0, 0.5), min_area_m2=1.0)
+
+    assert table["building_id"].tolist() == ["a", "b", "c"]
+    assert table["roof_pixels"].tolist() == [3, 1, 1]
+    assert table["area_m2"].tolist() == [3.0, 1.0, 1.0]
+    assert table["area_m2"].sum() == mask_area_m2(mask & (labels > 0), 2.0, 0.5)
+
+    filtered = accumulator.to_frame(2.0, 0.5, min_area_m2=2.0)
+    assert filtered["building_id"].tolist() == ["a"]
+    assert aggregate_area(filtered)["area_m2"].tolist() == [3.0]
+
+
+def test_building_area_accumulator_requires_pixel_size_y():
+    with pytest.raises(ValueError):
+        BuildingAreaAccumulator([1]).to_frame(1.0)
+
+
+def test_pixel_row_areas_match_geodesic_pixel_areas():
+    transform = from_origin(10.0, 60.0, 0.001, 0.002)
+    areas = pixel_row_areas(transform, "EPSG:4326", 4)
+
+    geod = Geod(ellps="WGS84")
+    for row, area in enumerate(areas):
+        top, bottom = 60.0 - 0.002 * row, 60.0 - 0.002 * (row + 1)
+        expected, _ = geod.polygon_area_perimeter(
+            [10.0, 10.001, 10.001, 10.0], [top, top, bottom, bottom]
+        )
+        assert area == pytest.approx(abs(expected), rel=1e-9)
+    np.testing.assert_array_equal(pixel_row_areas(from_origin(0, 0, 2, 3), "EPSG:3857", 2), 6.0)
+
+
+def test_building_area_accumulator_uses_row_areas():
+    labels = np.array([[1, 1, 2], [1, 2, 2]], dtype=np.uint32)
+    mask = np.array([[True, False, True], [True, True, False]])
+    row_areas = np.array([2.0, 5.0])
+    accumulator = BuildingAreaAccumulator(["a", "b"])
+    accumulator.add(labels[:1], mask[:1], row_areas[:1])
+    accumulator.add(labels[1:], mask[1:], row_areas[1:])
+
+    table = accumulator.to_frame(1.0, 1.0, min_area_m2=0.0)
+    assert table["roof_pixels"].tolist() == [2, 2]
+    assert table["footprint_area_m2"].tolist() == [9.0, 12.0]
+    assert table["area_m2"].tolist() == [7.0, 7.0]
+    assert mask_area_m2(mask, row_areas=row_areas) == table["area_m2"].sum()
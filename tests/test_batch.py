@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+import geopandas
+import rasterio
+from rasterio.transform import from_origin
+from shapely import geometry as shapely_geometry
+
+from roof_area.cli import main
+
+
+def _write_scene(path, seed):
+    data = np.random.default_rng(seed).integers(0, 255, size=(3, 40, 40), dtype=np.uint8)
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        height=40,
+        width=40,
+        count=3,
+        dtype=data.dtype,
+        crs="EPSG:3857",
+        transform=from_origin(100, 200, 0.5, 0.5),
+    ) as dataset:
+        dataset.write(data)
+
+
+def _read_state(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_batch_runs_manifest_and_resumes(tmp_path):
+    footprints_path = tmp_path / "footprints.geojson"
+    geopandas.GeoDataFrame(
+        {"id": [1]}, geometry=[shapely_geometry.box(102, 185, 115, 198)], crs="EPSG:3857"
+    ).to_file(footprints_path, driver="GeoJSON")
+    for seed in range(3):
+        _write_scene(tmp_path / f"scene_{seed}.tif", seed)
+
+    manifest_path = tmp_path / "scenes.csv"
+    manifest_path.write_text(
+        "raster,footprints,output,areas\n"
+        "scene_0.tif,footprints.geojson,out/mask_0.tif,out/areas_0.csv\n"
+        "scene_1.tif,footprints.geojson,out/mask_1.tif,\n"
+        "scene_2.tif,footprints.geojson,,\n"
+        "missing.tif,footprints.geojson,out/missing.tif,\n"
+    )
+    args = ["batch", "--manifest", str(manifest_path), "--jobs", "2", "--tile-size", "64"]
+
+    assert main(args) == 1
+    state_path = tmp_path / "scenes.csv.state.jsonl"
+    records = {record["raster"]: record for record in _read_state(state_path)}
+    assert [records[str(tmp_path / f"scene_{seed}.tif")]["status"] for seed in range(3)] == [
+        "done"
+    ] * 3
+    assert records[str(tmp_path / "missing.tif")]["status"] == "failed"
+    assert (tmp_path / "out" / "areas_0.csv").exists()
+    assert (tmp_path / "scene_2_roof_mask.tif").exists()
+
+    (tmp_path / "out" / "mask_1.tif").unlink()
+    assert main(args) == 1
+    rerun = [record["raster"] for record in _read_state(state_path)[4:]]
+    assert sorted(rerun) == sorted([str(tmp_path / "scene_1.tif"), str(tmp_path / "missing.tif")])
+    assert (tmp_path / "out" / "mask_1.tif").exists()
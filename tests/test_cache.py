@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+from roof_area.io.cache import ArrayCache
+
+
+def test_cache_round_trips_memory_mapped_entries(tmp_path):
+    cache = ArrayCache(str(tmp_path / "cache"))
+    key = cache.key("gradient", raster="abc", version=1)
+    assert key == cache.key("gradient", version=1, raster="abc")
+    assert key != cache.key("gradient", raster="abd", version=1)
+    assert cache.get(key) is None
+
+    with cache.create(key, (3, 4), np.float32) as entry:
+        entry.array[:] = np.arange(12).reshape(3, 4)
+        entry.metadata["max_magnitude"] = 11.0
+
+    cached = cache.get(key)
+    assert isinstance(cached.array, np.memmap)
+    np.testing.assert_array_equal(cached.array, np.arange(12).reshape(3, 4))
+    assert cached.metadata == {"max_magnitude": 11.0}
+
+
+def test_cache_discards_entries_that_fail_to_build(tmp_path):
+    cache = ArrayCache(str(tmp_path / "cache"))
+    with pytest.raises(RuntimeError):
+        with cache.create("labels-x", (2, 2), np.uint32):
+            raise RuntimeError("boom")
+
+    assert cache.get("labels-x") is None
+    assert not list((tmp_path / "cache").glob("labels-x*"))
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ArrayCache(str(tmp_path / "cache"), max_bytes=2500)
+    for index, key in enumerate(("a", "b")):
+        with cache.create(key, (1000,), np.uint8):
+            pass
+        os.utime(tmp_path / "cache" / f"{key}.npy", ns=(index, index))
+
+    cache.get("a")
+    with cache.create("c", (1000,), np.uint8):
+        pass
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_digest_tracks_file_content(tmp_path):
+    cache = ArrayCache(str(tmp_path / "cache"))
+    path = tmp_path / "scene.bin"
+    path.write_bytes(b"first")
+    first = cache.digest(str(path))
+    assert cache.digest(str(path)) == first
+
+    path.write_bytes(b"second")
+    assert cache.digest(str(path)) != first
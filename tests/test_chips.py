@@ -0,0 +1,104 @@
+import geopandas
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+from shapely import geometry as shapely_geometry
+
+from roof_area.model import train
+from roof_area.model.infer import load_footprints
+from roof_area.preprocess.chips import iter_chip_batches, write_chip_shards
+from roof_area.preprocess.footprints import FootprintIndex
+
+
+def _write_scene(tmp_path, width=50, height=40):
+    raster_path = tmp_path / "scene.tif"
+    data = np.random.default_rng(5).integers(0, 60000, size=(3, height, width), dtype=np.uint16)
+    with rasterio.open(
+        raster_path,
+        "w",
+        driver="GTiff",
+        height=height,
+        width=width,
+        count=3,
+        dtype=data.dtype,
+        crs="EPSG:3857",
+        transform=from_origin(0, 40, 1, 1),
+    ) as dataset:
+        dataset.write(data)
+    footprints_path = tmp_path / "footprints.geojson"
+    geometry = [shapely_geometry.box(2, 30, 10, 38), shapely_geometry.box(40, 12, 49, 20)]
+    geopandas.GeoDataFrame({"id": [1, 2]}, geometry=geometry, crs="EPSG:3857").to_file(
+        footprints_path, driver="GeoJSON"
+    )
+    return raster_path, footprints_path, data
+
+
+def test_prepare_chips_cuts_occupied_windows_once(tmp_path, monkeypatch):
+    raster_path, footprints_path, data = _write_scene(tmp_path)
+    chips_dir = str(tmp_path / "chips")
+
+    chips = train.prepare_chips(str(raster_path), str(footprints_path), chips_dir, chip_size=16)
+    # 4x3 grid of 16 px chips; the two buildings touch three of them.
+    assert chips.windows == [Window(0, 0, 16, 16), Window(32, 16, 16, 16), Window(48, 16, 2, 16)]
+    images, labels = chips.read(np.array([2, 0]))
+    assert images.shape == (2, 3, 16, 16) and images.dtype == np.uint16
+    np.testing.assert_array_equal(images[1], data[:, :16, :16])
+    np.testing.assert_array_equal(images[0, :, :, :2], data[:, 16:32, 48:50])
+    assert not images[0, :, :, 2:].any()
+    assert labels[1, 2:10, 2:10].all() and labels[1].sum() == 64
+    assert labels[0, 4:12, :1].all() and labels[0].sum() == 8
+
+    def fail(*args, **kwargs):
+        raise AssertionError("chips were cut again")
+
+    monkeypatch.setattr(train, "write_chip_shards", fail)
+    reused = train.prepare_chips(str(raster_path), str(footprints_path), chips_dir, chip_size=16)
+    assert len(reused) == 3
+
+
+def test_chip_batches_follow_seeded_order_across_shards(tmp_path):
+    raster_path, footprints_path, _ = _write_scene(tmp_path)
+    with rasterio.open(raster_path) as dataset:
+        footprints = FootprintIndex(load_footprints(dataset, str(footprints_path)))
+    chips = write_chip_shards(
+        str(raster_path),
+        footprints,
+        str(tmp_path / "chips"),
+        chip_size=16,
+        shard_chips=5,
+        include_empty=True,
+    )
+    assert len(chips) == 12 and len(list((tmp_path / "chips").glob("images-*.npy"))) == 3
+    images, labels = chips.read(np.arange(len(chips)))
+    scaled = images.astype(np.float32) * (1.0 / np.iinfo(np.uint16).max)
+
+    def epoch(seed, workers):
+        batches = list(
+            iter_chip_batches(chips, batch_size=5, seed=seed, workers=workers, prefetch=2)
+        )
+        assert [len(batch[0]) for batch in batches] == [5, 5, 2]
+        return np.concatenate([b[0] for b in batches]), np.concatenate([b[1] for b in batches])
+
+    batch_images, batch_labels = epoch(seed=1, workers=3)
+    order = np.random.default_rng(1).permutation(len(chips))
+    np.testing.assert_array_equal(batch_images, scaled[order])
+    np.testing.assert_array_equal(batch_labels[:, 0], labels[order])
+    np.testing.assert_array_equal(epoch(seed=1, workers=1)[0], batch_images)
+
+
+def test_train_model_saves_torchscript(tmp_path):
+    pytest.importorskip("torch")
+    from roof_area.model.runner import load_model
+
+    raster_path, footprints_path, _ = _write_scene(tmp_path)
+    chips = train.prepare_chips(
+        str(raster_path), str(footprints_path), str(tmp_path / "chips"), chip_size=16
+    )
+    model_path = train.train_model(
+        chips, str(tmp_path / "roof.pt"), epochs=1, batch_size=2, seed=0
+    )
+
+    probabilities = load_model(model_path).predict(np.zeros((1, 3, 16, 16), dtype=np.float32))
+    assert probabilities.shape == (1, 16, 16)
@@ -0,0 +1,59 @@
+import subprocess
+import sys
+
+import pytest
+
+# Cumulative import time of roof_area.cli, in microseconds. Typical is ~30 ms;
+# the budget leaves room for slow CI machines but fails if a heavy library
+# (GDAL, OpenCV, pandas: several hundred ms each) is imported at module load.
+CLI_IMPORT_BUDGET_US = 150_000
+HEAVY_MODULES = ("cv2", "geopandas", "numpy", "pandas", "pydantic", "rasterio", "shapely")
+
+
+def _import_times(statement):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_import_stays_within_budget():
+    times = _import_times("import roof_area.cli")
+
+    assert times["roof_area.cli"] < CLI_IMPORT_BUDGET_US
+    assert not [name for name in times if name.split(".")[0] in HEAVY_MODULES]
+
+
+@pytest.mark.parametrize(
+    "argv, loaded",
+    [
+        (["--help"], ()),
+        (["train"], ("pydantic",)),
+    ],
+)
+def test_cli_commands_only_load_what_they_need(argv, loaded):
+    statement = (
+        "import sys\n"
+        "from roof_area.cli import main\n"
+        "try:\n"
+        f"    main({argv!r})\n"
+        "except (SystemExit, ValueError):\n"
+        "    pass\n"
+        "print(' '.join(sorted({name.split('.')[0] for name in sys.modules})))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", statement], capture_output=True, text=True, check=True
+    )
+    modules = set(result.stdout.splitlines()[-1].split())
+
+    assert sorted(modules & set(HEAVY_MODULES)) == list(loaded)
@@ -0,0 +1,127 @@
+import json
+
+import numpy as np
+import pytest
+import rasterio
+import geopandas
+import pandas
+from rasterio.transform import from_origin
+from shapely import geometry as shapely_geometry
+
+from roof_area.cli import main
+from roof_area.metrics.evaluate import (
+    EvaluationPair,
+    evaluate_many,
+    evaluate_masks,
+    evaluation_report,
+)
+
+
+TRANSFORM = from_origin(0, 40, 0.5, 0.5)
+
+
+def _write_mask(path, data):
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        height=data.shape[0],
+        width=data.shape[1],
+        count=1,
+        dtype="uint8",
+        crs="EPSG:3857",
+        transform=TRANSFORM,
+    ) as dataset:
+        dataset.write(data.astype(np.uint8), 1)
+    return path
+
+
+@pytest.fixture()
+def mask_pair(tmp_path):
+    rng = np.random.default_rng(11)
+    pred = rng.random((70, 50)) > 0.4
+    truth = rng.random((70, 50)) > 0.5
+    return (
+        pred,
+        truth,
+        _write_mask(tmp_path / "pred.tif", pred),
+        _write_mask(tmp_path / "truth.tif", truth),
+    )
+
+
+def test_evaluate_masks_counts_match_full_image(mask_pair):
+    pred, truth, pred_path, truth_path = mask_pair
+
+    result = evaluate_masks(str(pred_path), str(truth_path), tile_size=16)
+
+    tp = np.count_nonzero(pred & truth)
+    fp = np.count_nonzero(pred & ~truth)
+    fn = np.count_nonzero(~pred & truth)
+    summary = result.summary()
+    assert (summary["tp"], summary["fp"], summary["fn"]) == (tp, fp, fn)
+    assert summary["iou"] == pytest.approx(tp / (tp + fp + fn))
+    assert summary["area_error_m2"] == pytest.approx((fp - fn) * 0.25)
+    assert len(result.tiles) == 4 * 5
+    assert result.tiles["tp"].sum() == tp
+
+
+def test_evaluate_masks_per_building_and_polygon_truth(tmp_path, mask_pair):
+    pred, _, pred_path, _ = mask_pair
+    truth_path = tmp_path / "roofs.geojson"
+    roof = shapely_geometry.box(2, 20, 12, 30)
+    geopandas.GeoDataFrame({"id": [1]}, geometry=[roof], crs="EPSG:3857").to_file(truth_path)
+    footprints_path = tmp_path / "footprints.geojson"
+    footprints = [shapely_geometry.box(0, 18, 14, 32), shapely_geometry.box(16, 2, 22, 10)]
+    geopandas.GeoDataFrame(
+        {"building_id": [10, 20]}, geometry=footprints, crs="EPSG:3857"
+    ).to_file(footprints_path)
+
+    result = evaluate_masks(
+        str(pred_path), str(truth_path), footprints_path=str(footprints_path), tile_size=16
+    )
+
+    truth = rasterio.features.geometry_mask([roof], (70, 50), TRANSFORM, invert=True)
+    assert result.summary()["tp"] == np.count_nonzero(pred & truth)
+    buildings = result.buildings.set_index("building_id")
+    for building_id, footprint in zip([10, 20], footprints):
+        inside = rasterio.features.geometry_mask([footprint], (70, 50), TRANSFORM, invert=True)
+        assert buildings.loc[building_id, "tp"] == np.count_nonzero(pred & truth & inside)
+        assert buildings.loc[building_id, "fp"] == np.count_nonzero(pred & ~truth & inside)
+    assert np.isnan(buildings.loc[20, "recall"])
+
+
+def test_evaluate_many_in_parallel_matches_serial(mask_pair):
+    _, _, pred_path, truth_path = mask_pair
+    pairs = [EvaluationPair(str(pred_path), str(truth_path))] * 3
+
+    serial = evaluation_report(evaluate_many(pairs, tile_size=16))
+    parallel = evaluation_report(evaluate_many(pairs, tile_size=16, workers=2))
+
+    assert parallel == serial
+    assert serial["overall"]["tp"] == 3 * serial["scenes"][0]["tp"]
+
+
+def test_eval_cli_with_manifest(tmp_path, mask_pair):
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("pred,truth\npred.tif,truth.tif\n")
+    summary_path = tmp_path / "report" / "summary.json"
+    tiles_path = tmp_path / "report" / "tiles.csv"
+
+    assert main(
+        [
+            "eval",
+            "--manifest",
+            str(manifest),
+            "--tile-size",
+            "64",
+            "--output",
+            str(summary_path),
+            "--tiles",
+            str(tiles_path),
+        ]
+    ) == 0
+
+    report = json.loads(summary_path.read_text())
+    assert len(report["scenes"]) == 1
+    assert report["overall"]["tp"] == report["scenes"][0]["tp"]
+    assert len(pandas.read_csv(tiles_path)) == 2
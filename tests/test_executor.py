@@ -0,0 +1,65 @@
+import threading
+import time
+
+import pytest
+
+from roof_area.pipeline.executor import map_ordered, map_unordered
+
+
+def _scaled(factor, item):
+    time.sleep(0.001 * (item % 3))
+    return item * factor
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_map_ordered_preserves_input_order(backend):
+    results = list(map_ordered(_scaled, 3, range(20), workers=4, backend=backend))
+    assert results == [item * 3 for item in range(20)]
+
+
+def test_map_ordered_bounds_in_flight_items():
+    submitted = []
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def items():
+        for item in range(30):
+            submitted.append(item)
+            yield item
+
+    def work(_, item):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.002)
+        with lock:
+            state["active"] -= 1
+        return item
+
+    consumed = 0
+    for _ in map_ordered(work, None, items(), workers=2, max_in_flight=3):
+        consumed += 1
+        assert len(submitted) - consumed <= 3
+
+    assert consumed == 30
+    assert state["peak"] <= 2
+
+
+def test_map_ordered_rejects_unknown_backend():
+    with pytest.raises(ValueError, match="backend"):
+        list(map_ordered(_scaled, 1, [1], workers=2, backend="gpu"))
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_map_unordered_yields_every_result(backend):
+    results = list(map_unordered(_scaled, 3, range(20), workers=4, backend=backend))
+    assert sorted(results) == [item * 3 for item in range(20)]
+
+
+def test_map_unordered_does_not_wait_for_slow_items():
+    def work(_, item):
+        time.sleep(0.2 if item == 0 else 0.0)
+        return item
+
+    results = list(map_unordered(work, None, range(4), workers=2, backend="thread"))
+    assert results[-1] == 0
@@ -0,0 +1,195 @@
+import logging
+import subprocess
+import sys
+
+import geopandas
+import numpy as np
+import pandas
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+from shapely import geometry as shapely_geometry
+
+from roof_area.model import infer
+from roof_area.model.incremental import (
+    build_snapshot,
+    diff_footprints,
+    read_snapshot,
+    snapshot_path,
+    write_snapshot,
+)
+from roof_area.model.infer import InferenceError, run_inference
+
+
+def _write_raster(path, width=96, height=80):
+    data = np.random.default_rng(11).integers(0, 255, size=(3, height, width), dtype=np.uint8)
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        height=height,
+        width=width,
+        count=3,
+        dtype=data.dtype,
+        crs="EPSG:3857",
+        transform=from_origin(100, 200, 0.5, 0.5),
+    ) as dataset:
+        dataset.write(data)
+
+
+def _write_footprints(path, buildings):
+    ids, geometry = zip(*buildings.items())
+    geopandas.GeoDataFrame(
+        {"building_id": list(ids)}, geometry=list(geometry), crs="EPSG:3857"
+    ).to_file(path, driver="GeoJSON")
+
+
+BUILDINGS = {
+    "a": shapely_geometry.box(101.3, 181.2, 110.7, 199.1),
+    "b": shapely_geometry.box(120.2, 170.4, 128.6, 180.3),
+    "c": shapely_geometry.box(135, 163, 146, 172),
+    "d": shapely_geometry.box(126, 176, 131, 186),
+}
+
+
+def test_diff_footprints_by_id_and_geometry_hash():
+    old = build_snapshot(
+        np.array(["a", "b", "c"]),
+        [BUILDINGS["a"], BUILDINGS["b"], BUILDINGS["c"]],
+        footprint_pixels=np.zeros(3),
+        roof_pixels=np.zeros(3),
+        metadata={},
+    )
+    moved = shapely_geometry.box(140, 190, 145, 195)
+    diff = diff_footprints(old, np.array(["a", "b", "d"]), [BUILDINGS["a"], moved, BUILDINGS["d"]])
+
+    assert diff.added.tolist() == ["d"]
+    assert diff.removed.tolist() == ["c"]
+    assert diff.modified.tolist() == ["b"]
+    assert len(diff) == 3
+    expected = [BUILDINGS["c"].bounds, BUILDINGS["b"].bounds, BUILDINGS["d"].bounds, moved.bounds]
+    np.testing.assert_array_equal(diff.dirty_bounds, expected)
+
+    with pytest.raises(ValueError, match="unique building IDs"):
+        diff_footprints(old, np.array(["a", "a"]), [BUILDINGS["a"], moved])
+
+
+def test_snapshot_round_trip(tmp_path):
+    snapshot = build_snapshot(
+        np.array([3, 7]),
+        [BUILDINGS["a"], BUILDINGS["b"]],
+        footprint_pixels=np.array([10, 20]),
+        roof_pixels=np.array([4, 5]),
+        metadata={"threshold": 0.3},
+    )
+    path = str(tmp_path / "mask.tif.snapshot.parquet")
+    write_snapshot(snapshot, path)
+
+    loaded = read_snapshot(path)
+    pandas.testing.assert_frame_equal(loaded.buildings, snapshot.buildings)
+    assert loaded.metadata == snapshot.metadata
+    assert read_snapshot(str(tmp_path / "missing.parquet")) is None
+
+
+def test_incremental_update_matches_full_run(tmp_path, monkeypatch):
+    raster_path = tmp_path / "scene.tif"
+    _write_raster(raster_path)
+    old_path, new_path = tmp_path / "old.geojson", tmp_path / "new.geojson"
+    _write_footprints(old_path, BUILDINGS)
+    edited = {key: value for key, value in BUILDINGS.items() if key != "c"}
+    edited["b"] = shapely_geometry.box(119.2, 171.4, 127.6, 182.3)
+    edited["e"] = shapely_geometry.box(140, 190, 146, 196)
+    _write_footprints(new_path, edited)
+
+    computed = []
+    baseline_tile = infer._baseline_tile
+
+    def counting_tile(tiles, window):
+        computed.append(window)
+        return baseline_tile(tiles, window)
+
+    monkeypatch.setattr(infer, "_baseline_tile", counting_tile)
+    options = dict(model_path=None, threshold=0.3, tile_size=16)
+    mask_path, areas_path = tmp_path / "mask.tif", tmp_path / "areas.csv"
+    for footprints_path in (old_path, new_path):
+        computed.clear()
+        run_inference(
+            raster_path=str(raster_path),
+            footprints_path=str(footprints_path),
+            output_path=str(mask_path),
+            areas_path=str(areas_path),
+            incremental=True,
+            **options,
+        )
+    assert 0 < len(computed) < 30
+
+    run_inference(
+        raster_path=str(raster_path),
+        footprints_path=str(new_path),
+        output_path=str(tmp_path / "full.tif"),
+        areas_path=str(tmp_path / "full.csv"),
+        **options,
+    )
+    with rasterio.open(mask_path) as patched, rasterio.open(tmp_path / "full.tif") as full:
+        expected = full.read(1)
+        assert expected.any()
+        np.testing.assert_array_equal(patched.read(1), expected)
+    pandas.testing.assert_frame_equal(
+        pandas.read_csv(areas_path), pandas.read_csv(tmp_path / "full.csv")
+    )
+
+    # Without edits nothing is recomputed.
+    computed.clear()
+    run_inference(
+        raster_path=str(raster_path),
+        footprints_path=str(new_path),
+        output_path=str(mask_path),
+        incremental=True,
+        **options,
+    )
+    assert computed == []
+
+
+def test_incremental_falls_back_to_full_run(tmp_path, caplog):
+    raster_path = tmp_path / "scene.tif"
+    _write_raster(raster_path)
+    footprints_path = tmp_path / "footprints.geojson"
+    _write_footprints(footprints_path, BUILDINGS)
+    mask_path = tmp_path / "mask.tif"
+    options = dict(
+        raster_path=str(raster_path),
+        footprints_path=str(footprints_path),
+        output_path=str(mask_path),
+        model_path=None,
+        tile_size=16,
+        incremental=True,
+    )
+
+    run_inference(threshold=0.3, **options)
+    assert read_snapshot(snapshot_path(str(mask_path))).metadata["threshold"] == 0.3
+    with caplog.at_level(logging.INFO):
+        run_inference(threshold=0.5, **options)
+    assert "different threshold" in caplog.text
+    assert read_snapshot(snapshot_path(str(mask_path))).metadata["threshold"] == 0.5
+
+    with pytest.raises(InferenceError, match="tile size"):
+        run_inference(**{**options, "tile_size": None}, threshold=0.5)
+
+
+def test_infer_imports_without_pyarrow():
+    # pyarrow is the optional geoparquet extra; only incremental snapshots need it.
+    statement = (
+        "import sys\n"
+        "sys.modules['pyarrow'] = None\n"
+        "import roof_area.model.infer\n"
+        "from roof_area.model.incremental import read_snapshot\n"
+        "try:\n"
+        "    read_snapshot('missing.parquet')\n"
+        "except ImportError as exc:\n"
+        "    print(exc)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", statement], capture_output=True, text=True, check=True
+    )
+
+    assert "roof-area[geoparquet]" in result.stdout
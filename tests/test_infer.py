@@ -1,12 +1,33 @@
+import functools
+import json
+import logging
+
 import numpy as np
 import pytest
 import rasterio
 import geopandas
+import pandas
 from shapely import geometry as shapely_geometry
 
 from rasterio.transform import from_origin
+from rasterio.windows import Window
 
-from roof_area.model.infer import InferenceError, run_inference
+from roof_area.io.cache import ArrayCache
+from roof_area.metrics.area import pixel_row_areas
+from roof_area.model import infer
+from roof_area.preprocess.footprints import iter_polygons
+from roof_area.preprocess.scratch import ScratchBuffers
+from roof_area.preprocess.tiling import plan_tiles
+from roof_area.model.infer import (
+    InferenceError,
+    _blend_weights,
+    _gradient_magnitude,
+    _mask_by_footprints,
+    _to_grayscale,
+    compute_gradient_max,
+    model_window_probabilities,
+    run_inference,
+)
 
 
 @pytest.fixture()
@@ -77,12 +98,638 @@ def test_baseline_requires_footprints(sample_raster):
         )
 
 
-def test_model_path_raises_not_implemented():
-    with pytest.raises(NotImplementedError):
+def test_model_path_rejects_unknown_format():
+    with pytest.raises(ValueError, match="Unsupported model format"):
         run_inference(
             raster_path="dummy.tif",
             footprints_path=None,
             output_path=None,
-            model_path="model.pt",
+            model_path="model.bin",
             threshold=0.5,
         )
+
+
+class _FirstBandModel:
+    channels = 1
+
+    def __init__(self):
+        self.batch_shapes = []
+
+    def predict(self, batch):
+        self.batch_shapes.append(batch.shape)
+        return batch[:, 0]
+
+
+def test_model_inference_batches_and_blends_tiles(tmp_path, monkeypatch):
+    raster_path = tmp_path / "scene.tif"
+    data = _write_random_raster(raster_path)
+    data = np.where(data > 127, 200, 100).astype(np.uint8)
+    with rasterio.open(raster_path, "r+") as dataset:
+        dataset.write(data)
+
+    model = _FirstBandModel()
+    monkeypatch.setattr(infer, "load_model", lambda path, threads=None: model)
+    output_path = tmp_path / "mask.tif"
+    run_inference(
+        raster_path=str(raster_path),
+        footprints_path=None,
+        output_path=str(output_path),
+        model_path="model.onnx",
+        threshold=0.5,
+        tile_size=16,
+        overlap=4,
+        batch_size=5,
+    )
+
+    with rasterio.open(output_path) as dataset:
+        np.testing.assert_array_equal(dataset.read(1), (data[0] == 200).astype(np.uint8))
+    assert model.batch_shapes[0] == (5, 1, 16, 16)
+    assert sum(shape[0] for shape in model.batch_shapes) == 4 * 4
+
+
+def test_model_window_probabilities_match_full_run(tmp_path):
+    raster_path = tmp_path / "scene.tif"
+    _write_random_raster(raster_path)
+    model = _FirstBandModel()
+    output_path = tmp_path / "mask.tif"
+    run_inference(
+        raster_path=str(raster_path),
+        footprints_path=None,
+        output_path=str(output_path),
+        model_path=None,
+        model=model,
+        threshold=0.5,
+        tile_size=16,
+        overlap=4,
+    )
+
+    window = rasterio.windows.Window(col_off=9, row_off=13, width=20, height=25)
+    with rasterio.open(raster_path) as dataset:
+        probabilities = model_window_probabilities(
+            dataset, window, model.predict, tile_size=16, overlap=4, channels=1
+        )
+    with rasterio.open(output_path) as dataset:
+        expected = dataset.read(1, window=window)
+    np.testing.assert_array_equal((probabilities > 0.5).astype(np.uint8), expected)
+
+
+def test_blend_weights_ramp_across_overlap():
+    weights = _blend_weights(8, 2)
+
+    np.testing.assert_allclose(weights[3], [1 / 3, 2 / 3, 1, 1, 1, 1, 2 / 3, 1 / 3], rtol=1e-6)
+    assert np.all(_blend_weights(8, 0) == 1.0)
+
+
+def test_onnx_model_inference(tmp_path):
+    onnx = pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    from onnx import TensorProto, helper
+
+    graph = helper.make_graph(
+        [helper.make_node("ReduceMean", ["image"], ["roof"], axes=[1], keepdims=1)],
+        "mean_band",
+        [helper.make_tensor_value_info("image", TensorProto.FLOAT, ["N", 3, "H", "W"])],
+        [helper.make_tensor_value_info("roof", TensorProto.FLOAT, ["N", 1, "H", "W"])],
+    )
+    model_path = tmp_path / "model.onnx"
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)], ir_version=8)
+    onnx.save(model, model_path)
+
+    raster_path = tmp_path / "scene.tif"
+    data = _write_random_raster(raster_path)
+    output_path = tmp_path / "mask.tif"
+    run_inference(
+        raster_path=str(raster_path),
+        footprints_path=None,
+        output_path=str(output_path),
+        model_path=str(model_path),
+        threshold=0.5,
+        tile_size=16,
+        overlap=0,
+        batch_size=4,
+        model_threads=1,
+    )
+
+    expected = data.astype(np.float32).mean(axis=0) / 255.0 > 0.5
+    with rasterio.open(output_path) as dataset:
+        mismatched = dataset.read(1) != expected
+    assert mismatched.mean() < 0.01
+
+
+def test_mask_by_footprints_matches_per_polygon_union(sample_raster, tmp_path):
+    footprints_path = tmp_path / "many.geojson"
+    geometry = [
+        shapely_geometry.box(0, 0, 4, 4),
+        shapely_geometry.box(2.2, 2.2, 7.8, 6.1),
+        shapely_geometry.MultiPolygon(
+            [shapely_geometry.box(6, 6, 9, 9), shapely_geometry.box(0.5, 7, 2.5, 9.5)]
+        ),
+    ]
+    gdf = geopandas.GeoDataFrame({"id": [1, 2, 3]}, geometry=geometry, crs="EPSG:3857")
+    gdf.to_file(footprints_path, driver="GeoJSON")
+    base_mask = np.random.default_rng(0).random((10, 10)) > 0.3
+
+    with rasterio.open(sample_raster) as dataset:
+        result = _mask_by_footprints(
+            dataset=dataset,
+            footprints_path=str(footprints_path),
+            base_mask=base_mask,
+            logger=logging.getLogger(__name__),
+        )
+        expected = np.zeros(base_mask.shape, dtype=bool)
+        for geom in iter_polygons(gdf.geometry):
+            expected |= base_mask & rasterio.features.geometry_mask(
+                [geom],
+                out_shape=base_mask.shape,
+                transform=dataset.transform,
+                invert=True,
+            )
+
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_streaming_baseline_matches_full_image(tmp_path):
+    raster_path = tmp_path / "scene.tif"
+    rng = np.random.default_rng(7)
+    data = rng.integers(0, 255, size=(3, 45, 38), dtype=np.uint8)
+    with rasterio.open(
+        raster_path,
+        "w",
+        driver="GTiff",
+        height=45,
+        width=38,
+        count=3,
+        dtype=data.dtype,
+        crs="EPSG:3857",
+        transform=from_origin(100, 200, 0.5, 0.5),
+    ) as dataset:
+        dataset.write(data)
+
+    footprints_path = tmp_path / "footprints.geojson"
+    geometry = [
+        shapely_geometry.box(101.3, 181.2, 110.7, 199.1),
+        shapely_geometry.box(108.2, 178.4, 118.6, 190.3),
+        shapely_geometry.Polygon([(112, 196), (118.5, 199), (116, 185)]),
+    ]
+    geopandas.GeoDataFrame({"id": [1, 2, 3]}, geometry=geometry, crs="EPSG:3857").to_file(
+        footprints_path, driver="GeoJSON"
+    )
+
+    full_path = tmp_path / "full.tif"
+    tiled_path = tmp_path / "tiled.tif"
+    run_inference(
+        raster_path=str(raster_path),
+        footprints_path=str(footprints_path),
+        output_path=str(full_path),
+        model_path=None,
+        threshold=0.3,
+    )
+    run_inference(
+        raster_path=str(raster_path),
+        footprints_path=str(footprints_path),
+        output_path=str(tiled_path),
+        model_path=None,
+        threshold=0.3,
+        tile_size=16,
+        overlap=2,
+    )
+
+    with rasterio.open(full_path) as full, rasterio.open(tiled_path) as tiled:
+        expected = full.read(1)
+        assert expected.any()
+        np.testing.assert_array_equal(tiled.read(1), expected)
+
+
+def _write_random_raster(path, width=38, height=45, count=3, seed=7):
+    data = np.random.default_rng(seed).integers(0, 255, size=(count, height, width), dtype=np.uint8)
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        height=height,
+        width=width,
+        count=count,
+        dtype=data.dtype,
+        crs="EPSG:3857",
+        transform=from_origin(100, 200, 0.5, 0.5),
+    ) as dataset:
+        dataset.write(data)
+    return data
+
+
+def test_compute_gradient_max_matches_full_image(tmp_path):
+    raster_path = tmp_path / "scene.tif"
+    data = _write_random_raster(raster_path)
+    expected = np.max(_gradient_magnitude(_to_grayscale(data)))
+
+    with rasterio.open(raster_path) as dataset:
+        assert compute_gradient_max(dataset, tile_size=16) == float(expected)
+
+
+def test_compute_gradient_max_sidecar_is_reused(tmp_path):
+    raster_path = tmp_path / "scene.tif"
+    _write_random_raster(raster_path)
+
+    with rasterio.open(raster_path) as dataset:
+        first = compute_gradient_max(dataset, tile_size=16, sidecar=True)
+
+    sidecar_path = tmp_path / "scene.tif.gradmax.json"
+    payload = json.loads(sidecar_path.read_text())
+    assert payload["max_magnitude"] == first
+
+    payload["max_magnitude"] = 1.0
+    sidecar_path.write_text(json.dumps(payload))
+    with rasterio.open(raster_path) as dataset:
+        assert compute_gradient_max(dataset, tile_size=16, sidecar=True) == 1.0
+        assert compute_gradient_max(dataset, tile_size=16) == first
+
+    # A sidecar written by another version of the gradient code is recomputed.
+    payload["key"]["version"] -= 1
+    sidecar_path.write_text(json.dumps(payload))
+    with rasterio.open(raster_path) as dataset:
+        assert compute_gradient_max(dataset, tile_size=16, sidecar=True) == first
+
+
+def test_compute_gradient_max_from_overviews(tmp_path):
+    raster_path = tmp_path / "scene.tif"
+    _write_random_raster(raster_path, width=128, height=96)
+    with rasterio.open(raster_path, "r+") as dataset:
+        dataset.build_overviews([2, 4], rasterio.enums.Resampling.average)
+
+    with rasterio.open(raster_path) as dataset:
+        approximate = compute_gradient_max(dataset, tile_size=32, use_overviews=True)
+        exact = compute_gradient_max(dataset, tile_size=32)
+
+    assert 0.0 < approximate <= exact
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_parallel_baseline_is_deterministic(tmp_path, executor):
+    raster_path = tmp_path / "scene.tif"
+    _write_random_raster(raster_path, width=70, height=52)
+    footprints_path = tmp_path / "footprints.geojson"
+    geometry = [shapely_geometry.box(102, 180, 125, 198), shapely_geometry.box(120, 175, 134, 190)]
+    geopandas.GeoDataFrame({"id": [1, 2]}, geometry=geometry, crs="EPSG:3857").to_file(
+        footprints_path, driver="GeoJSON"
+    )
+
+    outputs = []
+    for workers in (1, 3):
+        output_path = tmp_path / f"mask_{workers}.tif"
+        run_inference(
+            raster_path=str(raster_path),
+            footprints_path=str(footprints_path),
+            output_path=str(output_path),
+            model_path=None,
+            threshold=0.25,
+            tile_size=16,
+            workers=workers,
+            executor=executor,
+        )
+        with rasterio.open(output_path) as dataset:
+            outputs.append(dataset.read(1))
+
+    assert outputs[0].any()
+    np.testing.assert_array_equal(outputs[0], outputs[1])
+
+
+@pytest.mark.parametrize("tile_size", [None, 16])
+def test_inference_writes_per_building_areas(tmp_path, tile_size):
+    raster_path = tmp_path / "scene.tif"
+    _write_random_raster(raster_path)
+    footprints_path = tmp_path / "footprints.geojson"
+    geometry = [
+        shapely_geometry.box(101.3, 181.2, 110.7, 199.1),
+        shapely_geometry.box(111.2, 178.4, 118.6, 190.3),
+        shapely_geometry.box(150, 150, 160, 160),
+    ]
+    geopandas.GeoDataFrame(
+        {"building_id": ["a", "b", "outside"]}, geometry=geometry, crs="EPSG:3857"
+    ).to_file(footprints_path, driver="GeoJSON")
+
+    output_path = tmp_path / "mask.tif"
+    areas_path = tmp_path / "areas.csv"
+    run_inference(
+        raster_path=str(raster_path),
+        footprints_path=str(footprints_path),
+        output_path=str(output_path),
+        model_path=None,
+        threshold=0.3,
+        tile_size=tile_size,
+        areas_path=str(areas_path),
+        min_area_m2=0.0,
+    )
+
+    table = pandas.read_csv(areas_path)
+    assert table["building_id"].tolist() == ["a", "b"]
+    with rasterio.open(output_path) as dataset:
+        mask = dataset.read(1).astype(bool)
+        for building_id, geom in zip(["a", "b"], geometry):
+            inside = rasterio.features.geometry_mask(
+                [geom], out_shape=mask.shape, transform=dataset.transform, invert=True
+            )
+            row = table[table["building_id"] == building_id].iloc[0]
+            assert row["roof_pixels"] == np.count_nonzero(mask & inside)
+            assert row["area_m2"] == pytest.approx(row["roof_pixels"] * 0.25)
+
+
+def test_geographic_raster_areas_use_row_areas(tmp_path):
+    raster_path = tmp_path / "scene.tif"
+    data = np.random.default_rng(9).integers(0, 255, size=(3, 45, 38), dtype=np.uint8)
+    transform = from_origin(10.0, 60.0, 1e-4, 1e-4)
+    with rasterio.open(
+        raster_path,
+        "w",
+        driver="GTiff",
+        height=45,
+        width=38,
+        count=3,
+        dtype=data.dtype,
+        crs="EPSG:4326",
+        transform=transform,
+    ) as dataset:
+        dataset.write(data)
+    footprints_path = tmp_path / "footprints.geojson"
+    geometry = [shapely_geometry.box(10.0005, 59.9962, 10.0031, 59.9991)]
+    geopandas.GeoDataFrame({"building_id": ["a"]}, geometry=geometry, crs="EPSG:4326").to_file(
+        footprints_path, driver="GeoJSON"
+    )
+
+    tables = []
+    for tile_size in (None, 16):
+        areas_path = tmp_path / f"areas_{tile_size}.csv"
+        run_inference(
+            raster_path=str(raster_path),
+            footprints_path=str(footprints_path),
+            output_path=str(tmp_path / f"mask_{tile_size}.tif"),
+            model_path=None,
+            threshold=0.3,
+            tile_size=tile_size,
+            areas_path=str(areas_path),
+        )
+        tables.append(pandas.read_csv(areas_path))
+    pandas.testing.assert_frame_equal(tables[0], tables[1])
+
+    row_areas = pixel_row_areas(transform, "EPSG:4326", 45)
+    with rasterio.open(tmp_path / "mask_16.tif") as dataset:
+        mask = dataset.read(1).astype(bool)
+    inside = rasterio.features.geometry_mask(
+        geometry, out_shape=mask.shape, transform=transform, invert=True
+    )
+    row = tables[1].iloc[0]
+    assert row["roof_pixels"] == np.count_nonzero(mask)
+    assert row["area_m2"] == pytest.approx(np.count_nonzero(mask, axis=1) @ row_areas)
+    assert row["footprint_area_m2"] == pytest.approx(np.count_nonzero(inside, axis=1) @ row_areas)
+    # Around 5.6 m by 11.1 m per pixel at 60° N, far from the 1e-8 deg² pixel size.
+    assert 60 < row["area_m2"] / row["roof_pixels"] < 64
+
+
+def test_sparse_baseline_skips_empty_tiles(tmp_path, monkeypatch):
+    raster_path = tmp_path / "scene.tif"
+    _write_random_raster(raster_path, width=96, height=80)
+    # The strongest edges sit in a tile without buildings, so a maximum over
+    # building tiles only would threshold differently.
+    with rasterio.open(raster_path, "r+") as dataset:
+        step = np.zeros((3, 16, 16), dtype=np.uint8)
+        step[:, :, 8:] = 255
+        dataset.write(step, window=Window(0, 64, 16, 16))
+    footprints_path = tmp_path / "footprints.geojson"
+    geometry = [shapely_geometry.box(102, 185, 110, 198), shapely_geometry.box(140, 165, 144, 170)]
+    geopandas.GeoDataFrame({"id": [1, 2]}, geometry=geometry, crs="EPSG:3857").to_file(
+        footprints_path, driver="GeoJSON"
+    )
+
+    computed = []
+    baseline_tile = infer._baseline_tile
+
+    def counting_tile(tiles, window):
+        computed.append(window)
+        return baseline_tile(tiles, window)
+
+    monkeypatch.setattr(infer, "_baseline_tile", counting_tile)
+    outputs = []
+    for sparse in (False, True):
+        output_path = tmp_path / f"mask_{sparse}.tif"
+        computed.clear()
+        run_inference(
+            raster_path=str(raster_path),
+            footprints_path=str(footprints_path),
+            output_path=str(output_path),
+            model_path=None,
+            threshold=0.1,
+            tile_size=16,
+            sparse=sparse,
+        )
+        outputs.append((len(computed), output_path))
+
+    (dense_tiles, dense_path), (sparse_tiles, sparse_path) = outputs
+    assert dense_tiles == 30
+    assert sparse_tiles == 6
+    with rasterio.open(dense_path) as dense, rasterio.open(sparse_path) as sparse:
+        expected = dense.read(1)
+        assert expected.any()
+        np.testing.assert_array_equal(sparse.read(1), expected)
+
+    # The first sparse run cached the full-raster maximum, so later ones skip that pass.
+    assert (tmp_path / "scene.tif.gradmax.json").is_file()
+    monkeypatch.setattr(infer, "_tile_gradient_max", pytest.fail)
+    run_inference(
+        raster_path=str(raster_path),
+        footprints_path=str(footprints_path),
+        output_path=str(tmp_path / "mask_again.tif"),
+        model_path=None,
+        threshold=0.1,
+        tile_size=16,
+        sparse=True,
+    )
+    with rasterio.open(tmp_path / "mask_again.tif") as again:
+        np.testing.assert_array_equal(again.read(1), expected)
+
+
+def test_nodata_tiles_are_skipped_without_changing_output(tmp_path, monkeypatch):
+    raster_path = tmp_path / "scene.tif"
+    data = np.random.default_rng(3).integers(1, 255, size=(3, 64, 96), dtype=np.uint8)
+    data[:, :, :32] = 0
+    with rasterio.open(
+        raster_path,
+        "w",
+        driver="GTiff",
+        height=64,
+        width=96,
+        count=3,
+        dtype=data.dtype,
+        nodata=0,
+        tiled=True,
+        blockxsize=16,
+        blockysize=16,
+        crs="EPSG:3857",
+        transform=from_origin(100, 200, 0.5, 0.5),
+    ) as dataset:
+        dataset.write(data)
+        dataset.build_overviews([2, 4], rasterio.enums.Resampling.nearest)
+    footprints_path = tmp_path / "footprints.geojson"
+    # The building reaches from valid pixels into an all-nodata tile.
+    geometry = [shapely_geometry.box(113, 185, 120, 190)]
+    geopandas.GeoDataFrame({"id": [1]}, geometry=geometry, crs="EPSG:3857").to_file(
+        footprints_path, driver="GeoJSON"
+    )
+
+    computed = []
+    baseline_tile = infer._baseline_tile
+
+    def counting_tile(tiles, window):
+        computed.append(window)
+        return baseline_tile(tiles, window)
+
+    monkeypatch.setattr(infer, "_baseline_tile", counting_tile)
+    options = dict(
+        raster_path=str(raster_path),
+        footprints_path=str(footprints_path),
+        model_path=None,
+        threshold=0.2,
+        tile_size=16,
+    )
+    run_inference(
+        output_path=str(tmp_path / "skipped.tif"),
+        areas_path=str(tmp_path / "skipped.csv"),
+        **options,
+    )
+    assert len(computed) == 24 - 7
+    monkeypatch.setattr(infer, "plan_tiles", functools.partial(plan_tiles, skip_nodata=False))
+    run_inference(
+        output_path=str(tmp_path / "full.tif"), areas_path=str(tmp_path / "full.csv"), **options
+    )
+
+    with rasterio.open(tmp_path / "skipped.tif") as skipped, rasterio.open(
+        tmp_path / "full.tif"
+    ) as full:
+        expected = full.read(1)
+        assert expected[:, 26:32].any()
+        np.testing.assert_array_equal(skipped.read(1), expected)
+    pandas.testing.assert_frame_equal(
+        pandas.read_csv(tmp_path / "skipped.csv"), pandas.read_csv(tmp_path / "full.csv")
+    )
+
+
+def test_incremental_update_clears_removed_building_over_nodata(tmp_path):
+    raster_path = tmp_path / "scene.tif"
+    data = np.random.default_rng(3).integers(1, 255, size=(3, 64, 96), dtype=np.uint8)
+    data[:, :, :32] = 0
+    with rasterio.open(
+        raster_path,
+        "w",
+        driver="GTiff",
+        height=64,
+        width=96,
+        count=3,
+        dtype=data.dtype,
+        nodata=0,
+        tiled=True,
+        blockxsize=16,
+        blockysize=16,
+        crs="EPSG:3857",
+        transform=from_origin(100, 200, 0.5, 0.5),
+    ) as dataset:
+        dataset.write(data)
+        dataset.build_overviews([2, 4], rasterio.enums.Resampling.nearest)
+    kept = shapely_geometry.box(130, 175, 140, 185)
+    # The removed building reaches from valid pixels into an all-nodata tile.
+    removed = shapely_geometry.box(113, 185, 120, 190)
+    paths = []
+    for name, geometry in (("old", [kept, removed]), ("new", [kept])):
+        path = tmp_path / f"{name}.geojson"
+        gdf = geopandas.GeoDataFrame({"id": range(1, len(geometry) + 1)}, geometry=geometry)
+        gdf.set_crs("EPSG:3857").to_file(path, driver="GeoJSON")
+        paths.append(path)
+
+    options = dict(raster_path=str(raster_path), model_path=None, threshold=0.2, tile_size=16)
+    for path in paths:
+        run_inference(
+            footprints_path=str(path),
+            output_path=str(tmp_path / "patched.tif"),
+            incremental=True,
+            **options,
+        )
+    run_inference(footprints_path=str(paths[1]), output_path=str(tmp_path / "full.tif"), **options)
+
+    with rasterio.open(tmp_path / "patched.tif") as patched, rasterio.open(
+        tmp_path / "full.tif"
+    ) as full:
+        np.testing.assert_array_equal(patched.read(1), full.read(1))
+
+
+def test_cached_baseline_reuses_intermediates(tmp_path, monkeypatch):
+    raster_path = tmp_path / "scene.tif"
+    _write_random_raster(raster_path)
+    footprints_path = tmp_path / "footprints.geojson"
+    geometry = [
+        shapely_geometry.box(101.3, 181.2, 110.7, 199.1),
+        shapely_geometry.box(111, 178, 118, 190),
+    ]
+    geopandas.GeoDataFrame({"id": [1, 2]}, geometry=geometry, crs="EPSG:3857").to_file(
+        footprints_path, driver="GeoJSON"
+    )
+    cache = ArrayCache(str(tmp_path / "cache"))
+
+    computed = []
+    intermediate_tile = infer._intermediate_tile
+
+    def counting_tile(tiles, window):
+        computed.append(window)
+        return intermediate_tile(tiles, window)
+
+    monkeypatch.setattr(infer, "_intermediate_tile", counting_tile)
+    for threshold in (0.3, 0.5):
+        paths = {}
+        for name, tile_cache in (("plain", None), ("cached", cache)):
+            paths[name] = tmp_path / f"{name}_{threshold}.tif"
+            run_inference(
+                raster_path=str(raster_path),
+                footprints_path=str(footprints_path),
+                output_path=str(paths[name]),
+                model_path=None,
+                threshold=threshold,
+                tile_size=16,
+                areas_path=str(tmp_path / f"{name}_{threshold}.csv"),
+                cache=tile_cache,
+            )
+        with rasterio.open(paths["plain"]) as plain, rasterio.open(paths["cached"]) as cached:
+            expected = plain.read(1)
+            assert expected.any()
+            np.testing.assert_array_equal(cached.read(1), expected)
+        pandas.testing.assert_frame_equal(
+            pandas.read_csv(tmp_path / f"cached_{threshold}.csv"),
+            pandas.read_csv(tmp_path / f"plain_{threshold}.csv"),
+        )
+
+    # Only the first cached run computed the gradient and label rasters.
+    assert len(computed) == 9
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16, np.int16, np.float32])
+def test_grayscale_and_gradient_with_scratch_match_float_mean(dtype):
+    rng = np.random.default_rng(3)
+    info = np.iinfo(dtype) if np.dtype(dtype).kind in "ui" else None
+    if info is None:
+        image = rng.random((4, 45, 70)).astype(dtype)
+    else:
+        image = rng.integers(info.min, info.max, (4, 45, 70), endpoint=True).astype(dtype)
+    expected = np.mean(image[:3].astype(np.float32), axis=0)
+    scratch = ScratchBuffers()
+
+    grayscale = _to_grayscale(image, scratch)
+    np.testing.assert_array_equal(grayscale, expected)
+    np.testing.assert_array_equal(
+        _gradient_magnitude(grayscale, scratch), _gradient_magnitude(expected)
+    )
+
+
+def test_scratch_buffers_are_reused_across_tiles():
+    scratch = ScratchBuffers()
+    image = np.random.default_rng(0).integers(0, 10_000, (4, 256, 256)).astype(np.uint16)
+    _gradient_magnitude(_to_grayscale(image[:3], scratch), scratch)
+    allocated = scratch.nbytes
+
+    smaller = image[:, :200, :230]
+    _gradient_magnitude(_to_grayscale(smaller[:3], scratch), scratch)
+    assert scratch.nbytes == allocated
@@ -0,0 +1,124 @@
+import os
+
+import geopandas
+import numpy as np
+import pandas
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+from shapely import geometry as shapely_geometry
+
+from roof_area.io.mosaic import MosaicIndex, is_mosaic_input, mosaic_sources, resolve_raster
+from roof_area.model import infer
+from roof_area.model.infer import InferenceError, run_inference
+
+
+# (row_off, col_off, height, width) of four tiles covering a 50x70 scene.
+TILES = [(0, 0, 25, 40), (0, 40, 25, 30), (25, 0, 25, 40), (25, 40, 25, 30)]
+
+
+def _write(path, data, row_off=0, col_off=0, res=0.5):
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        height=data.shape[1],
+        width=data.shape[2],
+        count=data.shape[0],
+        dtype=data.dtype,
+        crs="EPSG:3857",
+        transform=from_origin(100 + col_off * res, 200 - row_off * res, res, res),
+    ) as dataset:
+        dataset.write(data)
+
+
+def _write_tiles(tmp_path):
+    scene = np.random.default_rng(4).integers(0, 255, size=(3, 50, 70), dtype=np.uint8)
+    tiles = tmp_path / "tiles"
+    tiles.mkdir()
+    for index, (row_off, col_off, height, width) in enumerate(TILES):
+        window = scene[:, row_off : row_off + height, col_off : col_off + width]
+        _write(tiles / f"tile_{index}.tif", window, row_off, col_off)
+    return scene, tiles
+
+
+def test_mosaic_index_places_sources_on_one_grid(tmp_path):
+    scene, tiles = _write_tiles(tmp_path)
+    mosaic = MosaicIndex(mosaic_sources(str(tiles)))
+
+    assert (mosaic.width, mosaic.height) == (70, 50)
+    assert [(s.row_off, s.col_off) for s in mosaic.sources] == [t[:2] for t in TILES]
+    assert mosaic.bounds == (100, 175, 135, 200)
+
+    vrt_path = str(tmp_path / "mosaic.vrt")
+    assert resolve_raster(str(tiles / "*.tif"), vrt_path) == vrt_path
+    with rasterio.open(vrt_path) as dataset:
+        np.testing.assert_array_equal(dataset.read(), scene)
+    modified = os.stat(vrt_path).st_mtime_ns
+    resolve_raster(str(tiles), vrt_path)
+    assert os.stat(vrt_path).st_mtime_ns == modified
+
+    # A single raster whose name looks like a glob is opened as is.
+    bracketed = str(tmp_path / "scene[1].tif")
+    _write(bracketed, scene)
+    assert not is_mosaic_input(bracketed)
+    assert resolve_raster(bracketed, vrt_path) == bracketed
+
+    _write(tiles / "shifted.tif", scene[:, :4, :4], res=0.5001)
+    with pytest.raises(ValueError, match="resolution"):
+        MosaicIndex(mosaic_sources(str(tiles)))
+
+
+def test_mosaic_inference_matches_merged_raster(tmp_path, monkeypatch):
+    scene, tiles = _write_tiles(tmp_path)
+    merged_path = tmp_path / "merged.tif"
+    _write(merged_path, scene)
+    footprints_path = tmp_path / "footprints.geojson"
+    # Both buildings straddle tile seams.
+    geometry = [
+        shapely_geometry.box(115.2, 183.1, 124.7, 190.3),
+        shapely_geometry.box(104, 186, 110, 193),
+    ]
+    geopandas.GeoDataFrame(
+        {"building_id": ["a", "b"]}, geometry=geometry, crs="EPSG:3857"
+    ).to_file(footprints_path, driver="GeoJSON")
+
+    loads = []
+    load_footprints = infer.load_footprints
+
+    def counting_load(*args, **kwargs):
+        loads.append(args)
+        return load_footprints(*args, **kwargs)
+
+    monkeypatch.setattr(infer, "load_footprints", counting_load)
+    options = dict(
+        footprints_path=str(footprints_path), model_path=None, threshold=0.3, tile_size=16
+    )
+    run_inference(
+        raster_path=str(tiles),
+        output_path=str(tmp_path / "mosaic_mask.tif"),
+        areas_path=str(tmp_path / "mosaic.csv"),
+        **options,
+    )
+    assert len(loads) == 1
+    assert (tmp_path / "mosaic_mask.mosaic.vrt").is_file()
+    run_inference(
+        raster_path=str(merged_path),
+        output_path=str(tmp_path / "merged_mask.tif"),
+        areas_path=str(tmp_path / "merged.csv"),
+        **options,
+    )
+
+    with rasterio.open(tmp_path / "mosaic_mask.tif") as mosaic, rasterio.open(
+        tmp_path / "merged_mask.tif"
+    ) as merged:
+        expected = merged.read(1)
+        assert expected.any()
+        np.testing.assert_array_equal(mosaic.read(1), expected)
+        assert mosaic.transform == merged.transform
+    pandas.testing.assert_frame_equal(
+        pandas.read_csv(tmp_path / "mosaic.csv"), pandas.read_csv(tmp_path / "merged.csv")
+    )
+
+    with pytest.raises(InferenceError, match="No source rasters"):
+        run_inference(raster_path=str(tmp_path / "missing" / "*.tif"), output_path=None, **options)
@@ -0,0 +1,124 @@
+import geopandas
+import numpy as np
+import pytest
+import rasterio
+import shapely
+from rasterio.transform import from_origin
+
+from roof_area.cli import main
+from roof_area.postprocess import iter_roof_polygons, polygonize_mask
+
+
+@pytest.fixture()
+def mask_path(tmp_path):
+    rng = np.random.default_rng(5)
+    mask = np.zeros((150, 170), dtype=np.uint8)
+    for _ in range(40):
+        row, col = rng.integers(0, 140), rng.integers(0, 160)
+        height, width = rng.integers(2, 25, size=2)
+        mask[row : row + height, col : col + width] = 1
+    mask[rng.random(mask.shape) < 0.01] = 1
+    path = tmp_path / "mask.tif"
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        width=170,
+        height=150,
+        count=1,
+        dtype="uint8",
+        crs="EPSG:3857",
+        transform=from_origin(1000, 2000, 0.5, 0.5),
+    ) as dataset:
+        dataset.write(mask, 1)
+    return path
+
+
+@pytest.mark.parametrize("opening, closing", [(0, 0), (1, 2)])
+def test_polygons_do_not_depend_on_tile_size(mask_path, opening, closing):
+    with rasterio.open(mask_path) as dataset:
+        whole = list(iter_roof_polygons(dataset, tile_size=1024, opening=opening, closing=closing))
+        tiled = list(iter_roof_polygons(dataset, tile_size=16, opening=opening, closing=closing))
+
+    assert len(tiled) == len(whole)
+    assert shapely.equals(shapely.union_all(tiled), shapely.union_all(whole))
+    assert sorted(polygon.area for polygon in tiled) == sorted(polygon.area for polygon in whole)
+
+
+def test_opening_removes_speckle(mask_path):
+    with rasterio.open(mask_path) as dataset:
+        raw = list(iter_roof_polygons(dataset, tile_size=32))
+        opened = list(iter_roof_polygons(dataset, tile_size=32, opening=1))
+
+    assert min(polygon.area for polygon in raw) == 1
+    assert min(polygon.area for polygon in opened) > 1
+
+
+@pytest.mark.parametrize("suffix", [".fgb", ".parquet"])
+def test_polygonize_mask_writes_filtered_layer(mask_path, tmp_path, suffix):
+    output_path = tmp_path / f"roofs{suffix}"
+    count = polygonize_mask(
+        str(mask_path),
+        str(output_path),
+        tile_size=32,
+        min_area_m2=2.0,
+        simplify_tolerance=0.25,
+        chunk_size=5,
+    )
+
+    layer = (
+        geopandas.read_parquet(output_path)
+        if suffix == ".parquet"
+        else geopandas.read_file(output_path)
+    )
+    assert len(layer) == count > 0
+    assert layer.crs.to_epsg() == 3857
+    assert sorted(layer["polygon_id"]) == list(range(count))
+    assert (layer["area_m2"] >= 2.0).all()
+    assert layer.total_bounds[0] >= 1000 and layer.total_bounds[3] <= 2000
+    if suffix == ".parquet":
+        assert len(geopandas.read_parquet(output_path, bbox=(1000, 1960, 1040, 2000))) < count
+
+
+def test_polygonize_empty_mask_writes_empty_layer(tmp_path):
+    path = tmp_path / "empty.tif"
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        width=8,
+        height=8,
+        count=1,
+        dtype="uint8",
+        crs="EPSG:3857",
+        transform=from_origin(0, 8, 1, 1),
+    ) as dataset:
+        dataset.write(np.zeros((8, 8), dtype=np.uint8), 1)
+
+    output_path = tmp_path / "roofs.parquet"
+    assert polygonize_mask(str(path), str(output_path)) == 0
+    assert len(geopandas.read_parquet(output_path)) == 0
+
+
+def test_polygonize_cli(mask_path, tmp_path):
+    output_path = tmp_path / "roofs.fgb"
+    exit_code = main(
+        [
+            "polygonize",
+            "--mask",
+            str(mask_path),
+            "--polygons",
+            str(output_path),
+            "--tile-size",
+            "64",
+            "--min-area-m2",
+            "0",
+            "--open",
+            "1",
+        ]
+    )
+
+    assert exit_code == 0
+    with rasterio.open(mask_path) as dataset:
+        expected = list(iter_roof_polygons(dataset, tile_size=64, opening=1))
+    assert len(geopandas.read_file(output_path)) == len(expected)
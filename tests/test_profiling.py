@@ -0,0 +1,103 @@
+import json
+import logging
+
+import geopandas
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+from shapely import geometry as shapely_geometry
+
+from roof_area.cli import main
+from roof_area.logging import JsonFormatter
+from roof_area.pipeline.profiling import RunProfiler, profiling, stage, tile_scope
+
+
+def test_profiler_aggregates_stages_and_tiles():
+    # Raise the process's peak RSS first, so the stages below stay under it.
+    np.ones(2**22).sum()
+    profiler = RunProfiler()
+    with profiling(profiler):
+        with stage("read") as record:
+            record.bytes_read += 100
+        for col in (0, 16):
+            with tile_scope(Window(col, 0, 16, 16)), stage("gradient"):
+                np.sqrt(np.arange(1000.0))
+
+    report = profiler.report(command="test")
+    assert report["command"] == "test"
+    assert report["stages"]["read"]["calls"] == 1
+    assert report["stages"]["read"]["bytes_read"] == 100
+    assert report["stages"]["gradient"]["calls"] == 2
+    assert report["peak_rss_bytes"] > 0
+    # Stages record how far they raised the peak, not the peak itself.
+    assert report["stages"]["read"]["rss_growth_bytes"] == 0
+    assert [tile["tile"] for tile in report["tiles"]] == [(0, 0, 16, 16), (16, 0, 16, 16)]
+
+    with stage("read"), tile_scope(Window(0, 0, 1, 1)):
+        pass
+    assert len(profiler.records) == 3
+
+
+def test_infer_cli_writes_run_report(tmp_path):
+    raster_path = tmp_path / "scene.tif"
+    data = np.random.default_rng(3).integers(0, 255, (3, 80, 96), dtype=np.uint8)
+    with rasterio.open(
+        raster_path,
+        "w",
+        driver="GTiff",
+        width=96,
+        height=80,
+        count=3,
+        dtype="uint8",
+        crs="EPSG:3857",
+        transform=from_origin(0, 80, 1, 1),
+    ) as dataset:
+        dataset.write(data)
+    footprints_path = tmp_path / "footprints.geojson"
+    geopandas.GeoDataFrame(
+        {"id": [1]}, geometry=[shapely_geometry.box(10, 10, 60, 60)], crs="EPSG:3857"
+    ).to_file(footprints_path, driver="GeoJSON")
+
+    report_path = tmp_path / "report.json"
+    assert (
+        main(
+            [
+                "infer",
+                "--raster",
+                str(raster_path),
+                "--footprints",
+                str(footprints_path),
+                "--output",
+                str(tmp_path / "mask.tif"),
+                "--tile-size",
+                "64",
+                "--report",
+                str(report_path),
+            ]
+        )
+        == 0
+    )
+
+    report = json.loads(report_path.read_text())
+    assert report["output_bytes"] > 0
+    for name in ("load_footprints", "gradient_max", "read", "grayscale", "gradient", "write"):
+        assert report["stages"][name]["calls"] > 0
+    assert report["stages"]["write"]["bytes_written"] == 80 * 96
+    assert {tuple(tile["tile"]) for tile in report["tiles"]} == {
+        (0, 0, 64, 64),
+        (64, 0, 32, 64),
+        (0, 64, 64, 16),
+        (64, 64, 32, 16),
+    }
+
+
+def test_json_formatter_includes_extra_fields():
+    record = logging.makeLogRecord(
+        {"name": "roof_area.profile", "levelname": "DEBUG", "msg": "Stage %s", "args": ("read",)}
+    )
+    record.stage = {"stage": "read", "wall_s": 0.5}
+
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["message"] == "Stage read"
+    assert payload["stage"] == {"stage": "read", "wall_s": 0.5}
@@ -1,10 +1,24 @@
+import os
+
 import pytest
 
 np = pytest.importorskip("numpy")
 rasterio = pytest.importorskip("rasterio")
 from rasterio.transform import from_origin
+from rasterio.windows import Window
 
-from roof_area.io.raster import get_pixel_size_m, open_raster, read_window
+from roof_area.io import raster as raster_io
+from roof_area.io.raster import (
+    MaskOutputOptions,
+    configure_gdal,
+    get_pixel_size_m,
+    open_mask_writer,
+    open_raster,
+    overview_factors,
+    prefetch_windows,
+    read_window,
+)
+from roof_area.preprocess.tiling import iter_windows
 
 
 def _write_test_raster(path, width=10, height=10):
@@ -55,3 +69,96 @@ def test_read_window(tmp_path):
     assert window.height == 3
     assert window_data.shape == (1, 3, 3)
     np.testing.assert_array_equal(window_data[0], data[5:8, 2:5])
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        MaskOutputOptions(block_size=32, compress="zstd"),
+        MaskOutputOptions(block_size=32, nbits=1, overviews=True),
+        MaskOutputOptions(block_size=32, compress="deflate", nbits=1, cog=True),
+    ],
+)
+def test_open_mask_writer_writes_windows(tmp_path, options):
+    source_path = tmp_path / "source.tif"
+    _write_test_raster(source_path, width=100, height=70)
+    mask = (np.random.default_rng(0).random((70, 100)) > 0.5).astype(np.uint8)
+
+    output_path = tmp_path / "mask.tif"
+    with rasterio.open(source_path) as source:
+        with open_mask_writer(str(output_path), source, options) as dst:
+            for row in range(0, 70, 32):
+                for col in range(0, 100, 32):
+                    window = Window(col, row, min(32, 100 - col), min(32, 70 - row))
+                    dst.write(mask[row : row + 32, col : col + 32], 1, window=window)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["mask.tif", "source.tif"]
+    with rasterio.open(output_path) as dataset:
+        np.testing.assert_array_equal(dataset.read(1), mask)
+        assert dataset.block_shapes == [(32, 32)]
+        assert dataset.compression.value.lower() == options.compress
+        structure = dataset.tags(1, ns="IMAGE_STRUCTURE")
+        assert structure.get("NBITS", "8") == str(options.nbits)
+        if options.overviews or options.cog:
+            assert dataset.overviews(1) == [2, 4]
+        if options.cog:
+            assert dataset.tags(ns="IMAGE_STRUCTURE")["LAYOUT"] == "COG"
+
+
+def test_overview_factors_stop_at_one_block():
+    assert overview_factors(100, 70, 32) == [2, 4]
+    assert overview_factors(30, 30, 32) == []
+
+
+@pytest.mark.parametrize("depth", [0, 3])
+def test_prefetch_windows_reads_each_block_once(tmp_path, monkeypatch, depth):
+    path = tmp_path / "tiled.tif"
+    data = np.random.default_rng(2).integers(0, 255, size=(2, 600, 700), dtype=np.uint8)
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        height=600,
+        width=700,
+        count=2,
+        dtype=data.dtype,
+        tiled=True,
+        blockxsize=256,
+        blockysize=256,
+        compress="deflate",
+        crs="EPSG:3857",
+        transform=from_origin(0, 600, 1, 1),
+    ) as dataset:
+        dataset.write(data)
+        windows = list(iter_windows(dataset, 150, overlap=20))
+
+    reads = []
+    read_unit_block = raster_io._read_unit_block
+
+    def counting_read(raster, unit, *args):
+        reads.append(unit)
+        return read_unit_block(raster, unit, *args)
+
+    monkeypatch.setattr(raster_io, "_read_unit_block", counting_read)
+    results = list(prefetch_windows(str(path), windows, indexes=[2], depth=depth, workers=2))
+
+    assert [window for window, _ in results] == windows
+    for window, block in results:
+        rows, cols = window.toslices()
+        np.testing.assert_array_equal(block, data[1:, rows, cols])
+    # Overlapping windows share blocks; each 256 px block is still read once.
+    assert sorted(reads) == ([] if depth == 0 else [(r, c) for r in range(3) for c in range(3)])
+
+
+def test_configure_gdal_sets_cache_and_threads(monkeypatch):
+    monkeypatch.delenv("GDAL_NUM_THREADS", raising=False)
+    monkeypatch.delenv("GDAL_CACHEMAX", raising=False)
+    cache_bytes = rasterio.env.get_gdal_config("GDAL_CACHEMAX")
+    configure_gdal(cache_mb=64, threads="ALL_CPUS")
+    try:
+        assert rasterio.env.get_gdal_config("GDAL_CACHEMAX") == 64 * 1024**2
+        assert rasterio.env.get_gdal_config("GDAL_NUM_THREADS") == "ALL_CPUS"
+        assert os.environ["GDAL_CACHEMAX"] == str(64 * 1024**2)
+    finally:
+        rasterio.env.set_gdal_config("GDAL_CACHEMAX", cache_bytes)
+        rasterio.env.set_gdal_config("GDAL_NUM_THREADS", None)
@@ -0,0 +1,166 @@
+import numpy as np
+import pytest
+import rasterio
+import geopandas
+import pandas
+from rasterio.transform import from_origin
+from shapely import geometry as shapely_geometry
+
+from roof_area.cli import main
+from roof_area.metrics.area import mask_area_m2, pixel_row_areas
+from roof_area.metrics.evaluate import evaluate_masks
+from roof_area.metrics.sweep import parse_thresholds
+from roof_area.model.infer import run_inference, run_threshold_sweep
+
+
+TRANSFORM = from_origin(100, 200, 0.5, 0.5)
+
+
+def _write_raster(path, data, crs="EPSG:3857", transform=TRANSFORM):
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        height=data.shape[1],
+        width=data.shape[2],
+        count=data.shape[0],
+        dtype=data.dtype,
+        crs=crs,
+        transform=transform,
+    ) as dataset:
+        dataset.write(data)
+    return path
+
+
+@pytest.fixture()
+def scene(tmp_path):
+    rng = np.random.default_rng(5)
+    raster_path = _write_raster(
+        tmp_path / "scene.tif", rng.integers(0, 255, size=(3, 45, 38), dtype=np.uint8)
+    )
+    truth_path = _write_raster(
+        tmp_path / "truth.tif", (rng.random((1, 45, 38)) > 0.6).astype(np.uint8)
+    )
+    footprints_path = tmp_path / "footprints.geojson"
+    geometry = [
+        shapely_geometry.box(101.3, 181.2, 110.7, 199.1),
+        shapely_geometry.box(111.2, 178.4, 118.6, 190.3),
+        shapely_geometry.box(150, 150, 160, 160),
+    ]
+    geopandas.GeoDataFrame(
+        {"building_id": ["a", "b", "outside"]}, geometry=geometry, crs="EPSG:3857"
+    ).to_file(footprints_path, driver="GeoJSON")
+    return str(raster_path), str(footprints_path), str(truth_path)
+
+
+def test_parse_thresholds():
+    assert parse_thresholds("0.1:0.5:0.1") == [0.1, 0.2, 0.3, 0.4, 0.5]
+    assert parse_thresholds("0.7, 0.2") == [0.7, 0.2]
+    with pytest.raises(ValueError):
+        parse_thresholds("0.1:0.5")
+
+
+def test_sweep_matches_separate_runs(scene, tmp_path):
+    raster_path, footprints_path, truth_path = scene
+    thresholds = [0.0, 0.0149246, 0.2, 0.35, 0.6]
+    buildings_path = tmp_path / "sweep_buildings.csv"
+    table = run_threshold_sweep(
+        raster_path=raster_path,
+        footprints_path=footprints_path,
+        thresholds=thresholds,
+        truth_path=truth_path,
+        tile_size=16,
+        workers=2,
+        areas_path=str(buildings_path),
+    )
+    buildings = pandas.read_csv(buildings_path)
+    assert sorted(set(buildings["building_id"])) == ["a", "b"]
+
+    for threshold, row in zip(thresholds, table.itertuples()):
+        assert row.threshold == threshold
+        output_path = tmp_path / f"mask_{threshold}.tif"
+        areas_path = tmp_path / f"areas_{threshold}.csv"
+        run_inference(
+            raster_path=raster_path,
+            footprints_path=footprints_path,
+            output_path=str(output_path),
+            model_path=None,
+            threshold=threshold,
+            tile_size=16,
+            areas_path=str(areas_path),
+        )
+        result = evaluate_masks(str(output_path), truth_path, tile_size=16)
+        tn, fn, fp, tp = result.confusion.tolist()
+        assert (row.tp, row.fp, row.fn) == (tp, fp, fn)
+        assert row.roof_pixels == tp + fp
+
+        areas = pandas.read_csv(areas_path).set_index("building_id")["roof_pixels"]
+        swept = buildings[buildings["threshold"] == threshold].set_index("building_id")
+        assert swept["roof_pixels"].to_dict() == areas.to_dict()
+
+
+def test_eval_cli_sweep_writes_table(scene, tmp_path):
+    raster_path, footprints_path, truth_path = scene
+    sweep_path = tmp_path / "sweep.csv"
+    exit_code = main(
+        [
+            "eval",
+            "--raster",
+            raster_path,
+            "--footprints",
+            footprints_path,
+            "--truth",
+            truth_path,
+            "--sweep",
+            "0.1:0.9:0.2",
+            "--sweep-output",
+            str(sweep_path),
+            "--tile-size",
+            "64",
+        ]
+    )
+
+    assert exit_code == 0
+    table = pandas.read_csv(sweep_path)
+    assert table["threshold"].tolist() == [0.1, 0.3, 0.5, 0.7, 0.9]
+    assert table["roof_pixels"].is_monotonic_decreasing
+    assert {"iou", "f1", "precision", "recall"} <= set(table.columns)
+
+
+def test_sweep_and_eval_weight_geographic_pixels_by_row(tmp_path):
+    transform = from_origin(10.0, 60.0, 0.0001, 0.0002)
+    rng = np.random.default_rng(9)
+    raster_path = _write_raster(
+        tmp_path / "scene.tif",
+        rng.integers(0, 255, size=(3, 45, 38), dtype=np.uint8),
+        "EPSG:4326",
+        transform,
+    )
+    truth = (rng.random((1, 45, 38)) > 0.6).astype(np.uint8)
+    truth_path = _write_raster(tmp_path / "truth.tif", truth, "EPSG:4326", transform)
+    footprints_path = tmp_path / "footprints.geojson"
+    geopandas.GeoDataFrame(
+        {"building_id": ["a"]},
+        geometry=[shapely_geometry.box(10.0005, 59.992, 10.003, 59.9995)],
+        crs="EPSG:4326",
+    ).to_file(footprints_path, driver="GeoJSON")
+    row_areas = pixel_row_areas(transform, "EPSG:4326", 45)
+
+    options = dict(raster_path=str(raster_path), footprints_path=str(footprints_path))
+    table = run_threshold_sweep(
+        thresholds=[0.2], truth_path=str(truth_path), tile_size=16, **options
+    )
+    mask_path = tmp_path / "mask.tif"
+    run_inference(
+        output_path=str(mask_path), model_path=None, threshold=0.2, tile_size=16, **options
+    )
+    with rasterio.open(mask_path) as dataset:
+        mask = dataset.read(1) > 0
+    result = evaluate_masks(str(mask_path), str(truth_path), tile_size=16).summary()
+
+    expected = mask_area_m2(mask, row_areas=row_areas)
+    assert expected > 0
+    assert table["area_m2"][0] == pytest.approx(expected)
+    assert result["pred_area_m2"] == pytest.approx(expected)
+    assert table["truth_area_m2"][0] == pytest.approx(mask_area_m2(truth[0], row_areas=row_areas))
+    assert result["truth_area_m2"] == pytest.approx(table["truth_area_m2"][0])
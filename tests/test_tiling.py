@@ -2,10 +2,18 @@ import pytest
 
 np = pytest.importorskip("numpy")
 rasterio = pytest.importorskip("rasterio")
+from rasterio.enums import Resampling
 from rasterio.io import MemoryFile
 from rasterio.transform import from_origin
+from rasterio.windows import Window
 
-from roof_area.preprocess.tiling import iter_windows
+from roof_area.preprocess.tiling import (
+    iter_windows,
+    occupied_tiles,
+    pad_window,
+    plan_tiles,
+    window_slices,
+)
 
 
 def _make_dataset(width=5, height=4):
@@ -52,3 +60,119 @@ def test_iter_windows_overlap_validation():
     finally:
         dataset.close()
         memfile.close()
+
+
+def test_pad_window_clips_to_raster_and_slices_core():
+    window = Window(col_off=0, row_off=2, width=3, height=2)
+    padded = pad_window(window, 2, width=5, height=4)
+
+    assert (padded.col_off, padded.row_off, padded.width, padded.height) == (0, 0, 5, 4)
+
+    data = np.arange(20).reshape((4, 5))
+    rows, cols = window_slices(window, padded)
+    np.testing.assert_array_equal(data[rows, cols], data[2:4, 0:3])
+
+
+def test_occupied_tiles_matches_window_intersection():
+    memfile, dataset = _make_dataset(width=50, height=37)
+    rng = np.random.default_rng(3)
+    origins = rng.uniform(-5, 50, size=(12, 2))
+    sizes = rng.uniform(0.2, 9, size=(12, 2))
+    bounds = np.column_stack([origins, origins + sizes])
+    try:
+        occupied = occupied_tiles(dataset, 8, bounds)
+        empty = occupied_tiles(dataset, 8, np.empty((0, 4)))
+        windows = list(iter_windows(dataset, 8))
+        transform = dataset.transform
+    finally:
+        dataset.close()
+        memfile.close()
+
+    assert occupied.size == len(windows)
+    for window, flag in zip(windows, occupied.ravel()):
+        left, bottom, right, top = rasterio.windows.bounds(window, transform)
+        touched = (
+            (bounds[:, 0] < right)
+            & (bounds[:, 2] >= left)
+            & (bounds[:, 1] <= top)
+            & (bounds[:, 3] > bottom)
+        )
+        assert flag == touched.any()
+    assert 0 < occupied.sum() < occupied.size
+    assert not empty.any()
+
+
+def _write_tiled_scene(path, *, overviews):
+    # 96x64 two-band raster in 16 px blocks; the left 32 columns are nodata but
+    # for one pixel, which the overviews do not see.
+    data = np.random.default_rng(7).integers(1, 60000, size=(2, 64, 96), dtype=np.uint16)
+    data[:, :, :32] = 0
+    data[:, 37, 5] = 1000
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        height=64,
+        width=96,
+        count=2,
+        dtype=data.dtype,
+        nodata=0,
+        tiled=True,
+        blockxsize=16,
+        blockysize=16,
+        transform=from_origin(0, 64, 1, 1),
+        crs="EPSG:3857",
+    ) as dataset:
+        dataset.write(data)
+        if overviews:
+            dataset.build_overviews([2, 4], Resampling.nearest)
+
+
+def test_plan_tiles_aligns_skips_nodata_and_orders(tmp_path):
+    path = tmp_path / "scene.tif"
+    _write_tiled_scene(path, overviews=True)
+    with rasterio.open(path) as dataset:
+        plan = plan_tiles(dataset, 30)
+        raster = plan_tiles(dataset, 30, order="raster", skip_nodata=False)
+        sparse = plan_tiles(dataset, 30, bounds=np.array([[70.0, 40.0, 75.0, 45.0]]))
+        windows = list(iter_windows(dataset, 32))
+        overview_mask = dataset.dataset_mask(out_shape=(16, 24))
+        kept = plan_tiles(dataset, 30, keep_bounds=np.array([[10.0, 40.0, 12.0, 42.0]]))
+
+    # 30 px snaps to two 16 px blocks: a 3x2 grid whose first column is nodata,
+    # except for the pixel the full-resolution check finds below the overviews.
+    assert not overview_mask[8:, :8].any()
+    assert plan.tile_size == (32, 32) and plan.grid_shape == (2, 3)
+    assert (len(plan), plan.total_tiles, plan.nodata_tiles) == (5, 6, 1)
+    assert plan.skipped == [Window(0, 0, 32, 32)]
+    assert plan.estimated_bytes == 5 * 32 * 32 * 2 * 2
+    # Hilbert order walks neighbouring tiles; raster order follows iter_windows.
+    assert [(w.col_off, w.row_off) for w in plan] == [
+        (32, 0),
+        (32, 32),
+        (0, 32),
+        (64, 32),
+        (64, 0),
+    ]
+    assert len(kept) == 6 and kept.nodata_tiles == 0
+    assert raster.windows == windows and not raster.skipped
+    assert sparse.windows == [Window(64, 0, 32, 32)] and len(sparse.skipped) == 5
+
+
+def test_plan_tiles_reads_mask_band_without_overviews(tmp_path):
+    path = tmp_path / "scene.tif"
+    _write_tiled_scene(path, overviews=False)
+    with rasterio.Env(GDAL_TIFF_INTERNAL_MASK=True):
+        with rasterio.open(path, "r+") as dataset:
+            mask = np.full((64, 96), 255, dtype=np.uint8)
+            mask[:, :32] = 0
+            mask[40, 10] = 255
+            dataset.write_mask(mask)
+    with rasterio.open(path) as dataset:
+        plan = plan_tiles(dataset, 32, order="raster")
+
+    assert plan.nodata_tiles == 1
+    assert plan.skipped == [Window(0, 0, 32, 32)]
+    with pytest.raises(ValueError, match="order"):
+        plan_tiles(dataset, 32, order="zigzag")
+
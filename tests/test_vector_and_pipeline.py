@@ -26,3 +26,31 @@ def test_reproject_aoi_short_circuit():
     crs = CRS.from_epsg(4326)
 
     assert reproject_aoi_to_raster_crs(bounds, crs, crs) == bounds
+
+
+@pytest.mark.parametrize("suffix", [".fgb", ".gpkg", ".parquet"])
+def test_read_footprints_filters_by_reprojected_bounds(tmp_path, suffix):
+    gpd = pytest.importorskip("geopandas")
+    if suffix == ".parquet":
+        pytest.importorskip("pyarrow")
+    from shapely.geometry import box
+
+    from roof_area.io.vector import read_footprints, read_vector_crs
+
+    path = tmp_path / f"footprints{suffix}"
+    gdf = gpd.GeoDataFrame(
+        {"building_id": [1, 2, 3]},
+        geometry=[box(0.0, 0.0, 0.001, 0.001), box(0.5, 0.5, 0.501, 0.501), box(5, 5, 5.001, 5.001)],
+        crs="EPSG:4326",
+    )
+    if suffix == ".parquet":
+        gdf.to_parquet(path, write_covering_bbox=True)
+    else:
+        gdf.to_file(path)
+
+    raster_bounds = reproject_bounds((-0.1, -0.1, 0.6, 0.6), "EPSG:4326", "EPSG:3857")
+    result = read_footprints(str(path), bounds=raster_bounds, bounds_crs="EPSG:3857")
+
+    assert read_vector_crs(str(path)) == CRS.from_epsg(4326)
+    assert sorted(result["building_id"]) == [1, 2]
+    assert len(read_footprints(str(path))) == 3